@@ -48,7 +48,7 @@ async def create_complaint(
         
         # STEP 1: Save image to permanent storage
         file_ext = image.filename.split(".")[-1].lower()
-        complaint_id = generate_issue_id()  # Reuse existing function
+        complaint_id = await generate_issue_id()  # Reuse existing function
         image_filename = f"{complaint_id}_{uuid.uuid4().hex[:8]}.{file_ext}"
         
         # Create complaints directory if it doesn't exist
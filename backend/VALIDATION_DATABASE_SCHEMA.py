@@ -13,12 +13,14 @@ This collection stores complete validation records for all uploaded images.
     # Basic Info
     "validation_id": "VAL-20251213-ABC123",  # Unique validation ID
     "created_at": ISODate("2025-12-13T18:20:00Z"),
+    "complaint_id": "GG-2025-0000123",  # Set when a complaint is created from this validation
     
     # Image Info
     "image": {
         "filename": "photo.jpg",
-        "path": "/uploads/issues/GG-2025-001/photo_abc123.jpg",
-        "url": "http://localhost:5000/uploads/...",
+        "path": "blobs/ab/cd/abcd...64 hex.jpg",  # Storage key (accepted images)
+        "url": "/uploads/blobs/ab/cd/abcd...64 hex.jpg",
+        "sha256": "abcd...",  # Content address of the stored image
         "size_bytes": 245632,
         "format": "jpeg",
         "dimensions": {
@@ -111,4 +113,5 @@ db.image_validations.createIndex({"created_at": -1})
 db.image_validations.createIndex({"issue.issue_id": 1})
 db.image_validations.createIndex({"validation.status": 1})
 db.image_validations.createIndex({"hash.perceptual_hash": 1})
+db.image_validations.createIndex({"image.sha256": 1})  # batch_forensics.py upserts by content
 db.image_validations.createIndex({"exif.gps.coordinates": "2dsphere"})  # For geo queries
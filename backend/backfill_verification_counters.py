@@ -0,0 +1,51 @@
+"""
+One-off backfill of the denormalized verification counters on issues
+Run: python backfill_verification_counters.py
+
+Safe to re-run: only issues whose counters disagree with the
+verifications collection are rewritten.
+"""
+from motor.motor_asyncio import AsyncIOMotorClient
+import asyncio
+import os
+from dotenv import load_dotenv
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).parent
+load_dotenv(ROOT_DIR / '.env')
+
+from services import verification_service
+
+MONGO_URL = os.environ.get("MONGO_URL", "mongodb://localhost:27017")
+DB_NAME = os.environ.get("DB_NAME", "grievance_genie")
+
+
+async def backfill_counters():
+    """Rebuild issues.verifications from the verifications collection"""
+    client = AsyncIOMotorClient(MONGO_URL)
+    db = client[DB_NAME]
+    
+    try:
+        print(f"\n{'='*60}")
+        print("BACKFILLING VERIFICATION COUNTERS")
+        print(f"{'='*60}")
+        
+        issues = await db.issues.count_documents({})
+        verifications = await db.verifications.count_documents({})
+        print(f"Issues: {issues}, verifications: {verifications}")
+        
+        repaired = await verification_service.reconcile_counters(db)
+        print(f"✅ Updated counters on {repaired} issue(s)")
+        
+        await verification_service.create_indexes(db)
+        print("✅ Created counter indexes on issues collection")
+        
+        print(f"{'='*60}\n")
+        
+    except Exception as e:
+        print(f"❌ Error backfilling counters: {e}")
+    finally:
+        client.close()
+
+if __name__ == "__main__":
+    asyncio.run(backfill_counters())
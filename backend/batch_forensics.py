@@ -0,0 +1,472 @@
+"""
+Batch Forensics - Re-classify stored images in bulk
+
+Streams a directory (or a manifest of paths) through the same forensics,
+EXIF and perceptual-hash stages used by /api/validate-image, on a
+multiprocessing pool. Paths are discovered lazily and at most a bounded
+number are in flight, so memory does not grow with the size of the store.
+Results are written incrementally as NDJSON or CSV (one row per image,
+flushed as it completes) so an interrupted run can be resumed, and can
+optionally be upserted into image_validations in bulk,
+matched on the image's SHA-256 (the content address the API stores as
+image.sha256). With --upsert, rows reach the output only once their
+upserts are written, so --resume never skips an image whose upsert was
+lost.
+
+Usage:
+    python batch_forensics.py uploads/complaints --output results.ndjson
+    python batch_forensics.py --manifest paths.txt --output results.csv --workers 8
+    python batch_forensics.py uploads --output results.ndjson --resume --upsert
+"""
+
+import argparse
+import csv
+import json
+import hashlib
+import threading
+import os
+import sys
+import time
+import uuid
+from datetime import datetime
+from multiprocessing import Pool
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional
+
+import numpy as np
+from dotenv import load_dotenv
+
+ROOT_DIR = Path(__file__).parent
+load_dotenv(ROOT_DIR / '.env')
+
+ALLOWED_EXTENSIONS = {
+    f".{ext.strip().lower()}"
+    for ext in os.environ.get("ALLOWED_IMAGE_FORMATS", "jpg,jpeg,png,webp").split(",")
+}
+
+# Same mapping /api/validate-image uses for forensics_analysis.source_type
+SOURCE_MAPPING = {
+    'WHATSAPP': 'WHATSAPP_IMAGE',
+    'SCREENSHOT': 'SCREENSHOT_IMAGE',
+    'ORIGINAL_PHOTO': 'ORIGINAL_PHONE_PHOTO',
+    'UNKNOWN': 'UNKNOWN'
+}
+
+CSV_FIELDS = [
+    'path', 'filename', 'sha256', 'size_bytes', 'source', 'source_type', 'confidence',
+    'recommendation', 'stages_evaluated', 'latitude', 'longitude', 'timestamp',
+    'camera_make', 'camera_model', 'perceptual_hash', 'elapsed_ms', 'error'
+]
+
+
+# ------------------------------------------------------------------
+# Input discovery
+# ------------------------------------------------------------------
+
+def iter_directory(directory: Path) -> Iterator[Path]:
+    """
+    Yield image files under directory (recursive, in a stable order).
+    Only one directory listing is held at a time.
+    """
+    try:
+        with os.scandir(directory) as it:
+            entries = sorted(it, key=lambda entry: entry.name)
+    except OSError:
+        return
+    for entry in entries:
+        if entry.is_dir(follow_symlinks=False):
+            yield from iter_directory(Path(entry.path))
+        elif entry.is_file() and Path(entry.name).suffix.lower() in ALLOWED_EXTENSIONS:
+            yield Path(entry.path)
+
+
+def iter_manifest(manifest: Path) -> Iterator[Path]:
+    """Yield paths listed one per line; relative paths resolve against the manifest"""
+    with open(manifest, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            path = Path(line)
+            yield path if path.is_absolute() else manifest.parent / path
+
+
+def _path_key(path: str) -> int:
+    return int.from_bytes(hashlib.blake2b(path.encode('utf-8'), digest_size=8).digest(), 'little')
+
+
+class ProcessedPaths:
+    """
+    Paths already present in a previous (possibly interrupted) output file,
+    held as a sorted array of 64-bit path hashes (8 bytes per path)
+    """
+
+    def __init__(self, keys: np.ndarray):
+        self.keys = np.sort(keys)
+        self.skipped = 0
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def __contains__(self, path: str) -> bool:
+        key = np.uint64(_path_key(path))
+        index = np.searchsorted(self.keys, key)
+        return bool(index < len(self.keys) and self.keys[index] == key)
+
+    def filter(self, paths: Iterable[Path]) -> Iterator[Path]:
+        """Yield the paths not processed yet, counting the others in skipped"""
+        for path in paths:
+            if str(path) in self:
+                self.skipped += 1
+            else:
+                yield path
+
+
+def _output_paths(output: Path, fmt: str) -> Iterator[str]:
+    with open(output, 'r', encoding='utf-8', newline='') as f:
+        if fmt == 'csv':
+            for row in csv.DictReader(f):
+                if row.get('path'):
+                    yield row['path']
+        else:
+            for line in f:
+                try:
+                    yield json.loads(line)['path']
+                except (ValueError, KeyError):
+                    continue  # truncated last line of an interrupted run
+
+
+def load_processed(output: Path, fmt: str) -> ProcessedPaths:
+    """Paths already present in a previous (possibly interrupted) output file"""
+    if not output.exists():
+        return ProcessedPaths(np.empty(0, dtype=np.uint64))
+    keys = np.fromiter((_path_key(path) for path in _output_paths(output, fmt)), dtype=np.uint64)
+    return ProcessedPaths(keys)
+
+
+# ------------------------------------------------------------------
+# Worker
+# ------------------------------------------------------------------
+
+_worker_options: Dict = {}
+
+
+def _init_worker(options: Dict):
+    """Pool initializer - keeps per-image task payloads down to the path"""
+    _worker_options.update(options)
+
+
+def process_image(path_str: str) -> Dict:
+    """
+    Run forensics, EXIF and pHash for one image.
+
+    Imports are deferred so each worker process loads the services once and
+    the parent never has to.
+    """
+    from utils.imageForensics import default_forensics
+    from services import exif_service, hash_service
+
+    started = time.perf_counter()
+    path = Path(path_str)
+    row = {'path': path_str, 'filename': path.name, 'error': None}
+
+    try:
+        content = path.read_bytes()
+        row['size_bytes'] = len(content)
+        row['sha256'] = hashlib.sha256(content).hexdigest()
+
+        exif_record = exif_service.extract_all(content)
+        classification = default_forensics.classify_image(
+            content, path_str, path.name,
+            full_breakdown=_worker_options.get('full_breakdown', False),
+            exif_record=exif_record
+        )
+        row.update({
+            'source': classification['source'],
+            'source_type': SOURCE_MAPPING.get(classification['source'], 'UNKNOWN'),
+            'confidence': classification['confidence'],
+            'recommendation': classification['recommendation'],
+            'stages_evaluated': classification.get('stages_evaluated', []),
+            'classification': classification,
+        })
+        if classification.get('error'):
+            row['error'] = classification['error']
+
+        row.update({
+            'latitude': exif_record.latitude,
+            'longitude': exif_record.longitude,
+            'timestamp': exif_record.timestamp.isoformat() if exif_record.timestamp else None,
+            'camera_make': exif_record.camera_make,
+            'camera_model': exif_record.camera_model,
+        })
+
+        row['perceptual_hash'] = hash_service.generate_phash(path_str)
+
+    except Exception as e:
+        row['error'] = str(e)
+
+    row['elapsed_ms'] = round((time.perf_counter() - started) * 1000, 2)
+    return row
+
+
+# ------------------------------------------------------------------
+# Output
+# ------------------------------------------------------------------
+
+class ResultWriter:
+    """Appends one row per image and flushes, so progress survives a crash"""
+
+    def __init__(self, output: Path, fmt: str, append: bool):
+        output.parent.mkdir(parents=True, exist_ok=True)
+        write_header = not (append and output.exists() and output.stat().st_size > 0)
+        needs_newline = (not write_header and fmt == 'ndjson'
+                         and not output.read_bytes().endswith(b'\n'))
+
+        self.fmt = fmt
+        self.file = open(output, 'a' if append else 'w', encoding='utf-8', newline='')
+        if needs_newline:
+            self.file.write('\n')
+
+        if fmt == 'csv':
+            self.writer = csv.DictWriter(self.file, fieldnames=CSV_FIELDS, extrasaction='ignore')
+            if write_header:
+                self.writer.writeheader()
+
+    def write(self, row: Dict):
+        if self.fmt == 'csv':
+            flat = dict(row)
+            flat['stages_evaluated'] = '|'.join(row.get('stages_evaluated') or [])
+            self.writer.writerow(flat)
+        else:
+            self.file.write(json.dumps(row, default=str) + '\n')
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+def _evidence(classification: Dict) -> List[str]:
+    """Evidence of the winning detector, as stored by /api/validate-image"""
+    source = classification.get('source', 'UNKNOWN')
+    if source == 'UNKNOWN':
+        return []
+    return classification.get('breakdown', {}).get(source.lower(), {}).get('evidence', [])
+
+
+def validation_update(row: Dict, run_at: datetime):
+    """
+    Build the image_validations upsert for one result row: every record of
+    the same content is updated, or a new one is created
+    """
+    from pymongo import UpdateMany
+
+    classification = row.get('classification') or {}
+    has_gps = row.get('latitude') is not None
+    fields = {
+        "image.size_bytes": row.get('size_bytes'),
+        "forensics": {
+            "enabled": row.get('source_type', 'UNKNOWN') != 'UNKNOWN',
+            "source_type": row.get('source_type', 'UNKNOWN'),
+            "confidence_score": (row.get('confidence') or 0) / 100.0,
+            "evidence": _evidence(classification),
+            "classification_result": classification,
+            "forensics_version": '3.0'
+        },
+        "exif.has_data": has_gps or row.get('camera_make') is not None,
+        "exif.camera": {
+            "make": row.get('camera_make'),
+            "model": row.get('camera_model')
+        },
+        "exif.timestamp": row.get('timestamp'),
+        "exif.gps.has_gps": has_gps,
+        "exif.gps.coordinates": {
+            "latitude": row['latitude'],
+            "longitude": row['longitude']
+        } if has_gps else None,
+        "hash.perceptual_hash": row.get('perceptual_hash'),
+        "hash.algorithm": "pHash",
+        "metadata.batch_reclassified_at": run_at,
+    }
+    return UpdateMany(
+        {"image.sha256": row['sha256']},
+        {
+            "$set": fields,
+            "$setOnInsert": {
+                # Records from the API keep their stored name and key
+                "image.filename": row['filename'],
+                "image.path": row['path'],
+                "validation_id": f"VAL-{run_at.strftime('%Y%m%d')}-{str(uuid.uuid4())[:8].upper()}",
+                "created_at": run_at,
+                "metadata.validation_version": "4.0",
+                "metadata.source": "batch_forensics"
+            }
+        },
+        upsert=True
+    )
+
+
+class ValidationUpserter:
+    """Buffers image_validations upserts and sends them as unordered bulk writes"""
+
+    def __init__(self, batch_size: int):
+        from pymongo import MongoClient
+
+        mongo_url = os.getenv('MONGO_URL', 'mongodb://localhost:27017')
+        db_name = os.getenv('DB_NAME', 'grievance_genie')
+        self.client = MongoClient(mongo_url)
+        self.collection = self.client[db_name].image_validations
+        self.batch_size = batch_size
+        self.run_at = datetime.utcnow()
+        self.pending = []
+        self.upserted = 0
+        self.modified = 0
+
+    def add(self, row: Dict) -> bool:
+        """Queue a row's upsert; True if this wrote the queued batch"""
+        if row.get('error') and not row.get('classification'):
+            return False  # unreadable file - nothing worth storing
+        self.pending.append(validation_update(row, self.run_at))
+        if len(self.pending) >= self.batch_size:
+            self.flush()
+            return True
+        return False
+
+    def flush(self):
+        if not self.pending:
+            return
+        result = self.collection.bulk_write(self.pending, ordered=False)
+        self.upserted += result.upserted_count
+        self.modified += result.modified_count
+        self.pending = []
+
+    def close(self):
+        self.flush()
+        self.client.close()
+
+
+# ------------------------------------------------------------------
+# Driver
+# ------------------------------------------------------------------
+
+def _progress(done: int, failed: int, started: float):
+    elapsed = time.perf_counter() - started
+    rate = done / elapsed if elapsed > 0 else 0.0
+    sys.stderr.write(f"\r  {done} images | {rate:6.1f} images/s | {failed} failed")
+    sys.stderr.flush()
+
+
+def _bounded(paths: Iterable[Path], slots: threading.Semaphore) -> Iterator[str]:
+    """
+    Hand paths to the pool only while a slot is free. Pool.imap_unordered
+    otherwise drains its whole input into the task queue up front; here the
+    pool's feeder thread blocks until results free slots.
+    """
+    for path in paths:
+        slots.acquire()
+        yield str(path)
+
+
+def run_batch(paths: Iterable[Path], writer: ResultWriter, workers: int,
+              chunksize: int, full_breakdown: bool,
+              upserter: Optional[ValidationUpserter] = None) -> Dict:
+    """
+    Feed paths through the worker pool, writing each result as it completes
+    (with an upserter: as soon as its upsert batch is written). At most a
+    few chunks per worker are in flight at any time.
+    """
+    done = failed = 0
+    sources: Dict[str, int] = {}
+    started = time.perf_counter()
+    unwritten: List[Dict] = []
+    slots = threading.Semaphore(workers * chunksize * 4)
+
+    with Pool(workers, initializer=_init_worker,
+              initargs=({'full_breakdown': full_breakdown},)) as pool:
+        for row in pool.imap_unordered(process_image, _bounded(paths, slots), chunksize):
+            slots.release()
+            if upserter:
+                unwritten.append(row)
+                if upserter.add(row):
+                    for pending_row in unwritten:
+                        writer.write(pending_row)
+                    unwritten = []
+            else:
+                writer.write(row)
+
+            done += 1
+            failed += 1 if row.get('error') else 0
+            sources[row.get('source', 'UNKNOWN')] = sources.get(row.get('source', 'UNKNOWN'), 0) + 1
+            if done % 10 == 0:
+                _progress(done, failed, started)
+    if done:
+        _progress(done, failed, started)
+        sys.stderr.write('\n')
+
+    if upserter:
+        upserter.flush()
+        for row in unwritten:
+            writer.write(row)
+
+    elapsed = time.perf_counter() - started
+    return {
+        'processed': done,
+        'failed': failed,
+        'sources': sources,
+        'elapsed_s': round(elapsed, 2),
+        'images_per_s': round(done / elapsed, 2) if elapsed > 0 else 0.0
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Batch forensics, EXIF and pHash over stored images")
+    parser.add_argument('directory', type=Path, nargs='?', help="Directory to scan recursively")
+    parser.add_argument('--manifest', type=Path, help="File listing one image path per line")
+    parser.add_argument('--output', type=Path, required=True, help="Results file (.ndjson or .csv)")
+    parser.add_argument('--format', choices=['ndjson', 'csv'], default=None,
+                        help="Output format (default: from the output extension)")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help="Worker processes")
+    parser.add_argument('--chunksize', type=int, default=8, help="Paths handed to a worker at a time")
+    parser.add_argument('--resume', action='store_true',
+                        help="Skip paths already in --output and append to it")
+    parser.add_argument('--full-breakdown', action='store_true',
+                        help="Evaluate every forensics marker (no early exit)")
+    parser.add_argument('--upsert', action='store_true', help="Bulk upsert results into image_validations")
+    parser.add_argument('--upsert-batch', type=int, default=500, help="Upserts per bulk write")
+    args = parser.parse_args()
+
+    if bool(args.directory) == bool(args.manifest):
+        parser.error("pass exactly one of DIRECTORY or --manifest")
+
+    fmt = args.format or ('csv' if args.output.suffix.lower() == '.csv' else 'ndjson')
+    paths = iter_manifest(args.manifest) if args.manifest else iter_directory(args.directory)
+
+    processed = None
+    if args.resume:
+        processed = load_processed(args.output, fmt)
+        paths = processed.filter(paths)
+
+    print(f"🔍 Batch forensics: {args.manifest or args.directory}"
+          f"{f', {len(processed)} image(s) already done' if processed else ''} ({args.workers} workers)")
+
+    writer = ResultWriter(args.output, fmt, append=args.resume)
+    upserter = ValidationUpserter(args.upsert_batch) if args.upsert else None
+    try:
+        summary = run_batch(paths, writer, args.workers, args.chunksize,
+                            args.full_breakdown, upserter)
+    finally:
+        writer.close()
+        if upserter:
+            upserter.close()
+
+    print(f"✅ Processed {summary['processed']} image(s) in {summary['elapsed_s']}s "
+          f"({summary['images_per_s']} images/s, {summary['failed']} failed"
+          f"{f', {processed.skipped} skipped as already done' if processed else ''})")
+    for source, count in sorted(summary['sources'].items()):
+        print(f"   {source:<16} {count}")
+    if upserter:
+        print(f"💾 image_validations: {upserter.upserted} inserted, {upserter.modified} updated")
+    print(f"📄 Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
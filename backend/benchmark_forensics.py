@@ -0,0 +1,359 @@
+"""
+Forensics Benchmark - Accuracy and Latency for ImageSourceForensics
+
+Generates a synthetic, labelled corpus locally with Pillow (no server, no
+database, no real photos needed) and measures:
+- per-stage feature extraction and per-detector scoring latency percentiles
+- end-to-end classify_image latency and throughput (early exit and full)
+- peak RSS of the process
+- confusion matrices against the known labels
+
+Corpus:
+- ORIGINAL_PHOTO: camera-like JPEGs (q 90-95) with full EXIF, GPS and
+  camera settings, IMG_YYYYMMDD_HHMMSS.jpg
+- WHATSAPP: recompressions at q 60-75 to WhatsApp resize sizes with EXIF
+  stripped, IMG-YYYYMMDD-WANNNN.jpg
+- SCREENSHOT: PNGs at the exact resolutions in screenshot_markers,
+  Screenshot_YYYYMMDD-HHMMSS.png
+
+Usage:
+    python benchmark_forensics.py
+    python benchmark_forensics.py --per-class 50 --output results/forensics.json
+    python benchmark_forensics.py --corpus-dir /tmp/corpus   # keep the images
+"""
+
+import argparse
+import json
+import platform
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+import piexif
+from PIL import Image, ImageDraw
+
+from utils.imageForensics import (
+    RULES, STAGE_COSTS, FeatureExtractor, ImageSourceForensics,
+    classify_features, score_original, score_screenshot, score_whatsapp
+)
+
+LABELS = ['ORIGINAL_PHOTO', 'WHATSAPP', 'SCREENSHOT']
+PREDICTIONS = LABELS + ['UNKNOWN']
+PERCENTILES = (50, 90, 95, 99)
+
+CAMERAS = [
+    (b'samsung', b'SM-S918B'), (b'Apple', b'iPhone 14 Pro'), (b'Google', b'Pixel 8'),
+    (b'Xiaomi', b'2201117TI'), (b'OnePlus', b'CPH2449')
+]
+CAMERA_SIZES = [(4000, 3000), (3000, 4000), (4032, 3024)]
+
+
+# ------------------------------------------------------------------
+# Corpus generation
+# ------------------------------------------------------------------
+
+def _scene(rng: np.random.Generator, width: int, height: int) -> Image.Image:
+    """Photo-like content: smooth gradients plus per-pixel sensor noise"""
+    # Build at quarter scale and upsample so generation stays fast
+    small_w, small_h = max(width // 4, 1), max(height // 4, 1)
+    y = np.linspace(0, 1, small_h)[:, None, None]
+    x = np.linspace(0, 1, small_w)[None, :, None]
+    base = rng.uniform(60, 180, 3) + 50 * np.sin(3 * x + rng.uniform(0, 3)) * np.cos(2 * y)
+    scene = Image.fromarray(np.clip(base, 0, 255).astype(np.uint8)).resize((width, height), Image.BILINEAR)
+    noise = rng.normal(0, 6, (height, width, 1))
+    return Image.fromarray(np.clip(np.asarray(scene) + noise, 0, 255).astype(np.uint8))
+
+
+def _to_rational_dms(value: float):
+    degrees = int(value)
+    minutes = int((value - degrees) * 60)
+    seconds = round(((value - degrees) * 60 - minutes) * 60 * 100)
+    return ((degrees, 1), (minutes, 1), (seconds, 100))
+
+
+def _camera_exif(rng: np.random.Generator, taken_at: datetime) -> bytes:
+    make, model = CAMERAS[int(rng.integers(len(CAMERAS)))]
+    stamp = taken_at.strftime('%Y:%m:%d %H:%M:%S').encode()
+    latitude, longitude = rng.uniform(12.8, 13.2), rng.uniform(77.4, 77.8)
+    return piexif.dump({
+        '0th': {
+            piexif.ImageIFD.Make: make,
+            piexif.ImageIFD.Model: model,
+            piexif.ImageIFD.DateTime: stamp,
+            piexif.ImageIFD.Orientation: 1,
+        },
+        'Exif': {
+            piexif.ExifIFD.DateTimeOriginal: stamp,
+            piexif.ExifIFD.ExposureTime: (1, int(rng.choice([60, 120, 250]))),
+            piexif.ExifIFD.FNumber: (18, 10),
+            piexif.ExifIFD.ISOSpeedRatings: int(rng.choice([50, 100, 400])),
+            piexif.ExifIFD.Flash: 0,
+            piexif.ExifIFD.FocalLength: (554, 100),
+            piexif.ExifIFD.WhiteBalance: 0,
+            piexif.ExifIFD.ExposureMode: 0,
+        },
+        'GPS': {
+            piexif.GPSIFD.GPSLatitudeRef: b'N',
+            piexif.GPSIFD.GPSLatitude: _to_rational_dms(latitude),
+            piexif.GPSIFD.GPSLongitudeRef: b'E',
+            piexif.GPSIFD.GPSLongitude: _to_rational_dms(longitude),
+        },
+        '1st': {piexif.ImageIFD.JPEGInterchangeFormat: 0},
+    })
+
+
+def _screenshot(rng: np.random.Generator, width: int, height: int) -> Image.Image:
+    """Flat UI-like content: status bar, nav bar, cards and text lines"""
+    background = (255, 255, 255) if rng.random() < 0.7 else (0, 0, 0)
+    foreground = (0, 0, 0) if background == (255, 255, 255) else (255, 255, 255)
+    img = Image.new('RGB', (width, height), background)
+    draw = ImageDraw.Draw(img)
+    bar = height // 30
+    draw.rectangle([0, bar, width, bar * 3], fill=(0, 122, 255))
+    y = bar * 4
+    while y < height - bar * 4:
+        card_h = int(rng.integers(bar * 2, bar * 6))
+        draw.rectangle([bar, y, width - bar, y + card_h], fill=(240, 240, 240))
+        for line in range(y + bar // 2, y + card_h - bar // 2, max(bar // 2, 4)):
+            line_w = int(rng.integers(width // 4, width - 3 * bar))
+            draw.rectangle([2 * bar, line, 2 * bar + line_w, line + max(bar // 6, 2)], fill=foreground)
+        y += card_h + bar
+    return img
+
+
+def generate_corpus(corpus_dir: Path, per_class: int, seed: int) -> List[Dict]:
+    """Write the labelled corpus and return [{path, filename, label}]"""
+    rng = np.random.default_rng(seed)
+    corpus_dir.mkdir(parents=True, exist_ok=True)
+    start = datetime(2024, 12, 14, 9, 0, 0)
+    whatsapp_sizes = [size for size in RULES.whatsapp_markers['resolution_patterns']]
+    screen_sizes = RULES.screenshot_markers['exact_screen_resolutions']
+    items = []
+
+    for index in range(per_class):
+        taken_at = start + timedelta(minutes=17 * index)
+
+        # Original camera photo
+        width, height = CAMERA_SIZES[index % len(CAMERA_SIZES)]
+        photo = _scene(rng, width, height)
+        filename = f"IMG_{taken_at.strftime('%Y%m%d_%H%M%S')}.jpg"
+        path = corpus_dir / filename
+        photo.save(path, 'JPEG', quality=int(rng.integers(90, 96)), exif=_camera_exif(rng, taken_at))
+        items.append({'path': str(path), 'filename': filename, 'label': 'ORIGINAL_PHOTO'})
+
+        # WhatsApp recompression of a camera photo, EXIF stripped
+        target = whatsapp_sizes[index % len(whatsapp_sizes)]
+        if (width > height) != (target[0] > target[1]):
+            target = (target[1], target[0])
+        filename = f"IMG-{taken_at.strftime('%Y%m%d')}-WA{index:04d}.jpg"
+        path = corpus_dir / filename
+        photo.resize(target, Image.BILINEAR).save(path, 'JPEG', quality=int(rng.integers(60, 76)))
+        items.append({'path': str(path), 'filename': filename, 'label': 'WHATSAPP'})
+
+        # Screenshot at an exact screen resolution
+        width, height = screen_sizes[index % len(screen_sizes)]
+        filename = f"Screenshot_{taken_at.strftime('%Y%m%d-%H%M%S')}.png"
+        path = corpus_dir / filename
+        _screenshot(rng, width, height).save(path, 'PNG')
+        items.append({'path': str(path), 'filename': filename, 'label': 'SCREENSHOT'})
+
+    return items
+
+
+# ------------------------------------------------------------------
+# Measurement
+# ------------------------------------------------------------------
+
+def _latency_summary(samples_s: List[float]) -> Dict:
+    """Latency percentiles in milliseconds"""
+    if not samples_s:
+        return {'count': 0}
+    samples_ms = np.asarray(samples_s) * 1000.0
+    summary = {'count': int(samples_ms.size), 'mean_ms': round(float(samples_ms.mean()), 3)}
+    for p in PERCENTILES:
+        summary[f'p{p}_ms'] = round(float(np.percentile(samples_ms, p)), 3)
+    summary['max_ms'] = round(float(samples_ms.max()), 3)
+    return summary
+
+
+def _confusion(pairs: List[tuple]) -> Dict:
+    """Confusion matrix {label: {prediction: count}} plus accuracy"""
+    matrix = {label: {prediction: 0 for prediction in PREDICTIONS} for label in LABELS}
+    for label, prediction in pairs:
+        matrix[label][prediction if prediction in PREDICTIONS else 'UNKNOWN'] += 1
+    correct = sum(matrix[label][label] for label in LABELS)
+    per_class = {
+        label: round(matrix[label][label] / max(sum(matrix[label].values()), 1), 4)
+        for label in LABELS
+    }
+    return {
+        'matrix': matrix,
+        'accuracy': round(correct / max(len(pairs), 1), 4),
+        'per_class_recall': per_class
+    }
+
+
+def peak_rss_mb() -> Optional[float]:
+    """Peak resident set size of this process in MB (None where unsupported)"""
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is KB on Linux, bytes on macOS
+    return round(peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024, 1)
+
+
+def run_benchmark(items: List[Dict], warmup: int = 3) -> Dict:
+    """Time every stage, detector and end-to-end classification over the corpus"""
+    forensics = ImageSourceForensics()
+    detectors = {'whatsapp': score_whatsapp, 'screenshot': score_screenshot, 'original': score_original}
+
+    buffers = {item['path']: Path(item['path']).read_bytes() for item in items}
+
+    # Warm imports, numpy and PIL plugin registration
+    for item in items[:warmup]:
+        forensics.classify_image(buffers[item['path']], item['path'], item['filename'], full_breakdown=True)
+
+    stage_times = {stage: [] for stage in STAGE_COSTS}
+    detector_times = {name: [] for name in detectors}
+    early_times, full_times = [], []
+    early_pairs, full_pairs, feature_pairs = [], [], []
+    stages_used = {stage: 0 for stage in STAGE_COSTS}
+
+    for item in items:
+        buffer, path, filename, label = buffers[item['path']], item['path'], item['filename'], item['label']
+
+        # Stage-by-stage extraction, then each detector over the same features
+        extractor = FeatureExtractor(buffer, path, filename)
+        for stage in STAGE_COSTS:
+            started = time.perf_counter()
+            extractor.require(stage)
+            stage_times[stage].append(time.perf_counter() - started)
+        for name, score in detectors.items():
+            started = time.perf_counter()
+            score(extractor.features)
+            detector_times[name].append(time.perf_counter() - started)
+        feature_pairs.append((label, classify_features(extractor.features)['source']))
+
+        # End-to-end, as the API runs it (cost-ordered with early exit)
+        started = time.perf_counter()
+        result = forensics.classify_image(buffer, path, filename)
+        early_times.append(time.perf_counter() - started)
+        early_pairs.append((label, result['source']))
+        for stage in result.get('stages_evaluated', []):
+            stages_used[stage] += 1
+
+        # End-to-end with every marker evaluated
+        started = time.perf_counter()
+        result = forensics.classify_image(buffer, path, filename, full_breakdown=True)
+        full_times.append(time.perf_counter() - started)
+        full_pairs.append((label, result['source']))
+
+    count = len(items)
+    return {
+        'latency': {
+            'stages': {stage: _latency_summary(times) for stage, times in stage_times.items()},
+            'detectors': {name: _latency_summary(times) for name, times in detector_times.items()},
+            'classify_early_exit': _latency_summary(early_times),
+            'classify_full': _latency_summary(full_times),
+        },
+        'throughput_images_per_sec': {
+            'classify_early_exit': round(count / sum(early_times), 2) if early_times else 0.0,
+            'classify_full': round(count / sum(full_times), 2) if full_times else 0.0,
+        },
+        'stage_usage_early_exit': {
+            stage: round(used / max(count, 1), 4) for stage, used in stages_used.items()
+        },
+        'confusion': {
+            'classify_early_exit': _confusion(early_pairs),
+            'classify_full': _confusion(full_pairs),
+            'classify_features': _confusion(feature_pairs),
+        },
+        'peak_rss_mb': peak_rss_mb(),
+    }
+
+
+def print_report(report: Dict):
+    """Human-readable summary of a benchmark report"""
+    results = report['results']
+    print("\n" + "=" * 60)
+    print("🔬 FORENSICS BENCHMARK")
+    print("=" * 60)
+    print(f"Images: {report['corpus']['images']} ({report['corpus']['per_class']} per class)")
+
+    print(f"\n⏱️  Latency (ms){'':<12}{'p50':>8} {'p95':>8} {'p99':>8}")
+    rows = [(f"stage:{name}", summary) for name, summary in results['latency']['stages'].items()]
+    rows += [(f"detector:{name}", summary) for name, summary in results['latency']['detectors'].items()]
+    rows += [("classify (early exit)", results['latency']['classify_early_exit']),
+             ("classify (full)", results['latency']['classify_full'])]
+    for name, summary in rows:
+        print(f"   {name:<24}{summary['p50_ms']:>8.2f} {summary['p95_ms']:>8.2f} {summary['p99_ms']:>8.2f}")
+
+    throughput = results['throughput_images_per_sec']
+    print(f"\n🚀 Throughput: {throughput['classify_early_exit']} img/s early exit, "
+          f"{throughput['classify_full']} img/s full")
+    print(f"   Pixel stage used by {results['stage_usage_early_exit']['pixels']:.0%} of images (early exit)")
+    print(f"💾 Peak RSS: {results['peak_rss_mb']} MB")
+
+    confusion = results['confusion']['classify_early_exit']
+    print(f"\n🎯 Accuracy: {confusion['accuracy']:.1%}")
+    print(f"   {'label':<16}" + "".join(f"{p[:10]:>12}" for p in PREDICTIONS))
+    for label in LABELS:
+        print(f"   {label:<16}" + "".join(f"{confusion['matrix'][label][p]:>12}" for p in PREDICTIONS))
+    print("=" * 60 + "\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark ImageSourceForensics accuracy and latency")
+    parser.add_argument('--per-class', type=int, default=20, help="Images generated per label")
+    parser.add_argument('--seed', type=int, default=42, help="Corpus random seed")
+    parser.add_argument('--corpus-dir', type=Path, default=None,
+                        help="Write (and keep) the corpus here instead of a temp directory")
+    parser.add_argument('--output', type=Path, default=None,
+                        help="JSON results path (default: benchmark_results/forensics_<timestamp>.json)")
+    args = parser.parse_args()
+
+    started_at = datetime.utcnow()
+    output = args.output or Path(__file__).parent / 'benchmark_results' / \
+        f"forensics_{started_at.strftime('%Y%m%dT%H%M%SZ')}.json"
+
+    with tempfile.TemporaryDirectory(prefix='forensics_corpus_') as temp_dir:
+        corpus_dir = args.corpus_dir or Path(temp_dir)
+        print(f"Generating corpus in {corpus_dir} ...")
+        # Generate in a child process so peak RSS reflects forensics only
+        with ProcessPoolExecutor(max_workers=1) as pool:
+            items = pool.submit(generate_corpus, corpus_dir, args.per_class, args.seed).result()
+        results = run_benchmark(items)
+
+    report = {
+        'benchmark': 'image_source_forensics',
+        'started_at': started_at.isoformat() + 'Z',
+        'environment': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'numpy': np.__version__,
+            'pillow': Image.__version__,
+        },
+        'corpus': {
+            'per_class': args.per_class,
+            'images': len(items),
+            'seed': args.seed,
+        },
+        'results': results,
+    }
+
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2))
+
+    print_report(report)
+    print(f"💾 Results saved to {output}")
+
+
+if __name__ == "__main__":
+    main()
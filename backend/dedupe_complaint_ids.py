@@ -0,0 +1,81 @@
+"""
+One-off rename of duplicated legacy complaint IDs
+Run: python dedupe_complaint_ids.py [--dry-run]
+
+Complaint IDs issued before id_service were five digits of a random UUID
+(GG-YYYY-NNNNN) and can collide. For every duplicated complaint_id the
+oldest complaint keeps it; the others get a fresh ID from id_service and
+keep the old one in legacy_complaint_id (their image validation records
+are updated to match). Afterwards init_database.py can build the unique
+index on complaint_id.
+
+Safe to re-run: once no duplicates remain it changes nothing.
+"""
+from motor.motor_asyncio import AsyncIOMotorClient
+import asyncio
+import os
+import sys
+from datetime import datetime
+from dotenv import load_dotenv
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).parent
+load_dotenv(ROOT_DIR / '.env')
+
+from services import id_service
+
+MONGO_URL = os.environ.get("MONGO_URL", "mongodb://localhost:27017")
+DB_NAME = os.environ.get("DB_NAME", "grievance_genie")
+
+
+async def dedupe_complaint_ids(dry_run: bool = False):
+    """Give every complaint but the oldest of each duplicated ID a new ID"""
+    client = AsyncIOMotorClient(MONGO_URL)
+    db = client[DB_NAME]
+
+    try:
+        print(f"\n{'='*60}")
+        print(f"DEDUPLICATING COMPLAINT IDS{' (dry run)' if dry_run else ''}")
+        print(f"{'='*60}")
+
+        duplicates = await id_service.find_duplicates(db, "complaints", "complaint_id")
+        renamed = 0
+        for duplicate in duplicates:
+            legacy_id = duplicate["_id"]
+            # ids are in _id (insertion) order; the first keeps the ID
+            for object_id in duplicate["ids"][1:]:
+                if dry_run:
+                    print(f"  would rename {legacy_id} ({object_id})")
+                    renamed += 1
+                    continue
+
+                new_id = await id_service.issue_ids.next_id(db)
+                complaint = await db.complaints.find_one_and_update(
+                    {"_id": object_id, "complaint_id": legacy_id},
+                    {"$set": {
+                        "complaint_id": new_id,
+                        "legacy_complaint_id": legacy_id,
+                        "updated_at": datetime.utcnow()
+                    }},
+                    projection={"validation_record_id": 1}
+                )
+                if not complaint:
+                    continue
+                if complaint.get("validation_record_id"):
+                    await db.image_validations.update_one(
+                        {"validation_id": complaint["validation_record_id"]},
+                        {"$set": {"complaint_id": new_id}}
+                    )
+                print(f"  {legacy_id} ({object_id}) -> {new_id}")
+                renamed += 1
+
+        print(f"✅ {len(duplicates)} duplicated ID(s), {renamed} complaint(s) {'to rename' if dry_run else 'renamed'}")
+        print(f"{'='*60}\n")
+
+    except Exception as e:
+        print(f"❌ Error deduplicating complaint IDs: {e}")
+    finally:
+        client.close()
+
+if __name__ == "__main__":
+    asyncio.run(dedupe_complaint_ids(dry_run="--dry-run" in sys.argv))
@@ -15,6 +15,8 @@ import uuid
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
+from services import id_service
+
 async def init_database():
     """Initialize MongoDB database with indexes and optional seed data"""
     print("\n" + "="*60)
@@ -55,6 +57,20 @@ async def init_database():
         await db.issues.create_index([("reported_at", -1)])
         print("    ✅ Descending index on 'reported_at'")
         
+        await db.issues.create_index([("verifications.yes", 1)])
+        await db.issues.create_index([("verifications.total", 1)])
+        print("    ✅ Indexes on verification counters")
+        
+        # Keyset pagination: (filter, reported_at, _id) for GET /api/issues
+        await db.issues.create_index([("reported_at", -1), ("_id", -1)])
+        await db.issues.create_index([("status", 1), ("reported_at", -1), ("_id", -1)])
+        await db.issues.create_index([("category", 1), ("reported_at", -1), ("_id", -1)])
+        print("    ✅ Compound pagination indexes on 'reported_at' + '_id'")
+        
+        # Dashboard stats: resolved this week
+        await db.issues.create_index([("status", 1), ("updated_at", -1)])
+        print("    ✅ Compound index on 'status' + 'updated_at'")
+        
         await db.issues.create_index([("reported_by", 1)])
         print("    ✅ Index on 'reported_by'")
         
@@ -77,6 +93,64 @@ async def init_database():
         await db.verifications.create_index([("issue_id", 1), ("user_id", 1)], unique=True)
         print("    ✅ Compound unique index on 'issue_id' + 'user_id'")
         
+        # Covers per-issue verification tallies grouped by response
+        await db.verifications.create_index([("issue_id", 1), ("response", 1)])
+        print("    ✅ Compound index on 'issue_id' + 'response'")
+        
+        # Complaints collection indexes (keyset pagination for the dashboards)
+        print("\n  Creating indexes for 'complaints' collection:")
+        # Legacy random IDs can collide; the unique index cannot be built
+        # over duplicates, so report them instead of failing silently
+        duplicates = await id_service.find_duplicates(db, "complaints", "complaint_id")
+        if duplicates:
+            print(f"    ❌ {len(duplicates)} duplicated 'complaint_id' value(s), e.g. {duplicates[0]['_id']}")
+            print("       Run dedupe_complaint_ids.py, then re-run this script for the unique index")
+        else:
+            await db.complaints.create_index([("complaint_id", 1)], unique=True)
+            print("    ✅ Unique index on 'complaint_id'")
+        
+        await db.complaints.create_index([("assigned_officer.officer_id", 1), ("created_at", -1), ("_id", -1)])
+        print("    ✅ Compound index on 'assigned_officer.officer_id' + 'created_at' + '_id'")
+        
+        await db.complaints.create_index([("supervisor_id", 1), ("supervisor_deadline", 1), ("_id", 1)])
+        print("    ✅ Compound index on 'supervisor_id' + 'supervisor_deadline' + '_id'")
+        
+        # Supervisor dashboard counters
+        await db.complaints.create_index([("supervisor_id", 1), ("supervisor_status", 1), ("supervisor_deadline", 1)])
+        print("    ✅ Compound index on 'supervisor_id' + 'supervisor_status' + 'supervisor_deadline'")
+        
+        await db.complaints.create_index([("supervisor_id", 1), ("escalated_at", -1)])
+        print("    ✅ Compound index on 'supervisor_id' + 'escalated_at'")
+        
+        # SLA engine resync (pending deadlines by status)
+        await db.complaints.create_index([("status", 1), ("officer_deadline", 1)])
+        await db.complaints.create_index([("status", 1), ("supervisor_deadline", 1)])
+        print("    ✅ Compound indexes on 'status' + 'officer_deadline' / 'supervisor_deadline'")
+        
+        # Open workload per officer / supervisor
+        await db.complaints.create_index([("status", 1), ("assigned_officer.officer_id", 1)])
+        await db.complaints.create_index([("status", 1), ("supervisor_id", 1)])
+        print("    ✅ Compound indexes on 'status' + 'assigned_officer.officer_id' / 'supervisor_id'")
+        
+        # Image validation records
+        print("\n  Creating indexes for 'image_validations' collection:")
+        await db.image_validations.create_index([("validation_id", 1)], unique=True)
+        print("    ✅ Unique index on 'validation_id'")
+        
+        # Batch re-classification upserts by content (batch_forensics.py)
+        await db.image_validations.create_index([("image.sha256", 1)])
+        print("    ✅ Index on 'image.sha256'")
+        
+        # Upload tokens (expired ones are swept by the API)
+        print("\n  Creating indexes for 'upload_tokens' collection:")
+        await db.upload_tokens.create_index([("expires_at", 1)])
+        print("    ✅ Index on 'expires_at'")
+        
+        # Chat conversations (CONVERSATION_BACKEND=mongo), expired by TTL
+        print("\n  Creating indexes for 'conversations' collection:")
+        await db.conversations.create_index([("expires_at", 1)], expireAfterSeconds=0)
+        print("    ✅ TTL index on 'expires_at'")
+        
         # Users collection indexes (future use)
         print("\n  Creating indexes for 'users' collection:")
         await db.users.create_index([("phone", 1)], unique=True)
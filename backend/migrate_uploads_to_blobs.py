@@ -0,0 +1,80 @@
+"""
+One-off migration of flat uploads/ files into content-addressed storage
+Run: python migrate_uploads_to_blobs.py [--dry-run]
+
+Each file under uploads/ (issue_* photos, uploads/complaints/...) is moved
+into the blob store (uploads/blobs/<shards>/<sha256>.<ext>, or the S3
+bucket when STORAGE_BACKEND=s3); byte-identical files collapse
+into one blob with a reference per original. The original relative path is
+recorded in upload_aliases so existing /uploads/... URLs keep resolving.
+
+Safe to re-run: already-aliased paths are skipped. Validation temp files
+(temp_*) are left alone.
+"""
+from motor.motor_asyncio import AsyncIOMotorClient
+import asyncio
+import os
+import sys
+from dotenv import load_dotenv
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).parent
+load_dotenv(ROOT_DIR / '.env')
+
+from services import storage_service
+
+MONGO_URL = os.environ.get("MONGO_URL", "mongodb://localhost:27017")
+DB_NAME = os.environ.get("DB_NAME", "grievance_genie")
+
+
+def legacy_files(root: Path):
+    """Uploaded files outside the blob store, as (path, path relative to root)"""
+    managed = (storage_service.BLOB_PREFIX + "/", storage_service.DERIVED_PREFIX + "/")
+    for path in sorted(root.rglob("*")):
+        relative = path.relative_to(root).as_posix()
+        if not path.is_file() or relative.startswith(managed):
+            continue
+        if path.name.startswith("temp_") or any(part.startswith(".") for part in path.relative_to(root).parts):
+            continue
+        yield path, relative
+
+
+async def migrate_uploads(dry_run: bool = False):
+    """Move legacy uploads into the blob store and alias their old paths"""
+    client = AsyncIOMotorClient(MONGO_URL)
+    db = client[DB_NAME]
+    root = storage_service.UPLOAD_ROOT
+
+    try:
+        print(f"\n{'='*60}")
+        print(f"MIGRATING UPLOADS TO CONTENT-ADDRESSED STORAGE{' (dry run)' if dry_run else ''}")
+        print(f"{'='*60}")
+
+        moved = deduplicated = skipped = 0
+        for path, relative in legacy_files(root):
+            if await storage_service.resolve_alias(db, relative):
+                skipped += 1
+                continue
+            if dry_run:
+                print(f"  would move {relative}")
+                moved += 1
+                continue
+
+            ext = path.suffix.lstrip(".") or "bin"
+            blob = await storage_service.put_file(db, path, ext)
+            await storage_service.add_alias(db, relative, blob)
+            if blob.created:
+                moved += 1
+            else:
+                deduplicated += 1
+
+        print(f"✅ Moved {moved} file(s), deduplicated {deduplicated}, skipped {skipped} already migrated")
+        print(f"{'='*60}\n")
+
+    except Exception as e:
+        print(f"❌ Error migrating uploads: {e}")
+    finally:
+        client.close()
+
+if __name__ == "__main__":
+    asyncio.run(migrate_uploads(dry_run="--dry-run" in sys.argv))
@@ -60,6 +60,7 @@ class Issue(BaseModel):
     location: str
     coordinates: Coordinates
     photos: List[str] = []
+    thumbnails: List[str] = []  # Per photo, in order (the photo itself if it has none)
     status: str = "verifying"
     department: str
     reported_at: datetime
@@ -195,6 +196,10 @@ class ImageValidationResult(BaseModel):
     forensics_ui_feedback: Optional[ForensicsUIFeedback] = None  # NEW: UI feedback
     confidence_score: float
     message: Optional[str] = None
+    validation_id: Optional[str] = None
+    # Accepted images only: pass to /api/complaints/create instead of re-uploading
+    upload_token: Optional[str] = None
+    upload_token_expires_at: Optional[datetime] = None
 
 class Supervisor(BaseModel):
     supervisor_id: str
@@ -237,17 +242,25 @@ class Complaint(BaseModel):
     category: str
     severity: str
     description: str
-    location: dict  # {lat, lng, address, ward}
+    location: dict  # {lat, lng, address, ward, declared_ward, ward_source}
     image_url: Optional[str] = None
+    image_sha256: Optional[str] = None  # Content address of the stored image
     assigned_officer: Optional[AssignedOfficer] = None
-    status: str = "pending"  # pending | assigned | in_progress | resolved | unassigned | awaiting_supervisor | closed
+    status: str = "pending"  # pending | assigned | in_progress | resolved | unassigned | awaiting_supervisor | escalated_hod | closed
     needs_manual_routing: bool = False  # True if no officer could be auto-assigned
+    routing_tier: Optional[str] = None  # exact | ward_general | city_department | city_general | unassigned
     validation_record_id: Optional[str] = None
     
     # Escalation / Timeline Fields (Phase 4)
     supervisor_id: Optional[str] = None # ID of supervisor assigned for review
-    supervisor_status: Optional[str] = None # PENDING | APPROVED | REJECTED
+    supervisor_status: Optional[str] = None # PENDING | APPROVED | REJECTED | ESCALATED
     supervisor_deadline: Optional[datetime] = None # Deadline for supervisor review
+    escalated_at: Optional[datetime] = None # When the complaint was sent to the supervisor
+    
+    # SLA Fields (set and acted on by services/sla_service.py)
+    officer_deadline: Optional[datetime] = None # Resolution deadline for the assigned officer
+    officer_overdue_at: Optional[datetime] = None # When the officer deadline was missed
+    escalated_hod_at: Optional[datetime] = None # When a missed review auto-escalated to the HOD
     timeline: List[ComplaintTimelineEvent] = [] # Complete history of actions
     
     created_at: datetime = Field(default_factory=datetime.utcnow)
@@ -263,4 +276,7 @@ class ComplaintResponse(BaseModel):
     assigned_officer: Optional[dict] = None  # {id, name, title, department, ward}
     status: str
     message: str
+    ward: Optional[int] = None  # Ward used for routing
+    declared_ward: Optional[int] = None  # Ward selected by the citizen
+    ward_mismatch: bool = False  # True if the coordinates lie in another ward
 
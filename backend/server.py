@@ -1,15 +1,16 @@
 from contextlib import asynccontextmanager
-from fastapi import FastAPI, APIRouter, HTTPException, UploadFile, File, Query, Request, Form
-from fastapi.staticfiles import StaticFiles
+from fastapi import FastAPI, APIRouter, HTTPException, UploadFile, File, Query, Request, Form, Response
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ReturnDocument
 import os
+import asyncio
 import logging
 from pathlib import Path
 from typing import List, Optional, Dict
 import uuid
-from datetime import datetime, timedelta
+from datetime import datetime
 import shutil
 import json
 import google.generativeai as genai
@@ -29,7 +30,17 @@ from models import (
 )
 
 # Import image validation services (AFTER load_dotenv)
-from services import sightengine_service, exif_service, hash_service, decision_engine, vision_service, officer_routing
+from services import sightengine_service, exif_service, hash_service, decision_engine, vision_service, officer_routing, ward_service
+from services import verification_service, stats_service, supervisor_service, sla_service, directory_service, workload_service
+from services import id_service, storage_service, derivative_service, media_service, upload_token_service
+from services import conversation_service
+from services.conversation_service import conversation_store
+from services.derivative_service import derivatives
+from services.directory_service import directory
+from services.workload_service import workload, TRANSITION_PROJECTION
+from utils.pagination import (
+    fetch_page, clamp_page_size, InvalidCursor, DESCENDING, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+)
 
 # Debug: Print environment variables
 print("\n" + "="*60)
@@ -59,8 +70,8 @@ if not mongo_url:
 client = AsyncIOMotorClient(mongo_url)
 db = client[os.environ.get('DB_NAME', 'grievance_genie')]
 
-# In-memory conversation storage
-conversations: Dict[str, List[dict]] = {}
+# Default page size for GET /api/issues (the public map loads one large page)
+ISSUES_PAGE_SIZE = int(os.environ.get("ISSUES_PAGE_SIZE", "1000"))
 
 # Create the FastAPI app with lifespan event handler
 @asynccontextmanager
@@ -96,6 +107,16 @@ async def lifespan(app: FastAPI):
         else:
             print(f"   Collections: None (database is empty)")
         
+        await verification_service.create_indexes(db)
+        await stats_service.create_indexes(db)
+        await supervisor_service.create_indexes(db)
+        await supervisor_service.backfill_escalated_at(db)
+        await sla_service.create_indexes(db)
+        await directory.load(db)
+        await workload_service.create_indexes(db)
+        await upload_token_service.create_indexes(db)
+        await conversation_service.create_indexes(db)
+        
         print("\n" + "="*60)
         print("✅ Backend Ready!")
         print("="*60)
@@ -113,8 +134,29 @@ async def lifespan(app: FastAPI):
         print(f"   3. For Atlas: Check network access settings")
         print("="*60 + "\n")
     
+    # Background jobs
+    background_tasks = []
+    if verification_service.RECONCILE_INTERVAL_SECONDS > 0:
+        background_tasks.append(asyncio.create_task(verification_service.run_reconciliation_loop(db)))
+    if stats_service.STATS_REFRESH_INTERVAL_SECONDS > 0:
+        background_tasks.append(asyncio.create_task(stats_service.run_refresh_loop(db)))
+    if sla_service.SLA_RESYNC_INTERVAL_SECONDS > 0:
+        background_tasks.append(asyncio.create_task(sla_service.sla_engine.run(db)))
+    if directory_service.DIRECTORY_REFRESH_INTERVAL_SECONDS > 0:
+        background_tasks.append(asyncio.create_task(directory_service.run_sync_loop(db)))
+    if workload_service.WORKLOAD_RECONCILE_INTERVAL_SECONDS > 0:
+        background_tasks.append(asyncio.create_task(workload_service.run_reconcile_loop(db)))
+    if officer_routing.ROUTING_RELOAD_INTERVAL_SECONDS > 0:
+        background_tasks.append(asyncio.create_task(officer_routing.run_config_watcher()))
+    if upload_token_service.UPLOAD_TOKEN_SWEEP_INTERVAL_SECONDS > 0:
+        background_tasks.append(asyncio.create_task(upload_token_service.run_sweep_loop(db)))
+    
     yield
     
+    for task in background_tasks:
+        task.cancel()
+    derivatives.shutdown()
+    
     # Shutdown: close the database client
     print("\n🔌 Closing MongoDB connection...")
     client.close()  # Synchronous method, no await needed
@@ -143,10 +185,42 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
-# Mount static files for uploads
-app.mount("/uploads", StaticFiles(directory=str(UPLOAD_DIR)), name="uploads")
+# Serve uploads from the storage backend: stored keys (content-addressed
+# blobs included), derivatives not rendered yet (rendered on demand), then
+# pre-migration paths through their alias to the blob. Local files get
+# immutable caching, ETags and ranges (media_service); backends with direct
+# URLs (S3) are redirected to, so API nodes never proxy image bytes.
+@app.get("/uploads/{file_path:path}")
+async def serve_upload(file_path: str, request: Request):
+    key = file_path
+    # Staging and temp files are not media
+    if any(part.startswith(".") for part in key.split("/")):
+        raise HTTPException(status_code=404, detail="Not Found")
+    
+    if not await storage_service.exists(key):
+        source_sha = derivative_service.parse_derivative_key(key)
+        if source_sha:
+            found = await derivatives.ensure(db, source_sha)
+        else:
+            key = await storage_service.resolve_alias(db, key)
+            found = key is not None and await storage_service.exists(key)
+        if not found:
+            raise HTTPException(status_code=404, detail="Not Found")
+    
+    # JPEG derivatives have a precomputed WebP sibling for clients that accept it
+    webp_key = derivative_service.webp_variant_key(key)
+    if webp_key and media_service.accepts_webp(request) and await storage_service.exists(webp_key):
+        key = webp_key
+    vary_accept = webp_key is not None
+    
+    backend = storage_service.backend
+    read_url = backend.read_url(key)
+    if read_url:
+        return media_service.redirect_response(read_url, backend.read_url_max_age, vary_accept)
+    return await media_service.file_response(request, key, backend.local_path(key), vary_accept)
 
 # Create a router with the /api prefix
 api_router = APIRouter(prefix="/api")
@@ -159,11 +233,9 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 # Helper functions
-def generate_issue_id():
-    """Generate unique issue ID in format GG-YYYY-NNNNN"""
-    year = datetime.utcnow().year
-    random_num = str(uuid.uuid4().int)[:5]
-    return f"GG-{year}-{random_num.zfill(5)}"
+async def generate_issue_id():
+    """Allocate a unique, time-ordered issue ID in format GG-YYYY-NNNNNNN"""
+    return await id_service.issue_ids.next_id(db)
 
 def get_department_for_category(category: str) -> str:
     """Map category to department"""
@@ -426,6 +498,11 @@ Be conversational and natural. Don't sound robotic."""
 async def health_check():
     return {"status": "ok", "message": "GrievanceGenie Backend is running"}
 
+@api_router.get("/metrics")
+async def get_metrics():
+    """Process metrics (conversation store size and evictions)"""
+    return {"conversations": await conversation_store.stats(db)}
+
 @api_router.get("/")
 async def root():
     return {"message": "GrievanceGenie API v1.0"}
@@ -441,8 +518,8 @@ async def chat_endpoint(request: ChatRequest):
         conv_id = request.conversationId or f"conv_{int(datetime.utcnow().timestamp())}_{uuid.uuid4().hex[:8]}"
         
         # Get conversation history
-        # Prioritize request history, then memory, then empty
-        history = request.history or conversations.get(conv_id, [])
+        # Prioritize request history, then the conversation store, then empty
+        history = request.history or await conversation_store.get(db, conv_id) or []
         
         # Add user message to history
         # We need to adapt the structure to what our handle_conversation expects
@@ -464,7 +541,7 @@ async def chat_endpoint(request: ChatRequest):
             "extractedData": ai_response.get("extractedData")
         })
         
-        conversations[conv_id] = new_history
+        await conversation_store.put(db, conv_id, new_history)
         
         extracted_data = ai_response.get("extractedData", {})
         
@@ -569,18 +646,17 @@ async def validate_image(
         temp_filename = f"temp_{uuid.uuid4().hex}.{file_ext}"
         temp_file_path = UPLOAD_DIR / temp_filename
         
-        # Save and check file size
-        with open(temp_file_path, "wb") as buffer:
-            content = await image.read()
-            size_mb = len(content) / (1024 * 1024)
-            
-            if size_mb > max_size_mb:
-                raise HTTPException(
-                    status_code=400,
-                    detail=f"File size ({size_mb:.2f}MB) exceeds limit of {max_size_mb}MB"
-                )
-            
-            buffer.write(content)
+        # Check file size, then save (off the event loop)
+        content = await image.read()
+        size_mb = len(content) / (1024 * 1024)
+        
+        if size_mb > max_size_mb:
+            raise HTTPException(
+                status_code=400,
+                detail=f"File size ({size_mb:.2f}MB) exceeds limit of {max_size_mb}MB"
+            )
+        
+        await asyncio.to_thread(temp_file_path.write_bytes, content)
         
         logger.info(f"Validating image: {image.filename} ({size_mb:.2f}MB)")
         
@@ -590,9 +666,10 @@ async def validate_image(
         
         # STEP 3: EXIF Metadata Analysis
         logger.info("Step 3: EXIF metadata extraction")
-        image_gps = exif_service.extract_gps_coordinates(str(temp_file_path))
-        image_timestamp = exif_service.extract_timestamp(str(temp_file_path))
-        camera_info = exif_service.extract_camera_info(str(temp_file_path))
+        exif_record = exif_service.extract_all(content)
+        image_gps = exif_record.gps
+        image_timestamp = exif_record.timestamp
+        camera_info = exif_record.camera_info
         
         # Validate location if both GPS data and user location are available
         location_valid = False
@@ -601,8 +678,7 @@ async def validate_image(
         
         if image_gps and latitude is not None and longitude is not None:
             user_coords = (latitude, longitude)
-            location_valid = exif_service.validate_location(image_gps, user_coords)
-            distance_km = exif_service.calculate_distance(image_gps, user_coords)
+            location_valid, distance_km = exif_service.check_location(image_gps, user_coords)
         
         # Get human-readable address from GPS coordinates
         if image_gps:
@@ -640,15 +716,12 @@ async def validate_image(
         # STEP 5: Image Source Forensics (AFTER AI detection, BEFORE issue classification)
         logger.info("Step 5: Image source forensics classification")
         try:
-            from utils.imageForensics import ImageSourceForensics
+            from utils.imageForensics import default_forensics
             
-            # Read image buffer for forensics
-            with open(temp_file_path, 'rb') as f:
-                image_buffer = f.read()
-            
-            # Run complete forensics classification
-            forensics = ImageSourceForensics()
-            classification_result = forensics.classify_image(image_buffer, str(temp_file_path), image.filename)
+            # Run complete forensics classification on the uploaded bytes
+            classification_result = default_forensics.classify_image(
+                content, str(temp_file_path), image.filename, exif_record=exif_record
+            )
             
             # Create forensics analysis for backward compatibility
             source_mapping = {
@@ -769,10 +842,21 @@ async def validate_image(
         else:
             print("\n⚠️  Vision analysis skipped - no extracted data available\n")
         
+        validation_id = f"VAL-{datetime.now().strftime('%Y%m%d')}-{str(uuid.uuid4())[:8].upper()}"
+        decision["validation_id"] = validation_id
+        
+        # Accepted images go straight into permanent storage; the upload token
+        # lets complaint creation use the stored image instead of a re-upload
+        stored_image = None
+        if decision["status"] != "rejected":
+            stored_image = await storage_service.put_file(db, temp_file_path, file_ext)
+            derivatives.schedule(stored_image)
+            upload_token = await upload_token_service.issue(db, stored_image, validation_id)
+            decision["upload_token"] = upload_token["_id"]
+            decision["upload_token_expires_at"] = upload_token["expires_at"]
+        
         # SAVE TO DATABASE - Store complete validation record
         try:
-            validation_id = f"VAL-{datetime.now().strftime('%Y%m%d')}-{str(uuid.uuid4())[:8].upper()}"
-            
             # Prepare validation record
             validation_record = {
                 "validation_id": validation_id,
@@ -781,8 +865,9 @@ async def validate_image(
                 # Image info
                 "image": {
                     "filename": image.filename,
-                    "path": str(temp_file_path) if temp_file_path else None,
-                    "url": None,  # Will be set when moved to permanent location
+                    "path": stored_image.key if stored_image else None,
+                    "url": stored_image.url if stored_image else None,
+                    "sha256": stored_image.sha256 if stored_image else None,
                     "size_bytes": size_mb * 1024 * 1024,
                     "format": image.content_type
                 },
@@ -957,6 +1042,16 @@ async def validate_image(
         logger.error(f"Image validation error: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Image validation failed: {str(e)}")
 
+async def _return_unused_image(token: Optional[Dict], stored_image: storage_service.StoredBlob):
+    """Give back the blob reference taken for a complaint that was not created"""
+    try:
+        if token:
+            await upload_token_service.restore(db, token)
+        else:
+            await storage_service.release(db, stored_image.sha256)
+    except Exception as e:
+        logger.error(f"Failed to return image {stored_image.sha256}: {str(e)}")
+
 # Complaint Creation Endpoint (Phase 1)
 @api_router.post("/complaints/create", response_model=ComplaintResponse)
 async def create_complaint(
@@ -969,14 +1064,18 @@ async def create_complaint(
     location: str = Form(...),
     latitude: float = Form(...),
     longitude: float = Form(...),
-    image: UploadFile = File(...),
+    image: Optional[UploadFile] = File(None),
+    upload_token: Optional[str] = Form(None),
     validation_record_id: Optional[str] = Form(None)
 ):
     """
     Create a new complaint with automatic officer assignment.
     
+    The image is either uploaded as `image`, or referenced by the
+    `upload_token` returned by /api/validate-image (no second upload).
+    
     Flow:
-    1. Save image to permanent storage
+    1. Save image to permanent storage (or claim the validated one)
     2. Assign officer based on ward + department
     3. Create complaint in MongoDB
     4. Return complaint ID + officer details
@@ -989,81 +1088,121 @@ async def create_complaint(
         logger.info(f"Category: {category}, Severity: {severity}")
         logger.info(f"Ward: {ward}, Location: {location}")
         
-        # STEP 1: Save image to permanent storage
-        file_ext = image.filename.split(".")[-1].lower()
-        complaint_id = generate_issue_id()  # Reuse existing function
-        image_filename = f"{complaint_id}_{uuid.uuid4().hex[:8]}.{file_ext}"
-        
-        # Create complaints directory if it doesn't exist
-        complaints_dir = UPLOAD_DIR / "complaints"
-        complaints_dir.mkdir(parents=True, exist_ok=True)
-        
-        image_path = complaints_dir / image_filename
-        
-        # Save image
-        with open(image_path, "wb") as buffer:
-            content = await image.read()
-            buffer.write(content)
-        
-        image_url = f"/uploads/complaints/{image_filename}"
-        logger.info(f"✅ Image saved: {image_url}")
-        
-        # STEP 2: Assign officer based on ward + department
-        officer_id = officer_routing.assign_officer(ward, category)
-        
-        assigned_officer_data = None
-        needs_manual_routing = False
-        status = "pending"
+        # STEP 1: Save image to permanent (content-addressed) storage, or
+        # take over the image stored at validation
+        token = None
+        if upload_token:
+            token = await upload_token_service.redeem(db, upload_token)
+            if not token:
+                raise HTTPException(
+                    status_code=400,
+                    detail="Upload token is invalid or expired. Please upload the image again."
+                )
+            stored_image = upload_token_service.stored_blob(token)
+            validation_record_id = validation_record_id or token.get("validation_id")
+            logger.info(f"✅ Image from validation: {stored_image.url}")
+        elif image is not None:
+            file_ext = image.filename.split(".")[-1].lower()
+            stored_image = await storage_service.put_upload(db, image, file_ext)
+            logger.info(f"✅ Image saved: {stored_image.url}{'' if stored_image.created else ' (deduplicated)'}")
+            derivatives.schedule(stored_image)
+        else:
+            raise HTTPException(status_code=400, detail="Either image or upload_token is required")
         
-        if officer_id:
-            # Fetch officer details from MongoDB
-            officer_details = await officer_routing.get_officer_details(db, officer_id)
+        # A failure before the complaint is stored hands the image back:
+        # the token stays redeemable for a retry, and a fresh upload's
+        # blob reference is released instead of leaking
+        try:
+            complaint_id = await generate_issue_id()  # Reuse existing function
+            image_url = stored_image.url
+        
+            # STEP 2: Assign officer based on ward + department, with the ward
+            # taken from the coordinates when they fall inside a known boundary
+            declared_ward = ward
+            resolved_ward = ward_service.resolve_ward(latitude, longitude)
+            ward_mismatch = resolved_ward is not None and resolved_ward != declared_ward
+            if resolved_ward is not None:
+                ward = resolved_ward
+            if ward_mismatch:
+                logger.warning(f"⚠️ Declared ward {declared_ward} but coordinates are in ward {resolved_ward}")
+        
+            routing = officer_routing.route(ward, category)
+            officer_id = routing.officer_id
+        
+            assigned_officer_data = None
+            needs_manual_routing = False
+            status = "pending"
+        
+            if officer_id:
+                # Fetch officer details from MongoDB
+                officer_details = await officer_routing.get_officer_details(db, officer_id)
             
-            if officer_details:
-                assigned_officer_data = AssignedOfficer(
-                    officer_id=officer_details["officer_id"],
-                    name=officer_details["name"],
-                    title=officer_details["title"],
-                    department=officer_details["department"],
-                    ward=officer_details.get("ward")
-                )
-                status = "assigned"
-                logger.info(f"✅ Officer assigned: {officer_details['name']} ({officer_details['title']})")
+                if officer_details:
+                    assigned_officer_data = AssignedOfficer(
+                        officer_id=officer_details["officer_id"],
+                        name=officer_details["name"],
+                        title=officer_details["title"],
+                        department=officer_details["department"],
+                        ward=officer_details.get("ward")
+                    )
+                    status = "assigned"
+                    logger.info(f"✅ Officer assigned: {officer_details['name']} ({officer_details['title']})")
+                else:
+                    logger.warning(f"⚠️ Officer ID {officer_id} not found in database")
+                    needs_manual_routing = True
             else:
-                logger.warning(f"⚠️ Officer ID {officer_id} not found in database")
+                logger.warning(f"⚠️ No officer found for Ward {ward}, Category {category}")
                 needs_manual_routing = True
-        else:
-            logger.warning(f"⚠️ No officer found for Ward {ward}, Category {category}")
-            needs_manual_routing = True
-            status = "unassigned"
-        
-        # STEP 3: Create complaint in MongoDB
-        complaint_doc = {
-            "complaint_id": complaint_id,
-            "citizen": {
-                "name": citizen_name,
-                "phone": citizen_phone
-            },
-            "category": category,
-            "severity": severity,
-            "description": description,
-            "location": {
-                "lat": latitude,
-                "lng": longitude,
-                "address": location,
-                "ward": ward
-            },
-            "image_url": image_url,
-            "assigned_officer": assigned_officer_data.dict() if assigned_officer_data else None,
-            "status": status,
-            "needs_manual_routing": needs_manual_routing,
-            "validation_record_id": validation_record_id,
-            "created_at": datetime.utcnow(),
-            "updated_at": datetime.utcnow()
-        }
+                status = "unassigned"
+        
+            # STEP 3: Create complaint in MongoDB
+            now = datetime.utcnow()
+            officer_deadline = sla_service.officer_deadline(severity, now) if assigned_officer_data else None
+            complaint_doc = {
+                "complaint_id": complaint_id,
+                "citizen": {
+                    "name": citizen_name,
+                    "phone": citizen_phone
+                },
+                "category": category,
+                "severity": severity,
+                "description": description,
+                "location": {
+                    "lat": latitude,
+                    "lng": longitude,
+                    "address": location,
+                    "ward": ward,
+                    "declared_ward": declared_ward,
+                    "ward_source": "boundary" if resolved_ward is not None else "declared"
+                },
+                "image_url": image_url,
+                "image_sha256": stored_image.sha256,
+                "assigned_officer": assigned_officer_data.dict() if assigned_officer_data else None,
+                "status": status,
+                "needs_manual_routing": needs_manual_routing,
+                "routing_tier": routing.tier,
+                "validation_record_id": validation_record_id,
+                "officer_deadline": officer_deadline,
+                "created_at": now,
+                "updated_at": now
+            }
+        
+            result = await db.complaints.insert_one(complaint_doc)
+            logger.info(f"✅ Complaint created: {complaint_id} (MongoDB ID: {result.inserted_id})")
+        except Exception:
+            await _return_unused_image(token, stored_image)
+            raise
         
-        result = await db.complaints.insert_one(complaint_doc)
-        logger.info(f"✅ Complaint created: {complaint_id} (MongoDB ID: {result.inserted_id})")
+        if validation_record_id:
+            await db.image_validations.update_one(
+                {"validation_id": validation_record_id}, {"$set": {"complaint_id": complaint_id}}
+            )
+        if assigned_officer_data:
+            workload.on_transition(
+                None, status, officer_id=assigned_officer_data.officer_id, severity=severity
+            )
+        if officer_deadline:
+            sla_service.sla_engine.schedule(sla_service.OFFICER_RESOLUTION, complaint_id, officer_deadline)
         
         # STEP 4: Prepare response
         response_message = f"Complaint {complaint_id} created successfully"
@@ -1085,9 +1224,14 @@ async def create_complaint(
                 "ward": assigned_officer_data.ward
             } if assigned_officer_data else None,
             status=status,
-            message=response_message
+            message=response_message,
+            ward=ward,
+            declared_ward=declared_ward,
+            ward_mismatch=ward_mismatch
         )
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Complaint creation failed: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Failed to create complaint: {str(e)}")
@@ -1108,7 +1252,8 @@ async def officer_login(
     logger.info(f"Officer login attempt: {officer_id}")
     
     # Find officer
-    officer = await db.officers.find_one({"officer_id": officer_id})
+    await directory.ensure_fresh(db)
+    officer = directory.officer(officer_id)
     
     if not officer:
         raise HTTPException(status_code=404, detail="Officer not found")
@@ -1134,29 +1279,38 @@ async def officer_login(
     }
 
 @api_router.get("/officer/complaints")
-async def get_officer_complaints(officer_id: str = Query(...)):
+async def get_officer_complaints(
+    officer_id: str = Query(...),
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None)
+):
     """
-    Get all complaints assigned to a specific officer.
+    Get complaints assigned to a specific officer, newest first.
+    Pass the returned next_cursor as `cursor` to fetch the next page.
     """
     logger.info(f"Fetching complaints for officer: {officer_id}")
     
     # Find complaints assigned to this officer
-    cursor = db.complaints.find(
-        {"assigned_officer.officer_id": officer_id}
-    ).sort("created_at", -1)
-    
-    complaints = await cursor.to_list(length=100)
+    try:
+        complaints, next_cursor = await fetch_page(
+            db.complaints, {"assigned_officer.officer_id": officer_id}, "created_at", DESCENDING,
+            limit=limit or DEFAULT_PAGE_SIZE, cursor=cursor
+        )
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
-    # Convert ObjectId to string
+    # Convert ObjectId to string; list rows link thumbnails, not originals
     for c in complaints:
         c["_id"] = str(c["_id"])
+        derivative_service.add_complaint_urls(c)
     
     logger.info(f"Found {len(complaints)} complaints for {officer_id}")
     
     return {
         "officer_id": officer_id,
-        "total": len(complaints),
-        "complaints": complaints
+        "count": len(complaints),
+        "complaints": complaints,
+        "next_cursor": next_cursor
     }
 
 @api_router.get("/complaints/{complaint_id}")
@@ -1176,45 +1330,88 @@ async def get_complaint_detail(complaint_id: str):
     
     return complaint
 
+# Complaints in these statuses are already with a supervisor or closed
+NON_ESCALATABLE_COMPLAINT_STATUSES = ["awaiting_supervisor", "escalated_hod", "resolved"]
+# Statuses an officer can move a complaint out of (the rest change through
+# escalation and supervisor review)
+OFFICER_UPDATABLE_COMPLAINT_STATUSES = ["pending", "unassigned", "assigned", "in_progress"]
+
+async def _complaint_transition_error(complaint_id: str, action: str) -> HTTPException:
+    """
+    Explain why a status-guarded complaint update matched nothing:
+    404 if the complaint does not exist, 409 if its status forbids the action
+    """
+    current = await db.complaints.find_one({"complaint_id": complaint_id}, {"_id": 0, "status": 1})
+    if not current:
+        return HTTPException(status_code=404, detail="Complaint not found")
+    return HTTPException(
+        status_code=409,
+        detail=f"Cannot {action}: complaint is currently '{current.get('status')}'"
+    )
+
 @api_router.put("/complaints/{complaint_id}/status")
 async def update_complaint_status(
     complaint_id: str,
     status: str = Form(...),
-    notes: Optional[str] = Form(None)
+    notes: Optional[str] = Form(None),
+    expected_status: Optional[str] = Form(None)
 ):
     """
     Update complaint status.
+    
+    Applied atomically and only from an officer-updatable status
+    (OFFICER_UPDATABLE_COMPLAINT_STATUSES) different from the new one, so of
+    two officers making the same change only the first succeeds; the other
+    gets 409. Pass expected_status (the status the officer last saw) to also
+    reject the update if someone else changed the complaint meanwhile.
+    
+    The write returns the document as it was before the update (BEFORE, not
+    AFTER) because workload.on_transition needs the previous status and
+    assignees; the response is built from the values just written.
     """
     logger.info(f"Updating complaint {complaint_id} status to: {status}")
     
-    result = await db.complaints.update_one(
-        {"complaint_id": complaint_id},
+    now = datetime.utcnow()
+    status_guard = {"$in": OFFICER_UPDATABLE_COMPLAINT_STATUSES, "$ne": status}
+    if expected_status:
+        status_guard["$eq"] = expected_status
+    query = {"complaint_id": complaint_id, "status": status_guard}
+    
+    complaint = await db.complaints.find_one_and_update(
+        query,
         {
             "$set": {
                 "status": status,
-                "updated_at": datetime.utcnow()
+                "updated_at": now
             },
             "$push": {
                 "status_history": {
                     "status": status,
                     "notes": notes,
-                    "timestamp": datetime.utcnow()
+                    "timestamp": now
                 }
             }
-        }
+        },
+        projection=TRANSITION_PROJECTION,
+        return_document=ReturnDocument.BEFORE
     )
     
-    if result.matched_count == 0:
-        raise HTTPException(status_code=404, detail="Complaint not found")
+    if complaint is None:
+        raise await _complaint_transition_error(complaint_id, f"change status to '{status}'")
+    workload.on_transition(complaint, status)
     
-    return {"success": True, "message": f"Status updated to {status}"}
+    return {
+        "success": True,
+        "message": f"Status updated to {status}",
+        "complaint": {"complaint_id": complaint_id, "status": status, "updated_at": now}
+    }
 
 # Issue Management
 @api_router.post("/issues", response_model=Issue)
 @api_router.post("/report", response_model=Issue) # Alias for compatibility
 async def create_issue(issue_data: IssueCreate):
     """Create a new civic issue"""
-    issue_id = generate_issue_id()
+    issue_id = await generate_issue_id()
     department = get_department_for_category(issue_data.category)
     
     now = datetime.utcnow()
@@ -1229,10 +1426,12 @@ async def create_issue(issue_data: IssueCreate):
         "timeline": [
             {"status": "Reported", "date": now},
             {"status": "Being verified", "date": now}
-        ]
+        ],
+        "verifications": verification_service.empty_counts()
     })
     
     await db.issues.insert_one(issue_dict)
+    stats_service.stats_cache.invalidate()
     logger.info(f"Created issue: {issue_id}")
     
     return Issue(**issue_dict)
@@ -1273,21 +1472,19 @@ async def upload_issue_photos(issue_id: str, photos: List[UploadFile] = File(...
             temp_filename = f"temp_{uuid.uuid4().hex}.{file_ext}"
             temp_file_path = UPLOAD_DIR / temp_filename
             
-            with open(temp_file_path, "wb") as buffer:
-                content = await photo.read()
-                size_mb = len(content) / (1024 * 1024)
-                max_size_mb = int(os.environ.get("MAX_IMAGE_SIZE_MB", "10"))
-                
-                if size_mb > max_size_mb:
-                    temp_file_path.unlink() if temp_file_path.exists() else None
-                    validation_results.append({
-                        "filename": photo.filename,
-                        "status": "rejected",
-                        "reason": f"File too large ({size_mb:.2f}MB > {max_size_mb}MB)"
-                    })
-                    continue
-                
-                buffer.write(content)
+            content = await photo.read()
+            size_mb = len(content) / (1024 * 1024)
+            max_size_mb = int(os.environ.get("MAX_IMAGE_SIZE_MB", "10"))
+            
+            if size_mb > max_size_mb:
+                validation_results.append({
+                    "filename": photo.filename,
+                    "status": "rejected",
+                    "reason": f"File too large ({size_mb:.2f}MB > {max_size_mb}MB)"
+                })
+                continue
+            
+            await asyncio.to_thread(temp_file_path.write_bytes, content)
             
             logger.info(f"Validating photo: {photo.filename} for issue {issue_id}")
             
@@ -1296,17 +1493,17 @@ async def upload_issue_photos(issue_id: str, photos: List[UploadFile] = File(...
             ai_detection = sightengine_service.detect_ai_generated(str(temp_file_path))
             
             # EXIF Analysis
-            image_gps = exif_service.extract_gps_coordinates(str(temp_file_path))
-            image_timestamp = exif_service.extract_timestamp(str(temp_file_path))
-            camera_info = exif_service.extract_camera_info(str(temp_file_path))
+            exif_record = exif_service.extract_all(content)
+            image_gps = exif_record.gps
+            image_timestamp = exif_record.timestamp
+            camera_info = exif_record.camera_info
             
             location_valid = False
             distance_km = None
             
             if image_gps and user_lat is not None and user_lng is not None:
                 user_coords = (user_lat, user_lng)
-                location_valid = exif_service.validate_location(image_gps, user_coords)
-                distance_km = exif_service.calculate_distance(image_gps, user_coords)
+                location_valid, distance_km = exif_service.check_location(image_gps, user_coords)
             
             exif_data = {
                 "has_gps": image_gps is not None,
@@ -1331,15 +1528,12 @@ async def upload_issue_photos(issue_id: str, photos: List[UploadFile] = File(...
             # Image Source Forensics (AFTER AI detection, BEFORE issue classification)
             logger.info(f"Running forensics classification for {photo.filename}")
             try:
-                from utils.imageForensics import ImageSourceForensics
+                from utils.imageForensics import default_forensics
                 
-                # Read image buffer for forensics
-                with open(temp_file_path, 'rb') as f:
-                    image_buffer = f.read()
-                
-                # Run complete forensics classification
-                forensics = ImageSourceForensics()
-                classification_result = forensics.classify_image(image_buffer, str(temp_file_path), photo.filename)
+                # Run complete forensics classification on the uploaded bytes
+                classification_result = default_forensics.classify_image(
+                    content, str(temp_file_path), photo.filename, exif_record=exif_record
+                )
                 
                 # Create forensics analysis for backward compatibility
                 source_mapping = {
@@ -1432,21 +1626,18 @@ async def upload_issue_photos(issue_id: str, photos: List[UploadFile] = File(...
                 logger.warning(f"Photo rejected: {photo.filename} - {message}")
                 continue
             
-            # STEP 5: Photo accepted - move to permanent location
-            unique_filename = f"{issue_id}_{uuid.uuid4().hex[:8]}.{file_ext}"
-            final_file_path = UPLOAD_DIR / unique_filename
-            
-            # Rename temp file to final
-            temp_file_path.rename(final_file_path)
+            # STEP 5: Photo accepted - move into content-addressed storage
+            stored_photo = await storage_service.put_file(db, temp_file_path, file_ext)
+            derivatives.schedule(stored_photo)
             
-            photo_url = f"{backend_url}/uploads/{unique_filename}"
+            photo_url = f"{backend_url}{stored_photo.url}"
             photo_urls.append(photo_url)
             
             # Store hash for future duplicate detection
             await hash_service.store_hash(
                 issue_id=issue_id,
                 phash=image_phash,
-                image_path=str(final_file_path),
+                image_path=stored_photo.key,
                 status="pending"  # Will be updated to 'resolved' when issue is resolved
             )
             
@@ -1496,11 +1687,19 @@ async def upload_issue_photos(issue_id: str, photos: List[UploadFile] = File(...
 
 @api_router.get("/issues", response_model=List[Issue])
 async def get_issues(
+    response: Response,
     status: Optional[str] = Query(None),
     category: Optional[str] = Query(None),
-    verification: Optional[str] = Query(None)
+    verification: Optional[str] = Query(None),
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None)
 ):
-    """Get all issues with optional filters"""
+    """
+    Get issues with optional filters, newest first.
+    
+    Paginated by (reported_at, _id): when more issues exist, the
+    X-Next-Cursor response header carries the cursor for the next page.
+    """
     query = {}
     
     if status and status != "all":
@@ -1509,36 +1708,26 @@ async def get_issues(
     if category and category != "all":
         query["category"] = category
     
-    issues = await db.issues.find(query).sort("reported_at", -1).to_list(1000)
+    # Verified/unverified is an indexed query on the denormalized counters
+    if verification in ("verified", "unverified"):
+        query.update(verification_service.verified_filter(verification == "verified"))
     
-    # Filter by verification if needed
-    if verification and verification != "all":
-        filtered_issues = []
-        for issue in issues:
-            # Get verification stats
-            verifications = await db.verifications.find({"issue_id": issue["id"]}).to_list(1000)
-            yes_count = sum(1 for v in verifications if v["response"] == "yes")
-            
-            if verification == "verified" and yes_count >= 3:
-                filtered_issues.append(issue)
-            elif verification == "unverified" and yes_count < 3:
-                filtered_issues.append(issue)
-        
-        issues = filtered_issues
+    try:
+        issues, next_cursor = await fetch_page(
+            db.issues, query, "reported_at", DESCENDING,
+            limit=limit or ISSUES_PAGE_SIZE, cursor=cursor
+        )
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
     
-    # Add verification counts to each issue
-    result_issues = []
     for issue in issues:
-        verifications = await db.verifications.find({"issue_id": issue["id"]}).to_list(1000)
-        issue["verifications"] = {
-            "yes": sum(1 for v in verifications if v["response"] == "yes"),
-            "no": sum(1 for v in verifications if v["response"] == "no"),
-            "not_sure": sum(1 for v in verifications if v["response"] == "not_sure"),
-            "total": len(verifications)
-        }
-        result_issues.append(Issue(**issue))
+        issue["verifications"] = verification_service.counts_of(issue)
+        issue["thumbnails"] = derivative_service.thumbnail_urls(issue.get("photos", []))
     
-    return result_issues
+    return [Issue(**issue) for issue in issues]
 
 @api_router.get("/issues/{issue_id}", response_model=Issue)
 async def get_issue(issue_id: str):
@@ -1548,23 +1737,20 @@ async def get_issue(issue_id: str):
         raise HTTPException(status_code=404, detail="Issue not found")
     
     # Add verification stats
-    verifications = await db.verifications.find({"issue_id": issue_id}).to_list(1000)
-    issue["verifications"] = {
-        "yes": sum(1 for v in verifications if v["response"] == "yes"),
-        "no": sum(1 for v in verifications if v["response"] == "no"),
-        "not_sure": sum(1 for v in verifications if v["response"] == "not_sure"),
-        "total": len(verifications)
-    }
+    issue["verifications"] = verification_service.counts_of(issue)
+    issue["thumbnails"] = derivative_service.thumbnail_urls(issue.get("photos", []))
     
     return Issue(**issue)
 
 @api_router.put("/issues/{issue_id}/status", response_model=Issue)
 async def update_issue_status(issue_id: str, update_data: IssueStatusUpdate):
-    """Update issue status (officer only)"""
-    issue = await db.issues.find_one({"id": issue_id})
-    if not issue:
-        raise HTTPException(status_code=404, detail="Issue not found")
+    """
+    Update issue status (officer only)
     
+    Single atomic write: the status filter makes the transition apply only
+    if the issue is not already in the target status, so concurrent
+    officers cannot both append a timeline entry.
+    """
     now = datetime.utcnow()
     
     # Map status to timeline label
@@ -1576,41 +1762,38 @@ async def update_issue_status(issue_id: str, update_data: IssueStatusUpdate):
         "resolved": "Resolved"
     }
     
-    # Add to timeline if status is changing
-    if issue["status"] != update_data.status:
-        timeline = issue.get("timeline", [])
-        timeline.append({
-            "status": status_label_map.get(update_data.status, update_data.status),
-            "date": now
-        })
-        
-        await db.issues.update_one(
-            {"id": issue_id},
-            {
-                "$set": {
-                    "status": update_data.status,
-                    "updated_at": now,
-                    "timeline": timeline
+    updated_issue = await db.issues.find_one_and_update(
+        {"id": issue_id, "status": {"$ne": update_data.status}},
+        {
+            "$set": {
+                "status": update_data.status,
+                "updated_at": now
+            },
+            "$push": {
+                "timeline": {
+                    "status": status_label_map.get(update_data.status, update_data.status),
+                    "date": now
                 }
             }
-        )
+        },
+        return_document=ReturnDocument.AFTER
+    )
+    
+    if updated_issue:
+        stats_service.stats_cache.invalidate()
+    else:
+        # Unchanged status (no-op) or unknown issue
+        updated_issue = await db.issues.find_one({"id": issue_id})
+        if not updated_issue:
+            raise HTTPException(status_code=404, detail="Issue not found")
     
     # Update hash status if issue is being resolved
     if update_data.status == "resolved":
         await hash_service.update_hash_status(issue_id, "resolved")
         logger.info(f"Updated hash status to 'resolved' for issue {issue_id}")
     
-    # Get updated issue
-    updated_issue = await db.issues.find_one({"id": issue_id})
-    
     # Add verification stats
-    verifications = await db.verifications.find({"issue_id": issue_id}).to_list(1000)
-    updated_issue["verifications"] = {
-        "yes": sum(1 for v in verifications if v["response"] == "yes"),
-        "no": sum(1 for v in verifications if v["response"] == "no"),
-        "not_sure": sum(1 for v in verifications if v["response"] == "not_sure"),
-        "total": len(verifications)
-    }
+    updated_issue["verifications"] = verification_service.counts_of(updated_issue)
     
     logger.info(f"Updated issue {issue_id} status to {update_data.status}")
     return Issue(**updated_issue)
@@ -1634,6 +1817,10 @@ async def create_verification(verification_data: VerificationCreate):
     })
     
     await db.verifications.insert_one(verification_dict)
+    await verification_service.record_verification(
+        db, verification_data.issue_id, verification_dict["response"]
+    )
+    stats_service.stats_cache.invalidate()
     logger.info(f"Added verification for issue {verification_data.issue_id}")
     
     return Verification(**verification_dict)
@@ -1641,57 +1828,16 @@ async def create_verification(verification_data: VerificationCreate):
 @api_router.get("/issues/{issue_id}/verifications", response_model=VerificationStats)
 async def get_issue_verifications(issue_id: str):
     """Get verification stats for an issue"""
-    verifications = await db.verifications.find({"issue_id": issue_id}).to_list(1000)
-    
-    stats = VerificationStats(
-        yes=sum(1 for v in verifications if v["response"] == "yes"),
-        no=sum(1 for v in verifications if v["response"] == "no"),
-        not_sure=sum(1 for v in verifications if v["response"] == "not_sure"),
-        total=len(verifications)
-    )
+    issue = await db.issues.find_one({"id": issue_id}, {"_id": 0, "verifications": 1})
     
-    return stats
+    return VerificationStats(**verification_service.counts_of(issue or {}))
 
 # Statistics
 @api_router.get("/stats", response_model=Stats)
 async def get_stats():
-    """Get dashboard statistics"""
-    today = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
-    week_ago = datetime.utcnow() - timedelta(days=7)
-    
-    # New today
-    new_today = await db.issues.count_documents({
-        "reported_at": {"$gte": today}
-    })
-    
-    # In verification
-    verifying = await db.issues.count_documents({"status": "verifying"})
-    
-    # In progress
-    in_progress = await db.issues.count_documents({"status": "in_progress"})
-    
-    # Resolved this week
-    resolved_this_week = await db.issues.count_documents({
-        "status": "resolved",
-        "updated_at": {"$gte": week_ago}
-    })
-    
-    # Unverified (no verifications yet)
-    # This is inefficient for large datasets but works for now; can be optimized with aggregation
-    all_issues = await db.issues.find().to_list(1000)
-    unverified = 0
-    for issue in all_issues:
-        verification_count = await db.verifications.count_documents({"issue_id": issue["id"]})
-        if verification_count == 0:
-            unverified += 1
-    
-    return Stats(
-        new_today=new_today,
-        verifying=verifying,
-        in_progress=in_progress,
-        resolved_this_week=resolved_this_week,
-        unverified=unverified
-    )
+    """Get dashboard statistics (materialized, see stats_service)"""
+    stats = await stats_service.stats_cache.get(db)
+    return Stats(**stats)
 
 # Include the router in the main app
 app.include_router(api_router)
@@ -1702,23 +1848,28 @@ app.add_middleware(
     allow_origins=["http://localhost:3000", "http://127.0.0.1:3000"],
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
 # ------------------------------------------------------------------
 # PHASE 4: SUPERVISOR & ESCALATION ENDPOINTS
 # ------------------------------------------------------------------
 
+@app.post("/api/directory/refresh")
+async def refresh_directory():
+    """Reload the in-memory officer/supervisor directory (e.g. after seeding)"""
+    counts = await directory.load(db)
+    return {"success": True, **counts}
+
 @app.post("/api/supervisor/login")
 async def supervisor_login(credentials: dict):
     supervisor_id = credentials.get("supervisor_id")
     password = credentials.get("password")
     
-    supervisor = await db.supervisors.find_one({
-        "supervisor_id": supervisor_id,
-        "password": password
-    })
+    await directory.ensure_fresh(db)
+    supervisor = directory.supervisor(supervisor_id)
     
-    if not supervisor:
+    if not supervisor or supervisor.get("password") != password:
         raise HTTPException(status_code=401, detail="Invalid credentials")
         
     return {
@@ -1734,76 +1885,33 @@ async def supervisor_login(credentials: dict):
 @app.get("/api/supervisor/complaints")
 async def get_supervisor_complaints(
     supervisor_id: str,
-    filter: str = Query("pending", enum=["pending", "overdue", "all"])
+    filter: str = Query("pending", enum=list(supervisor_service.DASHBOARD_FILTERS)),
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None)
 ):
     # Verify supervisor exists
-    supervisor = await db.supervisors.find_one({"supervisor_id": supervisor_id})
+    await directory.ensure_fresh(db)
+    supervisor = directory.supervisor(supervisor_id)
     if not supervisor:
         raise HTTPException(status_code=404, detail="Supervisor not found")
     
-    # Base query: Complaints escalated to this supervisor
-    query = {"supervisor_id": supervisor_id}
-    
-    # Get current time for deadline checks
-    now = datetime.utcnow()
-    
-    # Calculate stats first (for dashboard cards)
-    all_assigned = await db.complaints.find({"supervisor_id": supervisor_id}).to_list(length=1000)
-    
-    pending_count = 0
-    overdue_count = 0
-    new_today_count = 0
+    # Dashboard cards and the filtered list (earliest deadline first,
+    # paginated by (supervisor_deadline, _id)) in one aggregation
+    try:
+        stats, complaints, next_cursor = await supervisor_service.get_dashboard(
+            db, supervisor_id, filter, clamp_page_size(limit), cursor
+        )
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
-    for c in all_assigned:
-        s_status = c.get("supervisor_status")
-        deadline = c.get("supervisor_deadline")
-        
-        # Pending logic: Status is PENDING or None
-        if not s_status or s_status == "PENDING":
-            pending_count += 1
-            
-            # Overdue logic
-            # Handle string vs datetime mismatch if any
-            if isinstance(deadline, str):
-                try:
-                    deadline = datetime.fromisoformat(deadline)
-                except ValueError:
-                    pass
-            
-            if isinstance(deadline, datetime) and now > deadline:
-                overdue_count += 1
-        
-        # New today logic (escalated today)
-        timeline = c.get("timeline", [])
-        for event in timeline:
-            if event.get("action") == "sent_to_supervisor":
-                ts = event.get("timestamp") or event.get("datetime")
-                if isinstance(ts, str):
-                    try:
-                        ts = datetime.fromisoformat(ts)
-                    except ValueError:
-                        continue
-                if isinstance(ts, datetime) and (now - ts).days < 1:
-                    new_today_count += 1
-                    break
-    
-    # Filter for the list
-    if filter == "pending":
-        query["$or"] = [{"supervisor_status": "PENDING"}, {"supervisor_status": None}]
-    elif filter == "overdue":
-        query["$or"] = [{"supervisor_status": "PENDING"}, {"supervisor_status": None}]
-        query["supervisor_deadline"] = {"$lt": now}
-    # "all" includes everything (resolved etc)
-    
-    complaints = await db.complaints.find(query).sort("supervisor_deadline", 1).to_list(length=100)
+    for c in complaints:
+        c["_id"] = str(c["_id"])
+        derivative_service.add_complaint_urls(c)
     
     return {
-        "stats": {
-            "new_today": new_today_count,
-            "pending": pending_count,
-            "overdue": overdue_count
-        },
-        "complaints": complaints
+        "stats": stats,
+        "complaints": complaints,
+        "next_cursor": next_cursor
     }
 
 @app.post("/api/complaints/{complaint_id}/escalate")
@@ -1826,12 +1934,14 @@ async def escalate_complaint(complaint_id: str, data: dict):
         # Using category as department for now
         department = complaint.get("category", "").lower()
         
-        # Try to find supervisor for this department
-        supervisor = await db.supervisors.find_one({"department": department})
-        
-        if not supervisor:
-            # Fallback to any available supervisor
-            supervisor = await db.supervisors.find_one({})
+        # Least-loaded supervisor of this department, falling back to any
+        # available supervisor
+        await directory.ensure_fresh(db)
+        candidates = directory.supervisors_in_department(department) or directory.all_supervisors()
+        supervisor_id = workload.least_loaded(
+            workload_service.SUPERVISOR, [s["supervisor_id"] for s in candidates]
+        )
+        supervisor = directory.supervisor(supervisor_id) if supervisor_id else None
             
         if not supervisor:
             # No supervisors in system - return helpful error
@@ -1843,13 +1953,12 @@ async def escalate_complaint(complaint_id: str, data: dict):
             }
         
         # Calculate deadline
-        is_high_severity = complaint.get("severity", "Low") in ["High", "Critical"]
-        hours = 24 if is_high_severity else 72
-        deadline = datetime.utcnow() + timedelta(hours=hours)
+        now = datetime.utcnow()
+        deadline = sla_service.supervisor_deadline(complaint.get("severity", "Low"), now)
         
         # Update timeline
         new_event = {
-            "timestamp": datetime.utcnow(),
+            "timestamp": now,
             "actor": data.get("officer_name", "Officer"),
             "role": "officer",
             "action": "sent_to_supervisor",
@@ -1861,16 +1970,25 @@ async def escalate_complaint(complaint_id: str, data: dict):
             "supervisor_id": supervisor["supervisor_id"],
             "supervisor_status": "PENDING",
             "supervisor_deadline": deadline,
-            "updated_at": datetime.utcnow()
+            "escalated_at": now,
+            "updated_at": now
         }
         
-        await db.complaints.update_one(
-            {"complaint_id": complaint_id},
+        # Guarded on status so a complaint is escalated only once. The
+        # pre-update document (BEFORE) feeds workload.on_transition
+        escalated = await db.complaints.find_one_and_update(
+            {"complaint_id": complaint_id, "status": {"$nin": NON_ESCALATABLE_COMPLAINT_STATUSES}},
             {
                 "$set": update_data,
                 "$push": {"timeline": new_event}
-            }
+            },
+            projection=TRANSITION_PROJECTION,
+            return_document=ReturnDocument.BEFORE
         )
+        if escalated is None:
+            raise await _complaint_transition_error(complaint_id, "escalate")
+        workload.on_transition(escalated, "awaiting_supervisor", supervisor_id=supervisor["supervisor_id"])
+        sla_service.sla_engine.schedule(sla_service.SUPERVISOR_REVIEW, complaint_id, deadline)
         
         return {"success": True, "deadline": deadline.isoformat(), "supervisor": supervisor["name"]}
         
@@ -1929,12 +2047,19 @@ async def review_complaint(complaint_id: str, review_data: dict):
         "details": notes
     }
     
-    await db.complaints.update_one(
-        {"complaint_id": complaint_id},
+    # Only complaints still waiting on the supervisor can be reviewed. The
+    # pre-update document (BEFORE) feeds workload.on_transition
+    reviewed = await db.complaints.find_one_and_update(
+        {"complaint_id": complaint_id, "status": "awaiting_supervisor"},
         {
             "$set": update_data,
             "$push": {"timeline": new_event}
-        }
+        },
+        projection=TRANSITION_PROJECTION,
+        return_document=ReturnDocument.BEFORE
     )
+    if reviewed is None:
+        raise await _complaint_transition_error(complaint_id, f"{action.lower()} review")
+    workload.on_transition(reviewed, new_status)
     
     return {"success": True, "new_status": new_status}
\ No newline at end of file
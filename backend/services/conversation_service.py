@@ -0,0 +1,179 @@
+"""
+Conversation Service - Bounded Chat History Store
+
+Chat histories for /api/chat, keyed by conversation ID, with:
+- a per-conversation TTL (CONVERSATION_TTL_SECONDS since the last message)
+- at most CONVERSATION_MAX_MESSAGES messages kept per conversation
+
+Backends (CONVERSATION_BACKEND):
+- memory (default): in-process LRU capped at CONVERSATION_MEMORY_BUDGET_BYTES
+  of serialized history; least recently used conversations are evicted
+  first. Conversations are local to the worker.
+- mongo: `conversations` collection with a TTL index on expires_at, shared
+  by all workers; nothing is held in process memory.
+
+stats() reports size and eviction counters for the metrics endpoint.
+"""
+
+import os
+import json
+import time
+import logging
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+CONVERSATION_BACKEND = os.environ.get("CONVERSATION_BACKEND", "memory").lower()
+CONVERSATION_TTL_SECONDS = int(os.environ.get("CONVERSATION_TTL_SECONDS", "7200"))
+CONVERSATION_MAX_MESSAGES = int(os.environ.get("CONVERSATION_MAX_MESSAGES", "50"))
+CONVERSATION_MEMORY_BUDGET_BYTES = int(os.environ.get("CONVERSATION_MEMORY_BUDGET_BYTES", str(32 * 1024 * 1024)))
+# How often the memory backend scans for expired conversations
+PURGE_INTERVAL_SECONDS = 60
+
+
+def _trim(history: List[dict]) -> List[dict]:
+    return history[-CONVERSATION_MAX_MESSAGES:] if CONVERSATION_MAX_MESSAGES > 0 else history
+
+
+def history_size(history: List[dict]) -> int:
+    """Approximate memory cost of a history: its serialized length"""
+    return len(json.dumps(history, default=str))
+
+
+@dataclass
+class _Entry:
+    history: List[dict]
+    size: int
+    expires_at: float  # time.monotonic()
+
+
+class MemoryConversationStore:
+    """Per-worker LRU with TTL and a byte budget"""
+
+    backend = "memory"
+
+    def __init__(self, ttl_seconds: int = CONVERSATION_TTL_SECONDS,
+                 budget_bytes: int = CONVERSATION_MEMORY_BUDGET_BYTES):
+        self.ttl_seconds = ttl_seconds
+        self.budget_bytes = budget_bytes
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._bytes = 0
+        self._next_purge = time.monotonic() + PURGE_INTERVAL_SECONDS
+        self.evictions = 0
+        self.expirations = 0
+
+    def _remove(self, conv_id: str) -> _Entry:
+        entry = self._entries.pop(conv_id)
+        self._bytes -= entry.size
+        return entry
+
+    def _purge_expired(self, now: float):
+        expired = [conv_id for conv_id, entry in self._entries.items() if entry.expires_at <= now]
+        for conv_id in expired:
+            self._remove(conv_id)
+        self.expirations += len(expired)
+        self._next_purge = now + PURGE_INTERVAL_SECONDS
+
+    async def get(self, db, conv_id: str) -> Optional[List[dict]]:
+        entry = self._entries.get(conv_id)
+        if entry is None:
+            return None
+        if entry.expires_at <= time.monotonic():
+            self._remove(conv_id)
+            self.expirations += 1
+            return None
+        self._entries.move_to_end(conv_id)
+        return list(entry.history)
+
+    async def put(self, db, conv_id: str, history: List[dict]):
+        now = time.monotonic()
+        if now >= self._next_purge:
+            self._purge_expired(now)
+
+        history = _trim(history)
+        if conv_id in self._entries:
+            self._remove(conv_id)
+        entry = _Entry(history, history_size(history), now + self.ttl_seconds)
+        self._entries[conv_id] = entry
+        self._bytes += entry.size
+
+        # Least recently used first; a single oversized conversation is
+        # still kept so the current chat keeps its context
+        while self._bytes > self.budget_bytes and len(self._entries) > 1:
+            self._remove(next(iter(self._entries)))
+            self.evictions += 1
+
+    async def stats(self, db) -> Dict:
+        return {
+            "backend": self.backend,
+            "conversations": len(self._entries),
+            "bytes": self._bytes,
+            "budget_bytes": self.budget_bytes,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+
+class MongoConversationStore:
+    """Shared across workers; expiry by a TTL index on expires_at"""
+
+    backend = "mongo"
+
+    def __init__(self, ttl_seconds: int = CONVERSATION_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+
+    async def get(self, db, conv_id: str) -> Optional[List[dict]]:
+        # The TTL monitor runs about once a minute, so filter expired ones too
+        doc = await db.conversations.find_one(
+            {"_id": conv_id, "expires_at": {"$gt": datetime.utcnow()}}, {"history": 1}
+        )
+        return doc["history"] if doc else None
+
+    async def put(self, db, conv_id: str, history: List[dict]):
+        now = datetime.utcnow()
+        await db.conversations.update_one(
+            {"_id": conv_id},
+            {"$set": {
+                "history": _trim(history),
+                "updated_at": now,
+                "expires_at": now + timedelta(seconds=self.ttl_seconds)
+            }},
+            upsert=True
+        )
+
+    async def stats(self, db) -> Dict:
+        stats = {"backend": self.backend, "conversations": await db.conversations.estimated_document_count()}
+        try:
+            coll_stats = await db.command("collStats", "conversations")
+            stats["bytes"] = coll_stats.get("size", 0)
+        except Exception as e:
+            logger.debug(f"collStats unavailable: {str(e)}")
+        return stats
+
+
+def from_environment():
+    if CONVERSATION_BACKEND == "mongo":
+        return MongoConversationStore()
+    if CONVERSATION_BACKEND != "memory":
+        logger.warning(f"Unknown CONVERSATION_BACKEND '{CONVERSATION_BACKEND}', using memory")
+    return MemoryConversationStore()
+
+
+# Shared store used by the chat endpoint
+conversation_store = from_environment()
+
+
+async def create_indexes(db):
+    """
+    Create the TTL index for the mongo backend.
+    Should be called during app initialization.
+    """
+    try:
+        await db.conversations.create_index("expires_at", expireAfterSeconds=0)
+        logger.info("Created TTL index on conversations collection")
+    except Exception as e:
+        logger.error(f"Failed to create indexes: {str(e)}")
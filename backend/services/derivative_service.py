@@ -0,0 +1,232 @@
+"""
+Derivative Service - Thumbnails and Previews of Stored Images
+
+Every accepted image gets downscaled derivatives in the storage backend
+next to its blob, rendered on a process pool off the request path:
+
+    thumb     longest side THUMB_SIZE    (dashboard list rows)
+    preview   longest side PREVIEW_SIZE  (detail views)
+
+each as JPEG and WebP, EXIF-orientation corrected and with metadata
+(including GPS) stripped. Names derive from the source's content hash, so
+URLs are known without a database lookup:
+
+    /uploads/blobs/ab/cd/<sha256>.jpg  ->  /uploads/derived/ab/cd/<sha256>-thumb.jpg
+                                           /uploads/derived/ab/cd/<sha256>-thumb.webp
+
+A derivative requested before rendering finished (or deleted since) is
+rendered on demand by the /uploads route.
+"""
+
+import os
+import re
+import uuid
+import shutil
+import asyncio
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+from PIL import Image, ImageOps
+
+from services import storage_service
+from services.storage_service import StoredBlob
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+THUMB_SIZE = int(os.environ.get("THUMB_SIZE", "320"))
+PREVIEW_SIZE = int(os.environ.get("PREVIEW_SIZE", "1280"))
+JPEG_QUALITY = int(os.environ.get("DERIVATIVE_JPEG_QUALITY", "80"))
+WEBP_QUALITY = int(os.environ.get("DERIVATIVE_WEBP_QUALITY", "75"))
+DERIVATIVE_WORKERS = int(os.environ.get("DERIVATIVE_WORKERS", str(min(2, os.cpu_count() or 1))))
+
+THUMB = "thumb"
+PREVIEW = "preview"
+# Largest first: each variant is downscaled from the previous one
+VARIANTS = {PREVIEW: PREVIEW_SIZE, THUMB: THUMB_SIZE}
+FORMATS = {
+    "jpg": ("JPEG", {"quality": JPEG_QUALITY, "optimize": True, "progressive": True}),
+    "webp": ("WEBP", {"quality": WEBP_QUALITY, "method": 4}),
+}
+SOURCE_EXTENSIONS = {"jpg", "png", "webp", "gif", "bmp", "tiff"}
+
+_DERIVED_KEY = re.compile(rf"^{storage_service.DERIVED_PREFIX}/(?:[0-9a-f]+/)*([0-9a-f]{{64}})-(\w+)\.(\w+)$")
+_BLOB_NAME = re.compile(r"^([0-9a-f]{64})\.\w+$")
+
+
+def derivative_key(sha256: str, variant: str, fmt: str = "jpg") -> str:
+    """Relative path of a derivative: derived/ab/cd/<sha256>-<variant>.<fmt>"""
+    return storage_service.shard_key(storage_service.DERIVED_PREFIX, sha256, f"{sha256}-{variant}.{fmt}")
+
+
+def parse_derivative_key(key: str) -> Optional[str]:
+    """Source hash of a derivative path, or None if key is not a known derivative"""
+    match = _DERIVED_KEY.match(key)
+    if not match or match.group(2) not in VARIANTS or match.group(3) not in FORMATS:
+        return None
+    return match.group(1)
+
+
+def webp_variant_key(key: str) -> Optional[str]:
+    """WebP counterpart of a JPEG derivative key, or None"""
+    if not key.endswith(".jpg") or parse_derivative_key(key) is None:
+        return None
+    return key[:-len("jpg")] + "webp"
+
+
+def variant_url(image_url: Optional[str], variant: str = THUMB, fmt: str = "jpg") -> Optional[str]:
+    """
+    URL of a derivative of a blob URL (relative or absolute).
+
+    Returns:
+        str: Derivative URL, or None for images outside the blob store
+    """
+    marker = f"/{storage_service.BLOB_PREFIX}/"
+    if not image_url or marker not in image_url:
+        return None
+    match = _BLOB_NAME.match(image_url.rsplit("/", 1)[-1])
+    if not match:
+        return None
+    base = image_url[:image_url.rindex(marker)]
+    return f"{base}/{derivative_key(match.group(1), variant, fmt)}"
+
+
+def add_complaint_urls(complaint: Dict) -> Dict:
+    """Add thumbnail_url / preview_url to a complaint document for list responses"""
+    image_url = complaint.get("image_url")
+    complaint["thumbnail_url"] = variant_url(image_url, THUMB)
+    complaint["preview_url"] = variant_url(image_url, PREVIEW)
+    return complaint
+
+
+def thumbnail_urls(photo_urls: List[str]) -> List[str]:
+    """Thumbnail per photo URL, falling back to the photo itself for legacy uploads"""
+    return [variant_url(url, THUMB) or url for url in photo_urls]
+
+
+def _flatten(img: Image.Image) -> Image.Image:
+    """RGB image, with any transparency composited onto white"""
+    if img.mode in ("RGBA", "LA") or (img.mode == "P" and "transparency" in img.info):
+        img = img.convert("RGBA")
+        background = Image.new("RGB", img.size, (255, 255, 255))
+        background.paste(img, mask=img.getchannel("A"))
+        return background
+    return img.convert("RGB") if img.mode != "RGB" else img
+
+
+def render_derivatives(source: str, target_dir: str, sha256: str, missing: List[Tuple[str, str]]) -> int:
+    """
+    Render derivatives of one image into target_dir (runs in a pool worker).
+
+    Args:
+        missing: (variant, format) pairs to render
+
+    Returns:
+        int: Number of files written
+    """
+    target = Path(target_dir)
+    written = 0
+    with Image.open(source) as original:
+        # JPEG: decode at the smallest DCT scale still covering the largest variant
+        largest = max(VARIANTS[variant] for variant, _ in missing)
+        original.draft("RGB", (largest, largest))
+        img = _flatten(ImageOps.exif_transpose(original))
+
+        for variant, size in VARIANTS.items():
+            img.thumbnail((size, size), Image.LANCZOS)
+            for fmt, (format_name, options) in FORMATS.items():
+                if (variant, fmt) in missing:
+                    img.save(target / f"{sha256}-{variant}.{fmt}", format_name, **options)
+                    written += 1
+    return written
+
+
+class DerivativePipeline:
+    """Renders derivatives on a process pool, one render per image at a time"""
+
+    def __init__(self, workers: int = DERIVATIVE_WORKERS):
+        self.workers = max(workers, 1)
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._pending: Dict[str, asyncio.Future] = {}
+        self._background: Set[asyncio.Task] = set()
+
+    def _pool(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        return self._executor
+
+    async def _render(self, sha256: str, source_key: str) -> int:
+        """Render the missing derivatives in a staging directory, then store them"""
+        backend = storage_service.backend
+        missing = [
+            (variant, fmt) for variant in VARIANTS for fmt in FORMATS
+            if not await storage_service.exists(derivative_key(sha256, variant, fmt))
+        ]
+        if not missing:
+            return 0
+
+        staging = storage_service.STAGING_DIR / uuid.uuid4().hex
+        await asyncio.to_thread(staging.mkdir, parents=True)
+        try:
+            source = backend.local_path(source_key)
+            if source is None:
+                source = staging / "source"
+                await asyncio.to_thread(backend.download, source_key, source)
+
+            written = await asyncio.get_running_loop().run_in_executor(
+                self._pool(), render_derivatives, str(source), str(staging), sha256, missing
+            )
+            for variant, fmt in missing:
+                await asyncio.to_thread(
+                    backend.write_file, derivative_key(sha256, variant, fmt), staging / f"{sha256}-{variant}.{fmt}"
+                )
+            return written
+        finally:
+            await asyncio.to_thread(shutil.rmtree, staging, True)
+
+    async def generate(self, sha256: str, source_key: str) -> bool:
+        """Render any missing derivatives of a stored image; False if it cannot be decoded"""
+        pending = self._pending.get(sha256)
+        if pending is None:
+            pending = asyncio.ensure_future(self._render(sha256, source_key))
+            self._pending[sha256] = pending
+            pending.add_done_callback(lambda _: self._pending.pop(sha256, None))
+        try:
+            written = await asyncio.shield(pending)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"Cannot render derivatives of {sha256}: {str(e)}")
+            return False
+        if written:
+            logger.info(f"Rendered {written} derivative(s) of {sha256}")
+        return True
+
+    def schedule(self, blob: StoredBlob):
+        """Render a newly stored image's derivatives in the background"""
+        if blob.ext not in SOURCE_EXTENSIONS:
+            return
+        task = asyncio.create_task(self.generate(blob.sha256, blob.key))
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+    async def ensure(self, db, sha256: str) -> bool:
+        """Render derivatives of a stored blob on demand; False if there is no such image"""
+        blob = await db.blobs.find_one({"_id": sha256, "deleting": {"$ne": True}}, {"key": 1, "ext": 1})
+        if not blob or blob.get("ext") not in SOURCE_EXTENSIONS:
+            return False
+        if not await storage_service.exists(blob["key"]):
+            return False
+        return await self.generate(sha256, blob["key"])
+
+    def shutdown(self):
+        for task in self._background:
+            task.cancel()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+# Shared pipeline (pool started on first use)
+derivatives = DerivativePipeline()
@@ -0,0 +1,181 @@
+"""
+Directory Service - In-Memory Officer and Supervisor Directory
+
+The officers and supervisors collections are small and change rarely, so
+they are loaded once into in-memory maps keyed by id, department and ward,
+and complaint routing, escalation and logins read from those maps instead
+of querying MongoDB.
+
+The maps are rebuilt in the background when the collections change: from a
+change stream where the deployment supports one (replica sets / Atlas),
+otherwise every DIRECTORY_REFRESH_INTERVAL_SECONDS. In-process writes call
+invalidate(), and POST /api/directory/refresh forces a reload.
+"""
+
+import os
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+DIRECTORY_REFRESH_INTERVAL_SECONDS = float(os.environ.get("DIRECTORY_REFRESH_INTERVAL_SECONDS", "300"))
+DIRECTORY_COLLECTIONS = ("officers", "supervisors")
+
+
+@dataclass
+class DirectorySnapshot:
+    """Immutable-by-convention view of both collections; replaced whole on reload"""
+    officers: Dict[str, Dict] = field(default_factory=dict)
+    officers_by_department: Dict[str, List[Dict]] = field(default_factory=dict)
+    officers_by_ward: Dict[int, List[Dict]] = field(default_factory=dict)
+    supervisors: Dict[str, Dict] = field(default_factory=dict)
+    supervisors_by_department: Dict[str, List[Dict]] = field(default_factory=dict)
+    supervisors_by_ward: Dict[Optional[int], List[Dict]] = field(default_factory=dict)
+
+    @classmethod
+    def build(cls, officers: List[Dict], supervisors: List[Dict]) -> "DirectorySnapshot":
+        snapshot = cls()
+        for officer in officers:
+            if not officer.get("officer_id"):
+                continue
+            snapshot.officers[officer["officer_id"]] = officer
+            snapshot.officers_by_department.setdefault(officer.get("department"), []).append(officer)
+            for ward in officer.get("wards") or []:
+                snapshot.officers_by_ward.setdefault(ward, []).append(officer)
+
+        for supervisor in supervisors:
+            if not supervisor.get("supervisor_id"):
+                continue
+            snapshot.supervisors[supervisor["supervisor_id"]] = supervisor
+            snapshot.supervisors_by_department.setdefault(supervisor.get("department"), []).append(supervisor)
+            # ward None = supervises every ward of the department
+            snapshot.supervisors_by_ward.setdefault(supervisor.get("ward"), []).append(supervisor)
+        return snapshot
+
+
+def officer_details(officer: Dict) -> Dict:
+    """Public officer fields as returned by routing (first ward only)"""
+    return {
+        "officer_id": officer.get("officer_id"),
+        "name": officer.get("name"),
+        "title": officer.get("title"),
+        "department": officer.get("department"),
+        "ward": officer.get("wards", [])[0] if officer.get("wards") else None,
+        "phone": officer.get("phone"),
+        "email": officer.get("email")
+    }
+
+
+class Directory:
+    """
+    Process-wide officer/supervisor directory.
+
+    Lookups are synchronous reads of the current snapshot; a reload builds
+    a new snapshot and swaps it in, so readers never see a half-built map.
+    """
+
+    def __init__(self):
+        self._snapshot = DirectorySnapshot()
+        self._loaded = False
+        self._stale = True
+        self._lock = asyncio.Lock()
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded
+
+    def invalidate(self):
+        """Mark the directory out of date after a write to either collection"""
+        self._stale = True
+
+    async def load(self, db) -> Dict[str, int]:
+        """
+        (Re)load both collections and swap in the new maps.
+
+        Returns:
+            dict: Number of officers and supervisors loaded
+        """
+        async with self._lock:
+            self._stale = False
+            officers = await db.officers.find({}, {"_id": 0}).sort("_id", 1).to_list(length=None)
+            supervisors = await db.supervisors.find({}, {"_id": 0}).sort("_id", 1).to_list(length=None)
+            self._snapshot = DirectorySnapshot.build(officers, supervisors)
+            self._loaded = True
+
+        counts = {"officers": len(self._snapshot.officers), "supervisors": len(self._snapshot.supervisors)}
+        logger.info(f"Directory loaded: {counts['officers']} officer(s), {counts['supervisors']} supervisor(s)")
+        return counts
+
+    async def ensure_fresh(self, db):
+        """Reload if never loaded or invalidated since the last load"""
+        if self._stale:
+            await self.load(db)
+
+    # Officers
+
+    def officer(self, officer_id: str) -> Optional[Dict]:
+        return self._snapshot.officers.get(officer_id)
+
+    def officers_in_department(self, department: str) -> List[Dict]:
+        return list(self._snapshot.officers_by_department.get(department, []))
+
+    def officers_in_ward(self, ward: int) -> List[Dict]:
+        return list(self._snapshot.officers_by_ward.get(ward, []))
+
+    # Supervisors
+
+    def supervisor(self, supervisor_id: str) -> Optional[Dict]:
+        return self._snapshot.supervisors.get(supervisor_id)
+
+    def supervisors_in_department(self, department: str) -> List[Dict]:
+        return list(self._snapshot.supervisors_by_department.get(department, []))
+
+    def supervisors_for_ward(self, ward: Optional[int]) -> List[Dict]:
+        """Supervisors of a specific ward plus those covering all wards"""
+        by_ward = self._snapshot.supervisors_by_ward
+        specific = by_ward.get(ward, []) if ward is not None else []
+        return list(specific) + list(by_ward.get(None, []))
+
+    def all_supervisors(self) -> List[Dict]:
+        return list(self._snapshot.supervisors.values())
+
+
+# Shared instance used by the API
+directory = Directory()
+
+
+async def _watch_changes(db):
+    """Reload on every change to the directory collections (needs a replica set)"""
+    pipeline = [{"$match": {"ns.coll": {"$in": list(DIRECTORY_COLLECTIONS)}}}]
+    async with db.watch(pipeline) as stream:
+        logger.info("Directory watching officers/supervisors change stream")
+        async for _ in stream:
+            directory.invalidate()
+            await directory.ensure_fresh(db)
+
+
+async def run_sync_loop(db, interval_seconds: float = DIRECTORY_REFRESH_INTERVAL_SECONDS) -> None:
+    """
+    Keep the directory current. Started from the app lifespan and cancelled
+    on shutdown. Falls back to periodic reloads when change streams are not
+    available (standalone MongoDB).
+    """
+    try:
+        await directory.ensure_fresh(db)
+        await _watch_changes(db)
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        logger.info(f"Directory change stream unavailable ({str(e)}); reloading every {interval_seconds:.0f}s")
+
+    while True:
+        await asyncio.sleep(interval_seconds)
+        try:
+            await directory.load(db)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Directory reload failed: {str(e)}")
@@ -6,17 +6,35 @@ This service extracts EXIF metadata from images and validates GPS coordinates.
 
 import os
 import logging
+import struct
+from dataclasses import dataclass, field
+from pathlib import Path
 from PIL import Image
 from PIL.ExifTags import TAGS, GPSTAGS
 import piexif
-from typing import Optional, Tuple, Dict
+from typing import Optional, Tuple, Dict, Union
 from datetime import datetime
-from math import radians, cos, sin, asin, sqrt
+
+from services import geo_service
 
 logger = logging.getLogger(__name__)
 
 # Configuration
 LOCATION_RADIUS_KM = float(os.environ.get("LOCATION_RADIUS_KM", "10"))
+# Bytes read from disk when looking for the APP1 (EXIF) segment. APP1 is
+# capped at 64 KB and sits right after SOI/APP0, so this covers real files
+# without reading the image data; longer headers fall back to a full read.
+EXIF_READ_BYTES = int(os.environ.get("EXIF_READ_BYTES", str(128 * 1024)))
+
+# Timestamp tags in order of preference: (IFD, tag)
+TIMESTAMP_TAGS = [
+    ('Exif', piexif.ExifIFD.DateTimeOriginal),
+    ('0th', piexif.ImageIFD.DateTime),
+    ('Exif', piexif.ExifIFD.DateTimeDigitized),
+]
+
+JPEG_SOI = b'\xff\xd8'
+EXIF_HEADER = b'Exif\x00\x00'
 
 
 def extract_exif(image_path: str) -> Dict:
@@ -50,6 +68,189 @@ def extract_exif(image_path: str) -> Dict:
         return {}
 
 
+@dataclass
+class ExifRecord:
+    """
+    Everything the validation pipeline needs from EXIF, from one parse.
+    
+    `ifds` holds the raw piexif sections for callers (e.g. image forensics)
+    that need tags beyond the decoded fields. `loaded` is False when the
+    EXIF container could not be parsed at all (e.g. PNG, corrupt data).
+    """
+    loaded: bool = False
+    latitude: Optional[float] = None
+    longitude: Optional[float] = None
+    timestamp: Optional[datetime] = None
+    camera_make: Optional[str] = None
+    camera_model: Optional[str] = None
+    software: Optional[str] = None
+    orientation: Optional[int] = None
+    ifds: Dict = field(default_factory=dict, repr=False)
+
+    @property
+    def has_data(self) -> bool:
+        return any(self.ifds.get(section) for section in ('0th', 'Exif', 'GPS', '1st'))
+
+    @property
+    def gps(self) -> Optional[Tuple[float, float]]:
+        if self.latitude is None or self.longitude is None:
+            return None
+        return (self.latitude, self.longitude)
+
+    @property
+    def camera_info(self) -> Dict[str, Optional[str]]:
+        return {"camera_make": self.camera_make, "camera_model": self.camera_model}
+
+
+def _empty_ifds() -> Dict:
+    """What piexif.load returns for a JPEG without an APP1 segment"""
+    return {"0th": {}, "Exif": {}, "GPS": {}, "Interop": {}, "1st": {}, "thumbnail": None}
+
+
+def _find_exif_segment(data: bytes) -> Tuple[Optional[bytes], bool]:
+    """
+    Walk JPEG marker segments up to the start of scan and return the APP1
+    EXIF payload (b'Exif\\0\\0' + TIFF block).
+    
+    Returns:
+        tuple: (payload or None, truncated) - truncated is True when data
+        ended before the segment (or the start of scan) was reached
+    """
+    offset = 2
+    while offset + 4 <= len(data):
+        if data[offset] != 0xFF:
+            return None, False
+        marker = data[offset + 1]
+        if marker == 0xFF:  # fill byte
+            offset += 1
+            continue
+        if marker in (0xDA, 0xD9):  # start of scan / end of image
+            return None, False
+        if marker == 0x01 or 0xD0 <= marker <= 0xD7:  # standalone markers
+            offset += 2
+            continue
+        
+        length = struct.unpack('>H', data[offset + 2:offset + 4])[0]
+        end = offset + 2 + length
+        if marker == 0xE1 and data[offset + 4:offset + 10] == EXIF_HEADER:
+            if end > len(data):
+                return None, True
+            return data[offset + 4:end], False
+        offset = end
+    return None, True
+
+
+def _load_ifds(source: Union[bytes, str, Path]) -> Dict:
+    """
+    Parse EXIF IFDs, touching only the JPEG header.
+    
+    Raises whatever piexif raises for unsupported containers.
+    """
+    if isinstance(source, (bytes, bytearray)):
+        data = bytes(source)
+        is_path = False
+    else:
+        with open(source, 'rb') as f:
+            data = f.read(EXIF_READ_BYTES)
+        is_path = True
+    
+    if data[:2] != JPEG_SOI:
+        # TIFF/WebP/PNG - let piexif handle (or reject) the container
+        return piexif.load(str(source) if is_path else data)
+    
+    segment, truncated = _find_exif_segment(data)
+    if truncated and is_path and len(data) >= EXIF_READ_BYTES:
+        # Unusually long header (large ICC/XMP before APP1) - read it all
+        with open(source, 'rb') as f:
+            segment, truncated = _find_exif_segment(f.read())
+    
+    if segment is None:
+        return _empty_ifds()
+    return piexif.load(segment)
+
+
+def _decode_text(value) -> Optional[str]:
+    """Decode a piexif ASCII tag value"""
+    if value is None:
+        return None
+    if isinstance(value, bytes):
+        value = value.decode('utf-8', errors='ignore')
+    value = str(value).strip('\x00 ')
+    return value or None
+
+
+def _parse_gps(gps_info: Dict) -> Optional[Tuple[float, float]]:
+    if piexif.GPSIFD.GPSLatitude not in gps_info or piexif.GPSIFD.GPSLongitude not in gps_info:
+        return None
+    
+    latitude = _convert_to_degrees(gps_info[piexif.GPSIFD.GPSLatitude])
+    if gps_info.get(piexif.GPSIFD.GPSLatitudeRef, b'N') == b'S':
+        latitude = -latitude
+    
+    longitude = _convert_to_degrees(gps_info[piexif.GPSIFD.GPSLongitude])
+    if gps_info.get(piexif.GPSIFD.GPSLongitudeRef, b'E') == b'W':
+        longitude = -longitude
+    
+    return (latitude, longitude)
+
+
+def _parse_timestamp(ifds: Dict) -> Optional[datetime]:
+    for section, tag in TIMESTAMP_TAGS:
+        value = _decode_text((ifds.get(section) or {}).get(tag))
+        if not value:
+            continue
+        try:
+            # EXIF datetime format: "YYYY:MM:DD HH:MM:SS"
+            return datetime.strptime(value, "%Y:%m:%d %H:%M:%S")
+        except ValueError:
+            continue
+    return None
+
+
+def extract_all(source: Union[bytes, str, Path]) -> ExifRecord:
+    """
+    Extract GPS, timestamp, camera and orientation with a single EXIF parse.
+    
+    For JPEGs only the APP1 segment is parsed; when given a path, only the
+    first EXIF_READ_BYTES of the file are read.
+    
+    Args:
+        source: Image bytes or path to the image file
+        
+    Returns:
+        ExifRecord: Decoded fields (all None when EXIF is absent)
+    """
+    try:
+        ifds = _load_ifds(source)
+    except Exception as e:
+        logger.debug(f"No readable EXIF container: {e}")
+        return ExifRecord()
+    
+    record = ExifRecord(loaded=True, ifds=ifds)
+    zeroth = ifds.get('0th') or {}
+    
+    record.camera_make = _decode_text(zeroth.get(piexif.ImageIFD.Make))
+    record.camera_model = _decode_text(zeroth.get(piexif.ImageIFD.Model))
+    record.software = _decode_text(zeroth.get(piexif.ImageIFD.Software))
+    orientation = zeroth.get(piexif.ImageIFD.Orientation)
+    record.orientation = orientation if isinstance(orientation, int) else None
+    record.timestamp = _parse_timestamp(ifds)
+    
+    try:
+        gps = _parse_gps(ifds.get('GPS') or {})
+    except (ValueError, TypeError, IndexError, ZeroDivisionError) as e:
+        logger.warning(f"Malformed GPS data in EXIF: {e}")
+        gps = None
+    if gps:
+        record.latitude, record.longitude = gps
+    
+    logger.debug(
+        f"EXIF: gps={record.gps} timestamp={record.timestamp} "
+        f"camera={record.camera_make}/{record.camera_model} orientation={record.orientation}"
+    )
+    return record
+
+
 def extract_gps_coordinates(image_path: str) -> Optional[Tuple[float, float]]:
     """
     Extract GPS coordinates from image EXIF data.
@@ -60,62 +261,7 @@ def extract_gps_coordinates(image_path: str) -> Optional[Tuple[float, float]]:
     Returns:
         tuple: (latitude, longitude) or None if GPS data not available
     """
-    try:
-        print(f"\n🗺️  GPS EXTRACTION DEBUG:")
-        print(f"   Image: {image_path}")
-        
-        exif_dict = piexif.load(image_path)
-        
-        print(f"   EXIF keys found: {list(exif_dict.keys())}")
-        
-        # Check if GPS data exists - use 'GPS' string key, not piexif.GPSIFD constant
-        if 'GPS' not in exif_dict or not exif_dict['GPS']:
-            print(f"   ❌ No GPS data found in EXIF")
-            logger.info(f"No GPS data in image: {image_path}")
-            return None
-        
-        gps_info = exif_dict['GPS']
-        print(f"   ✅ GPS IFD found!")
-        print(f"   GPS IFD keys: {list(gps_info.keys())}")
-        print(f"   GPS data: {gps_info}")
-        
-        # Extract GPS coordinates using piexif tag constants
-        lat_tag = piexif.GPSIFD.GPSLatitude
-        lon_tag = piexif.GPSIFD.GPSLongitude
-        lat_ref_tag = piexif.GPSIFD.GPSLatitudeRef
-        lon_ref_tag = piexif.GPSIFD.GPSLongitudeRef
-        
-        if lat_tag not in gps_info or lon_tag not in gps_info:
-            print(f"   ❌ GPSLatitude ({lat_tag}) or GPSLongitude ({lon_tag}) tag missing")
-            print(f"   Available tags: {list(gps_info.keys())}")
-            return None
-        
-        # Get latitude
-        lat = gps_info[lat_tag]
-        lat_ref = gps_info.get(lat_ref_tag, b'N')
-        print(f"   Raw Latitude: {lat}, Ref: {lat_ref}")
-        latitude = _convert_to_degrees(lat)
-        if lat_ref == b'S':
-            latitude = -latitude
-        
-        # Get longitude
-        lon = gps_info[lon_tag]
-        lon_ref = gps_info.get(lon_ref_tag, b'E')
-        print(f"   Raw Longitude: {lon}, Ref: {lon_ref}")
-        longitude = _convert_to_degrees(lon)
-        if lon_ref == b'W':
-            longitude = -longitude
-        
-        print(f"   ✅ Extracted GPS: ({latitude}, {longitude})")
-        logger.info(f"Extracted GPS: ({latitude}, {longitude})")
-        return (latitude, longitude)
-        
-    except Exception as e:
-        print(f"   ❌ GPS extraction error: {str(e)}")
-        import traceback
-        traceback.print_exc()
-        logger.error(f"Failed to extract GPS coordinates: {str(e)}")
-        return None
+    return extract_all(image_path).gps
 
 
 def _convert_to_degrees(value):
@@ -145,26 +291,7 @@ def extract_timestamp(image_path: str) -> Optional[datetime]:
     Returns:
         datetime: Image capture timestamp or None
     """
-    try:
-        exif_data = extract_exif(image_path)
-        
-        # Try different timestamp fields
-        timestamp_fields = ['DateTimeOriginal', 'DateTime', 'DateTimeDigitized']
-        
-        for field in timestamp_fields:
-            if field in exif_data:
-                timestamp_str = exif_data[field]
-                # Parse EXIF datetime format: "YYYY:MM:DD HH:MM:SS"
-                timestamp = datetime.strptime(timestamp_str, "%Y:%m:%d %H:%M:%S")
-                logger.info(f"Extracted timestamp: {timestamp}")
-                return timestamp
-        
-        logger.info(f"No timestamp found in EXIF data")
-        return None
-        
-    except Exception as e:
-        logger.error(f"Failed to extract timestamp: {str(e)}")
-        return None
+    return extract_all(image_path).timestamp
 
 
 def calculate_distance(coord1: Tuple[float, float], coord2: Tuple[float, float]) -> float:
@@ -178,34 +305,19 @@ def calculate_distance(coord1: Tuple[float, float], coord2: Tuple[float, float])
     Returns:
         float: Distance in kilometers
     """
-    lat1, lon1 = coord1
-    lat2, lon2 = coord2
-    
-    # Convert to radians
-    lat1, lon1, lat2, lon2 = map(radians, [lat1, lon1, lat2, lon2])
-    
-    # Haversine formula
-    dlat = lat2 - lat1
-    dlon = lon2 - lon1
-    a = sin(dlat / 2) ** 2 + cos(lat1) * cos(lat2) * sin(dlon / 2) ** 2
-    c = 2 * asin(sqrt(a))
-    
-    # Radius of Earth in kilometers
-    r = 6371
-    
-    distance = c * r
-    logger.info(f"Distance between {coord1} and {coord2}: {distance:.2f} km")
+    distance = float(geo_service.haversine_km(coord1[0], coord1[1], coord2[0], coord2[1]))
+    logger.debug(f"Distance between {coord1} and {coord2}: {distance:.2f} km")
     
     return distance
 
 
-def validate_location(
+def check_location(
     image_coords: Tuple[float, float],
     user_coords: Tuple[float, float],
     max_radius_km: Optional[float] = None
-) -> bool:
+) -> Tuple[bool, float]:
     """
-    Validate if image GPS coordinates are within acceptable radius of user's location.
+    Distance between image and user location, and whether it is within radius.
     
     Args:
         image_coords: (latitude, longitude) from image EXIF
@@ -213,12 +325,12 @@ def validate_location(
         max_radius_km: Maximum acceptable distance in km (optional)
         
     Returns:
-        bool: True if within acceptable radius, False otherwise
+        tuple: (is_valid, distance_km)
     """
     if max_radius_km is None:
         max_radius_km = LOCATION_RADIUS_KM
     
-    distance = calculate_distance(image_coords, user_coords)
+    distance = float(geo_service.distances_from(user_coords, [image_coords])[0])
     is_valid = distance <= max_radius_km
     
     if not is_valid:
@@ -226,7 +338,26 @@ def validate_location(
             f"Location mismatch: {distance:.2f}km exceeds threshold of {max_radius_km}km"
         )
     
-    return is_valid
+    return is_valid, distance
+
+
+def validate_location(
+    image_coords: Tuple[float, float],
+    user_coords: Tuple[float, float],
+    max_radius_km: Optional[float] = None
+) -> bool:
+    """
+    Validate if image GPS coordinates are within acceptable radius of user's location.
+    
+    Args:
+        image_coords: (latitude, longitude) from image EXIF
+        user_coords: (latitude, longitude) from user's location
+        max_radius_km: Maximum acceptable distance in km (optional)
+        
+    Returns:
+        bool: True if within acceptable radius, False otherwise
+    """
+    return check_location(image_coords, user_coords, max_radius_km)[0]
 
 
 def extract_camera_info(image_path: str) -> Dict[str, Optional[str]]:
@@ -239,17 +370,7 @@ def extract_camera_info(image_path: str) -> Dict[str, Optional[str]]:
     Returns:
         dict: Camera make and model
     """
-    try:
-        exif_data = extract_exif(image_path)
-        
-        return {
-            "camera_make": exif_data.get("Make"),
-            "camera_model": exif_data.get("Model")
-        }
-        
-    except Exception as e:
-        logger.error(f"Failed to extract camera info: {str(e)}")
-        return {"camera_make": None, "camera_model": None}
+    return extract_all(image_path).camera_info
 
 
 def reverse_geocode(latitude: float, longitude: float) -> Optional[Dict[str, str]]:
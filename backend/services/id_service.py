@@ -0,0 +1,131 @@
+"""
+ID Service - Block-Allocated Sequential IDs
+
+Issue and complaint IDs (GG-YYYY-NNNNNNN) come from a per-year counter
+document in the `counters` collection. Each worker reserves a block of
+sequence numbers with one atomic $inc and hands them out from memory, so
+most allocations need no database round trip, and blocks never overlap, so
+IDs are unique across workers.
+
+A block is abandoned after ID_BLOCK_TTL_SECONDS (leaving a gap), which keeps
+IDs time-ordered: any two IDs issued more than the TTL apart sort in
+creation order. Block size follows the allocation rate, so gaps stay small:
+a block used up within half its TTL doubles the next one (up to
+ID_BLOCK_SIZE), and an expired block shrinks the next one to what it
+actually handed out, down to a single ID when traffic is low.
+
+The zero-padded sequence makes string order equal numeric order, so the ID
+also works as a range-scan key. A year that runs out of ID_DIGITS digits
+fails allocation rather than issuing a longer, misordered ID.
+
+Legacy IDs (GG-YYYY-NNNNN, five digits taken from a random UUID) neither
+follow creation order nor sort with the seven-digit ones: GG-2026-99999
+sorts after GG-2026-0000001. Range scans on complaint_id are only
+meaningful over IDs issued by this service. Legacy IDs could also
+collide, so duplicates must be renamed (dedupe_complaint_ids.py) before
+the unique index on complaints.complaint_id can be built.
+"""
+
+import os
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+ID_PREFIX = "GG"
+ID_DIGITS = 7
+ID_BLOCK_SIZE = int(os.environ.get("ID_BLOCK_SIZE", "20"))
+ID_BLOCK_TTL_SECONDS = float(os.environ.get("ID_BLOCK_TTL_SECONDS", "30"))
+
+
+class IdAllocator:
+    """Hands out IDs from a reserved block, reserving a new one when needed"""
+
+    def __init__(self, name: str, prefix: str = ID_PREFIX, block_size: int = ID_BLOCK_SIZE,
+                 block_ttl_seconds: float = ID_BLOCK_TTL_SECONDS, digits: int = ID_DIGITS):
+        self.name = name
+        self.prefix = prefix
+        self.block_size = max(int(block_size), 1)
+        self._size = 1  # Current block's size, adapted between 1 and block_size
+        self.block_ttl = timedelta(seconds=block_ttl_seconds)
+        self.digits = digits
+        self._year: Optional[int] = None
+        self._next = 1
+        self._end = 0
+        self._reserved_at: Optional[datetime] = None
+        self._expires_at: Optional[datetime] = None
+        self._lock = asyncio.Lock()
+
+    def format(self, year: int, seq: int) -> str:
+        return f"{self.prefix}-{year}-{seq:0{self.digits}d}"
+
+    async def next_id(self, db) -> str:
+        """Allocate the next ID (reserves a new block if this one is used up or expired)"""
+        async with self._lock:
+            now = datetime.utcnow()
+            if self._next > self._end or self._year != now.year or now >= self._expires_at:
+                await self._reserve(db, now)
+            seq = self._next
+            if seq >= 10 ** self.digits:
+                raise RuntimeError(f"{self.name} IDs for {self._year} exhausted ({self.digits} digits)")
+            self._next += 1
+            return self.format(self._year, seq)
+
+    def _next_block_size(self, now: datetime) -> int:
+        """Size the next block from how fast the current one was used"""
+        if self._reserved_at is None or self._year != now.year:
+            return self._size
+        if self._next > self._end and now < self._reserved_at + self.block_ttl / 2:
+            return min(self._size * 2, self.block_size)
+        used = self._next - (self._end - self._size + 1)
+        return max(used, 1)
+
+    async def _reserve(self, db, now: datetime):
+        key = f"{self.name}-{now.year}"
+        size = self._next_block_size(now)
+        for attempt in range(2):
+            try:
+                counter = await db.counters.find_one_and_update(
+                    {"_id": key},
+                    {"$inc": {"seq": size}},
+                    upsert=True,
+                    return_document=ReturnDocument.AFTER
+                )
+                break
+            except DuplicateKeyError:
+                # Two workers created the year's counter at once; the retry
+                # increments the one that won
+                if attempt:
+                    raise
+
+        self._size = size
+        self._end = counter["seq"]
+        self._next = self._end - size + 1
+        self._year = now.year
+        self._reserved_at = now
+        self._expires_at = now + self.block_ttl
+        logger.debug(f"Reserved {self.name} IDs {self._next}-{self._end} for {now.year}")
+
+
+# Shared allocator for issue and complaint IDs
+issue_ids = IdAllocator("issues")
+
+
+async def find_duplicates(db, collection: str, field: str) -> List[Dict]:
+    """
+    Values of field used by more than one document (legacy ID collisions).
+
+    Returns:
+        list: {"_id": value, "ids": [document _ids, oldest first], "count": n}
+    """
+    pipeline = [
+        {"$sort": {"_id": 1}},
+        {"$group": {"_id": f"${field}", "ids": {"$push": "$_id"}, "count": {"$sum": 1}}},
+        {"$match": {"count": {"$gt": 1}, "_id": {"$ne": None}}},
+    ]
+    return await db[collection].aggregate(pipeline, allowDiskUse=True).to_list(None)
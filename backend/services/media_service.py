@@ -0,0 +1,169 @@
+"""
+Media Service - Cacheable Responses for Stored Images
+
+Builds /uploads responses for files on local disk:
+- Cache-Control: immutable for a year (stored files never change in place:
+  blobs and derivatives are named by content hash, legacy uploads by UUID)
+- strong ETag: the content-addressed file name when there is one,
+  otherwise derived from size and modification time
+- If-None-Match -> 304, so revalidations transfer no body
+- single Range requests -> 206 (416 when unsatisfiable), with If-Range
+- Vary: Accept where the response depends on WebP negotiation
+- redirects to backend URLs (S3) cacheable while the URL stays valid
+
+Full responses go through FileResponse, which hands the path to the server
+(`http.response.pathsend`) for sendfile where the ASGI server supports it.
+Ranges use the `http.response.zerocopysend` extension when offered, and
+otherwise stream the requested bytes in chunks.
+"""
+
+import os
+import re
+import asyncio
+import logging
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+from fastapi import Request
+from fastapi.responses import FileResponse, RedirectResponse, Response
+from starlette.types import Receive, Scope, Send
+
+from services import storage_service
+from services.storage_backends import IMMUTABLE_CACHE_CONTROL, content_type
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+RANGE_CHUNK_SIZE = 64 * 1024
+
+_RANGE = re.compile(r"^bytes=(\d*)-(\d*)$")
+_CONTENT_ADDRESSED = (storage_service.BLOB_PREFIX + "/", storage_service.DERIVED_PREFIX + "/")
+
+
+def etag_for(key: str, stat_result: os.stat_result) -> str:
+    """Strong ETag: the hash-bearing file name for content-addressed keys"""
+    if key.startswith(_CONTENT_ADDRESSED):
+        return f'"{key.rsplit("/", 1)[-1]}"'
+    return f'"{stat_result.st_mtime_ns:x}-{stat_result.st_size:x}"'
+
+
+def etag_matches(header: Optional[str], etag: str) -> bool:
+    """If-None-Match comparison (weak, per RFC 9110 section 13.1.2)"""
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag for tag in header.split(","))
+
+
+def accepts_webp(request: Request) -> bool:
+    return "image/webp" in request.headers.get("accept", "")
+
+
+def parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """
+    Byte range requested by a single-range Range header.
+
+    Returns:
+        tuple: Inclusive (start, end), or None to send the whole file
+        (no header, unsupported unit or multiple ranges)
+
+    Raises:
+        ValueError: Range not satisfiable for this size
+    """
+    match = _RANGE.match((header or "").strip())
+    if not match or match.group(1) == match.group(2) == "":
+        return None
+    first, last = match.groups()
+    if first == "":
+        # Suffix range: the last N bytes
+        length = int(last)
+        if length == 0 or size == 0:
+            raise ValueError("Empty suffix range")
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        raise ValueError("Range starts beyond the end of the file")
+    return start, end
+
+
+class FileRangeResponse(Response):
+    """206 body for bytes start..end of a file"""
+
+    def __init__(self, path: Path, start: int, end: int, headers: Dict[str, str], media_type: str):
+        super().__init__(status_code=206, headers=headers, media_type=media_type)
+        self.path = path
+        self.start = start
+        self.length = end - start + 1
+        self.headers["content-length"] = str(self.length)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        if scope["method"].upper() == "HEAD":
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+
+        with open(self.path, "rb") as f:
+            if "http.response.zerocopysend" in scope.get("extensions", {}):
+                await send({"type": "http.response.zerocopysend", "file": f.fileno(),
+                            "offset": self.start, "count": self.length, "more_body": False})
+                return
+
+            f.seek(self.start)
+            remaining = self.length
+            while remaining > 0:
+                chunk = await asyncio.to_thread(f.read, min(RANGE_CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                await send({"type": "http.response.body", "body": chunk, "more_body": remaining > 0})
+            if remaining > 0:
+                # File shrank underneath us; end the body rather than hang
+                await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+
+async def file_response(request: Request, key: str, path: Path, vary_accept: bool = False) -> Response:
+    """
+    Response for a stored file: 304, 206, 416 or a full 200.
+
+    Args:
+        request: Incoming request (conditional and range headers)
+        key: Storage key of the file (determines the ETag)
+        path: Local path of the file
+        vary_accept: Whether the representation was chosen from Accept
+    """
+    stat_result = await asyncio.to_thread(os.stat, path)
+    etag = etag_for(key, stat_result)
+    headers = {
+        "cache-control": IMMUTABLE_CACHE_CONTROL,
+        "etag": etag,
+        "accept-ranges": "bytes",
+    }
+    if vary_accept:
+        headers["vary"] = "Accept"
+
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+
+    media_type = content_type(key)
+    if_range = request.headers.get("if-range")
+    if if_range is None or if_range.strip() == etag:
+        try:
+            requested = parse_range(request.headers.get("range"), stat_result.st_size)
+        except ValueError:
+            headers["content-range"] = f"bytes */{stat_result.st_size}"
+            return Response(status_code=416, headers=headers)
+        if requested is not None:
+            start, end = requested
+            headers["content-range"] = f"bytes {start}-{end}/{stat_result.st_size}"
+            return FileRangeResponse(path, start, end, headers, media_type)
+
+    return FileResponse(path, headers=headers, media_type=media_type, stat_result=stat_result)
+
+
+def redirect_response(url: str, max_age: int, vary_accept: bool = False) -> Response:
+    """307 to a backend read URL, cacheable for max_age seconds"""
+    headers = {"cache-control": f"private, max-age={max_age}" if max_age else "no-store"}
+    if vary_accept:
+        headers["vary"] = "Accept"
+    return RedirectResponse(url, status_code=307, headers=headers)
@@ -4,98 +4,190 @@ Officer Routing Service
 Assigns complaints to appropriate officers based on ward and department
 using a routing configuration with deterministic fallback logic.
 
-Fallback sequence:
-1. routing[ward][department] - Exact match
-2. routing[ward]["general"] - Ward general officer  
-3. routing["default_city"][department] - Department head (city-level)
-4. null - Mark as UNASSIGNED for manual routing
+Fallback sequence (tier recorded on every decision):
+1. routing[ward][department] - Exact match              ("exact")
+2. routing[ward]["general"] - Ward general officer      ("ward_general")
+3. routing["default_city"][department] - Department head ("city_department")
+4. routing["default_city"]["general"] - City admin      ("city_general")
+5. null - Mark as UNASSIGNED for manual routing         ("unassigned")
+
+A routing slot names one officer or a list of officers; among several
+candidates the one with the least open, severity-weighted work is chosen.
+
+The JSON config is compiled at load time into a flat (ward, department)
+table with every fallback already resolved, so a lookup is one dict access.
+The file is polled for changes and a recompiled table is swapped in
+atomically; a config that fails to load keeps the previous table.
 """
 
+import os
 import json
+import asyncio
 import logging
 from pathlib import Path
-from typing import Optional, Dict
+from typing import Optional, Dict, NamedTuple, Tuple
+
+from services.directory_service import directory, officer_details
+from services.workload_service import workload, OFFICER
 
 logger = logging.getLogger(__name__)
 
 # Load routing configuration
 CONFIG_PATH = Path(__file__).parent.parent / "config" / "routing_config.json"
+ROUTING_RELOAD_INTERVAL_SECONDS = float(os.environ.get("ROUTING_RELOAD_INTERVAL_SECONDS", "5"))
+
+CITY_KEY = "default_city"
+WARD_PREFIX = "ward_"
+GENERAL = "general"
+
+# Fallback tiers, most specific first
+TIER_EXACT = "exact"
+TIER_WARD_GENERAL = "ward_general"
+TIER_CITY_DEPARTMENT = "city_department"
+TIER_CITY_GENERAL = "city_general"
+TIER_UNASSIGNED = "unassigned"
+
+
+class RoutingDecision(NamedTuple):
+    officer_id: Optional[str]
+    tier: str
+    candidates: Tuple[str, ...] = ()
+
+
+UNASSIGNED = RoutingDecision(None, TIER_UNASSIGNED)
+
+
+def _decision(slot, tier: str) -> Optional[RoutingDecision]:
+    """Compile one config slot (officer id or list of ids); None if empty"""
+    candidates = (slot,) if isinstance(slot, str) else tuple(slot or ())
+    candidates = tuple(c for c in candidates if isinstance(c, str) and c)
+    if not candidates:
+        return None
+    return RoutingDecision(candidates[0], tier, candidates)
+
+
+def _read_config(path: Path) -> Dict:
+    """Parse the routing JSON (raises on missing/invalid file)"""
+    with open(path, 'r') as f:
+        config = json.load(f)
+    if not isinstance(config, dict):
+        raise ValueError("Routing config must be a JSON object")
+    return config
+
 
 def load_routing_config() -> Dict:
     """Load routing configuration from JSON file"""
     try:
-        with open(CONFIG_PATH, 'r') as f:
-            config = json.load(f)
+        config = _read_config(CONFIG_PATH)
         logger.info(f"Loaded routing config with {len(config)} wards")
         return config
     except FileNotFoundError:
         logger.error(f"Routing config not found at {CONFIG_PATH}")
         return {}
-    except json.JSONDecodeError as e:
+    except (json.JSONDecodeError, ValueError) as e:
         logger.error(f"Invalid JSON in routing config: {e}")
         return {}
 
-# Global routing config (loaded once)
+
+class RoutingTable:
+    """
+    Routing config compiled into flat lookup tables.
+
+    routes holds every (ward, department) pair the config names, for every
+    configured ward, with the fallback already applied. Pairs outside it
+    (unknown ward or department) resolve through the per-ward general
+    officer or the city-level tables.
+    """
+
+    def __init__(self, config: Dict):
+        city = config.get(CITY_KEY) or {}
+        wards: Dict[int, Dict[str, str]] = {}
+        for key, slots in config.items():
+            if key.startswith(WARD_PREFIX) and isinstance(slots, dict):
+                try:
+                    wards[int(key[len(WARD_PREFIX):])] = slots
+                except ValueError:
+                    logger.warning(f"Ignoring routing entry with invalid ward key: {key}")
+
+        departments = {d for slots in wards.values() for d in slots if d != GENERAL}
+        departments.update(d for d in city if d != GENERAL)
+
+        self.city_general = _decision(city.get(GENERAL), TIER_CITY_GENERAL) or UNASSIGNED
+        self.city: Dict[str, RoutingDecision] = {
+            d: _decision(city.get(d), TIER_CITY_DEPARTMENT) or self.city_general
+            for d in departments
+        }
+        self.ward_general: Dict[int, RoutingDecision] = {}
+        for w, slots in wards.items():
+            general = _decision(slots.get(GENERAL), TIER_WARD_GENERAL)
+            if general:
+                self.ward_general[w] = general
+
+        self.routes: Dict[Tuple[int, str], RoutingDecision] = {}
+        for w, slots in wards.items():
+            for d in departments:
+                self.routes[(w, d)] = (
+                    _decision(slots.get(d), TIER_EXACT) or self.ward_general.get(w) or self.city[d]
+                )
+
+        self.ward_count = len(wards)
+
+    def route(self, ward: int, department: str) -> RoutingDecision:
+        decision = self.routes.get((ward, department))
+        if decision is not None:
+            return decision
+        # Department not named anywhere in the config, or unknown ward
+        return self.ward_general.get(ward) or self.city.get(department) or self.city_general
+
+
+# Global routing config and compiled table (replaced whole on reload)
 ROUTING_CONFIG = load_routing_config()
+_table = RoutingTable(ROUTING_CONFIG)
+try:
+    _config_mtime: Optional[int] = CONFIG_PATH.stat().st_mtime_ns
+except OSError:
+    _config_mtime = None
 
 
-def assign_officer(ward: int, department: str) -> Optional[str]:
+def route(ward: int, department: str) -> RoutingDecision:
     """
-    Assign officer based on ward and department with fallback logic.
+    Route a complaint to an officer.
     
     Args:
         ward: Ward number (e.g., 12)
         department: Department name (e.g., "electricity", "roads", "garbage")
         
     Returns:
-        officer_id: Officer ID string, or None if no match found
-        
-    Fallback sequence:
-        1. routing[ward][department] - Exact match
-        2. routing[ward]["general"] - Ward general officer
-        3. routing["default_city"][department] - City-level department head
-        4. None - Mark as UNASSIGNED
+        RoutingDecision: (officer_id or None, fallback tier it came from,
+        all candidates of the slot); officer_id is the least-loaded candidate
     """
-    ward_key = f"ward_{ward}"
-    
-    logger.info(f"Routing complaint: Ward {ward}, Department {department}")
-    
-    # 1. Try exact match: ward + department
-    if ward_key in ROUTING_CONFIG:
-        ward_config = ROUTING_CONFIG[ward_key]
-        if department in ward_config:
-            officer_id = ward_config[department]
-            logger.info(f"✅ Exact match: {officer_id}")
-            return officer_id
-        
-        # 2. Try ward general officer
-        if "general" in ward_config:
-            officer_id = ward_config["general"]
-            logger.info(f"⚠️ Fallback to ward general: {officer_id}")
-            return officer_id
-    
-    # 3. Try city-level department head
-    if "default_city" in ROUTING_CONFIG:
-        city_config = ROUTING_CONFIG["default_city"]
-        if department in city_config:
-            officer_id = city_config[department]
-            logger.info(f"⚠️ Fallback to city-level department head: {officer_id}")
-            return officer_id
-        
-        # Last resort: city admin
-        if "general" in city_config:
-            officer_id = city_config["general"]
-            logger.info(f"⚠️ Fallback to city admin: {officer_id}")
-            return officer_id
+    try:
+        ward = int(ward)
+    except (TypeError, ValueError):
+        ward = None
+    decision = _table.route(ward, department)
+    if len(decision.candidates) > 1:
+        decision = decision._replace(officer_id=workload.least_loaded(OFFICER, decision.candidates))
+    logger.debug(f"Routed ward {ward}, department {department} -> {decision.officer_id} ({decision.tier})")
+    return decision
+
+
+def assign_officer(ward: int, department: str) -> Optional[str]:
+    """
+    Assign officer based on ward and department with fallback logic.
     
-    # 4. No match found - mark as unassigned
-    logger.warning(f"❌ No officer found for Ward {ward}, Department {department}")
-    return None
+    Returns:
+        officer_id: Officer ID string, or None if no match found
+    """
+    return route(ward, department).officer_id
 
 
 async def get_officer_details(db, officer_id: str) -> Optional[Dict]:
     """
-    Fetch officer details from MongoDB.
+    Look up officer details in the in-memory directory.
+    
+    Falls back to MongoDB only for an officer added since the directory
+    was last loaded.
     
     Args:
         db: MongoDB database instance
@@ -108,19 +200,17 @@ async def get_officer_details(db, officer_id: str) -> Optional[Dict]:
         return None
     
     try:
-        officer = await db.officers.find_one({"officer_id": officer_id})
+        await directory.ensure_fresh(db)
+        officer = directory.officer(officer_id)
+        
+        if officer is None:
+            officer = await db.officers.find_one({"officer_id": officer_id})
+            if officer:
+                # Added since the last load; pick it up on the next lookup
+                directory.invalidate()
         
         if officer:
-            logger.info(f"Found officer: {officer.get('name')} ({officer.get('title')})")
-            return {
-                "officer_id": officer.get("officer_id"),
-                "name": officer.get("name"),
-                "title": officer.get("title"),
-                "department": officer.get("department"),
-                "ward": officer.get("wards", [])[0] if officer.get("wards") else None,
-                "phone": officer.get("phone"),
-                "email": officer.get("email")
-            }
+            return officer_details(officer)
         else:
             logger.warning(f"Officer ID {officer_id} not found in database")
             return None
@@ -130,8 +220,46 @@ async def get_officer_details(db, officer_id: str) -> Optional[Dict]:
         return None
 
 
-def reload_routing_config():
-    """Reload routing configuration (useful for testing/updates)"""
-    global ROUTING_CONFIG
-    ROUTING_CONFIG = load_routing_config()
+def _swap(config: Dict):
+    global ROUTING_CONFIG, _table
+    table = RoutingTable(config)
+    ROUTING_CONFIG, _table = config, table
+    logger.info(f"Routing table compiled: {table.ward_count} wards, {len(table.routes)} routes")
+
+
+def reload_routing_config() -> bool:
+    """
+    Recompile the routing table from CONFIG_PATH.
+    
+    Returns:
+        bool: True if swapped in; False keeps the current table
+    """
+    global _config_mtime
+    try:
+        mtime = CONFIG_PATH.stat().st_mtime_ns
+        config = _read_config(CONFIG_PATH)
+    except (OSError, ValueError) as e:
+        logger.error(f"Routing config reload failed, keeping current table: {e}")
+        return False
+
+    _swap(config)
+    _config_mtime = mtime
     logger.info("Routing configuration reloaded")
+    return True
+
+
+async def run_config_watcher(interval_seconds: float = ROUTING_RELOAD_INTERVAL_SECONDS) -> None:
+    """
+    Reload the routing table whenever the config file changes. Started from
+    the app lifespan and cancelled on shutdown.
+    """
+    global _config_mtime
+    while True:
+        await asyncio.sleep(interval_seconds)
+        try:
+            mtime = CONFIG_PATH.stat().st_mtime_ns
+        except OSError:
+            continue
+        if mtime != _config_mtime and not reload_routing_config():
+            # Don't retry a broken file until it changes again
+            _config_mtime = mtime
@@ -0,0 +1,284 @@
+"""
+SLA Service - Deadline Scheduler and Automatic Overdue Transitions
+
+Complaints carry two deadlines:
+- officer_deadline: set when an officer is assigned. When it is missed
+  while the complaint is still open, the complaint is marked overdue
+  (officer_overdue_at) and a timeline event is appended.
+- supervisor_deadline: set on escalation. When it is missed while the
+  review is pending, the complaint is auto-escalated to the HOD
+  (status escalated_hod, supervisor_status ESCALATED) with a timeline event.
+
+SLAEngine keeps the deadlines falling within the next SLA_HORIZON_SECONDS in
+an in-memory min-heap, loaded by an indexed range query on each resync, and
+sleeps until the earliest one. Deadlines that pass while the server is down
+are simply due on the first resync after start. Due transitions are applied
+as conditional bulk writes, so stale heap entries (complaint resolved or
+reviewed meanwhile) and several workers firing the same entry are no-ops.
+"""
+
+import os
+import heapq
+import asyncio
+import logging
+from typing import Dict, List, Optional, Tuple
+from datetime import datetime, timedelta
+from pymongo import UpdateOne
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+SLA_HORIZON_SECONDS = float(os.environ.get("SLA_HORIZON_SECONDS", "3600"))
+SLA_RESYNC_INTERVAL_SECONDS = float(os.environ.get("SLA_RESYNC_INTERVAL_SECONDS", "300"))
+SLA_LOAD_LIMIT = int(os.environ.get("SLA_LOAD_LIMIT", "10000"))
+SLA_FIRE_BATCH_SIZE = 500
+# Shortest sleep between passes, and the cap on the backoff after failures
+SLA_MIN_WAIT_SECONDS = 0.05
+
+# Review / resolution windows by severity (hours)
+HIGH_SEVERITIES = ("High", "Critical")
+SUPERVISOR_SLA_HOURS = {"high": 24, "default": 72}
+OFFICER_SLA_HOURS = {
+    "high": int(os.environ.get("OFFICER_SLA_HOURS_HIGH", "72")),
+    "default": int(os.environ.get("OFFICER_SLA_HOURS", "168")),
+}
+
+# Deadline kinds
+OFFICER_RESOLUTION = "officer"
+SUPERVISOR_REVIEW = "supervisor"
+
+# Complaint statuses in which the officer deadline still applies
+OFFICER_OPEN_STATUSES = ["assigned", "in_progress"]
+
+
+def _sla_hours(table: Dict[str, int], severity: Optional[str]) -> int:
+    return table["high"] if severity in HIGH_SEVERITIES else table["default"]
+
+
+def supervisor_deadline(severity: Optional[str], start: datetime) -> datetime:
+    """Supervisor review deadline for an escalation at start"""
+    return start + timedelta(hours=_sla_hours(SUPERVISOR_SLA_HOURS, severity))
+
+
+def officer_deadline(severity: Optional[str], start: datetime) -> datetime:
+    """Officer resolution deadline for an assignment at start"""
+    return start + timedelta(hours=_sla_hours(OFFICER_SLA_HOURS, severity))
+
+
+def _deadline_field(kind: str) -> str:
+    return "officer_deadline" if kind == OFFICER_RESOLUTION else "supervisor_deadline"
+
+
+def _pending_filter(kind: str) -> Dict:
+    """Complaints whose deadline of this kind has not been acted on yet"""
+    if kind == OFFICER_RESOLUTION:
+        return {"status": {"$in": OFFICER_OPEN_STATUSES}, "officer_overdue_at": None}
+    return {"status": "awaiting_supervisor", "supervisor_status": {"$in": ["PENDING", None]}}
+
+
+def _transition(kind: str, complaint_id: str, now: datetime) -> UpdateOne:
+    """Conditional update firing one missed deadline"""
+    query = {
+        "complaint_id": complaint_id,
+        _deadline_field(kind): {"$lte": now},
+        **_pending_filter(kind)
+    }
+
+    if kind == OFFICER_RESOLUTION:
+        update = {"officer_overdue_at": now, "updated_at": now}
+        event = {
+            "timestamp": now,
+            "actor": "System",
+            "role": "system",
+            "action": "officer_overdue",
+            "details": "Resolution deadline missed"
+        }
+    else:
+        update = {
+            "status": "escalated_hod",
+            "supervisor_status": "ESCALATED",
+            "escalated_hod_at": now,
+            "updated_at": now
+        }
+        event = {
+            "timestamp": now,
+            "actor": "System",
+            "role": "system",
+            "action": "auto_escalated",
+            "details": "Supervisor review deadline missed; escalated to HOD"
+        }
+
+    return UpdateOne(query, {"$set": update, "$push": {"timeline": event}})
+
+
+class SLAEngine:
+    """
+    Min-heap of upcoming (deadline, kind, complaint_id) entries.
+
+    schedule() is called by the API when it sets a deadline so this worker
+    acts on it without waiting for the next resync; other workers pick it
+    up on their resync. Rescheduling a complaint replaces its entry (the
+    old heap entry is skipped when popped).
+    """
+
+    def __init__(self, horizon_seconds: float = SLA_HORIZON_SECONDS,
+                 resync_interval_seconds: float = SLA_RESYNC_INTERVAL_SECONDS,
+                 load_limit: int = SLA_LOAD_LIMIT):
+        self.horizon = timedelta(seconds=horizon_seconds)
+        self.resync_interval = timedelta(seconds=resync_interval_seconds)
+        self.load_limit = load_limit
+        self._heap: List[Tuple[datetime, str, str]] = []
+        self._scheduled: Dict[Tuple[str, str], datetime] = {}
+        self._loaded_until: Optional[datetime] = None
+        self._truncated = False
+        self._wakeup = asyncio.Event()
+
+    def __len__(self) -> int:
+        return len(self._scheduled)
+
+    def schedule(self, kind: str, complaint_id: str, deadline: datetime):
+        """Track a new or moved deadline"""
+        # Beyond the loaded window: the resync that reaches it will load it
+        if self._loaded_until is None or deadline > self._loaded_until:
+            return
+        self._push(kind, complaint_id, deadline)
+        self._wakeup.set()
+
+    def _push(self, kind: str, complaint_id: str, deadline: datetime):
+        key = (kind, complaint_id)
+        if self._scheduled.get(key) == deadline:
+            return
+        self._scheduled[key] = deadline
+        heapq.heappush(self._heap, (deadline, kind, complaint_id))
+
+    def _pop_due(self, now: datetime, limit: int) -> List[Tuple[str, str]]:
+        due = []
+        while self._heap and self._heap[0][0] <= now and len(due) < limit:
+            deadline, kind, complaint_id = heapq.heappop(self._heap)
+            key = (kind, complaint_id)
+            # Superseded by a later schedule() for the same complaint
+            if self._scheduled.get(key) != deadline:
+                continue
+            del self._scheduled[key]
+            due.append(key)
+        return due
+
+    def _next_deadline(self) -> Optional[datetime]:
+        while self._heap:
+            deadline, kind, complaint_id = self._heap[0]
+            if self._scheduled.get((kind, complaint_id)) == deadline:
+                return deadline
+            heapq.heappop(self._heap)
+        return None
+
+    async def resync(self, db):
+        """Reload pending deadlines up to now + horizon from the indexes"""
+        now = datetime.utcnow()
+        until = now + self.horizon
+        heap, scheduled = [], {}
+        truncated = False
+
+        for kind in (OFFICER_RESOLUTION, SUPERVISOR_REVIEW):
+            field = _deadline_field(kind)
+            cursor = db.complaints.find(
+                {**_pending_filter(kind), field: {"$lte": until}},
+                {"_id": 0, "complaint_id": 1, field: 1}
+            ).sort(field, 1).limit(self.load_limit)
+
+            loaded = 0
+            async for complaint in cursor:
+                loaded += 1
+                deadline = complaint.get(field)
+                if not isinstance(deadline, datetime) or not complaint.get("complaint_id"):
+                    continue
+                scheduled[(kind, complaint["complaint_id"])] = deadline
+                heap.append((deadline, kind, complaint["complaint_id"]))
+            truncated = truncated or loaded >= self.load_limit
+
+        heapq.heapify(heap)
+        self._heap, self._scheduled = heap, scheduled
+        self._loaded_until = until
+        self._truncated = truncated
+        logger.info(f"SLA engine tracking {len(scheduled)} deadline(s) until {until.isoformat()}")
+
+    async def fire_due(self, db) -> int:
+        """
+        Apply every transition due now.
+
+        Returns:
+            int: Number of complaints transitioned
+        """
+        fired = 0
+        while True:
+            now = datetime.utcnow()
+            due = self._pop_due(now, SLA_FIRE_BATCH_SIZE)
+            if not due:
+                return fired
+
+            result = await db.complaints.bulk_write(
+                [_transition(kind, complaint_id, now) for kind, complaint_id in due],
+                ordered=False
+            )
+            fired += result.modified_count
+            if result.modified_count:
+                logger.info(f"SLA engine transitioned {result.modified_count} overdue complaint(s)")
+
+    async def run(self, db) -> None:
+        """
+        Scheduler loop. Started from the app lifespan and cancelled on shutdown.
+        """
+        next_resync = datetime.utcnow()
+        failures = 0
+        while True:
+            retry_at = None
+            try:
+                if datetime.utcnow() >= next_resync:
+                    await self.resync(db)
+                    next_resync = datetime.utcnow() + self.resync_interval
+
+                fired = await self.fire_due(db)
+                # A drained truncated load may hide more due entries
+                if fired and self._truncated and not self._scheduled:
+                    next_resync = datetime.utcnow()
+                failures = 0
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # Back off (1s, 2s, 4s ... up to the resync interval) rather
+                # than retrying an overdue resync or heap entry in a hot loop.
+                # The retry is a full resync: a failed fire_due() batch was
+                # already popped from the heap and is reloaded from the indexes
+                failures += 1
+                backoff = min(self.resync_interval.total_seconds(), 2 ** (failures - 1))
+                retry_at = datetime.utcnow() + timedelta(seconds=backoff)
+                next_resync = retry_at
+                logger.error(f"SLA engine pass failed (retrying in {backoff:.0f}s): {str(e)}")
+
+            wake_at = next_resync
+            upcoming = self._next_deadline()
+            if upcoming is not None and upcoming < wake_at and retry_at is None:
+                wake_at = upcoming
+            timeout = max((wake_at - datetime.utcnow()).total_seconds(), SLA_MIN_WAIT_SECONDS)
+
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
+
+
+# Shared instance used by the API
+sla_engine = SLAEngine()
+
+
+async def create_indexes(db):
+    """
+    Create database indexes for the SLA resync queries.
+    Should be called during app initialization.
+    """
+    try:
+        await db.complaints.create_index([("status", 1), ("officer_deadline", 1)])
+        await db.complaints.create_index([("status", 1), ("supervisor_deadline", 1)])
+        logger.info("Created SLA deadline indexes on complaints collection")
+    except Exception as e:
+        logger.error(f"Failed to create indexes: {str(e)}")
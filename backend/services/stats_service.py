@@ -0,0 +1,155 @@
+"""
+Stats Service - Materialized Dashboard Statistics
+
+Dashboard counters are computed as indexed counts over issues, run
+concurrently, and materialized into one document (stats_cache collection)
+shared by all API workers. Each count is answered from an index on its
+filter fields (see create_indexes), so a refresh never scans the whole
+collection. Reads are served from memory or that document as long as it
+is within STATS_MAX_STALENESS_SECONDS and no issue/verification write has
+happened since; otherwise the counts are re-run once and re-materialized.
+The background refresher recomputes every STATS_REFRESH_INTERVAL_SECONDS,
+so with it running, reads normally find counters at most that old.
+
+Counters are recomputed rather than $inc-ed because "new today" and
+"resolved this week" are rolling windows that change without any write.
+"""
+
+import os
+import asyncio
+import logging
+from typing import Dict, Optional
+from datetime import datetime, timedelta
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+STATS_MAX_STALENESS_SECONDS = float(os.environ.get("STATS_MAX_STALENESS_SECONDS", "30"))
+# Refresh well inside the staleness bound so reads rarely hit the counts
+STATS_REFRESH_INTERVAL_SECONDS = float(
+    os.environ.get("STATS_REFRESH_INTERVAL_SECONDS", str(STATS_MAX_STALENESS_SECONDS / 2))
+)
+STATS_DOC_ID = "dashboard"
+STATS_FIELDS = ("new_today", "verifying", "in_progress", "resolved_this_week", "unverified")
+
+
+def stats_filters(now: datetime) -> Dict[str, Dict]:
+    """Issue filter per dashboard counter, each covered by an index"""
+    today = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    week_ago = now - timedelta(days=7)
+    return {
+        "new_today": {"reported_at": {"$gte": today}},
+        "verifying": {"status": "verifying"},
+        "in_progress": {"status": "in_progress"},
+        "resolved_this_week": {"status": "resolved", "updated_at": {"$gte": week_ago}},
+        # No verifications yet (denormalized counter, missing counts as 0)
+        "unverified": {"verifications.total": {"$not": {"$gt": 0}}},
+    }
+
+
+async def compute_stats(db) -> Dict[str, int]:
+    """Run the counts concurrently"""
+    filters = stats_filters(datetime.utcnow())
+    counts = await asyncio.gather(*(db.issues.count_documents(filters[field]) for field in STATS_FIELDS))
+    return dict(zip(STATS_FIELDS, counts))
+
+
+class StatsCache:
+    """
+    Per-process view of the materialized stats document.
+
+    invalidate() is called on issue and verification writes; the next read
+    (or the background refresher) recomputes instead of serving the old
+    counters. Without writes, counters are at most max_staleness old.
+    """
+
+    def __init__(self, max_staleness_seconds: float = STATS_MAX_STALENESS_SECONDS):
+        self.max_staleness = timedelta(seconds=max_staleness_seconds)
+        self._stats: Optional[Dict[str, int]] = None
+        self._computed_at: Optional[datetime] = None
+        self._last_write_at: Optional[datetime] = None
+        self._lock = asyncio.Lock()
+
+    def invalidate(self):
+        """Mark the counters out of date after a write"""
+        self._last_write_at = datetime.utcnow()
+
+    def _usable(self, computed_at: Optional[datetime], now: datetime) -> bool:
+        if computed_at is None or now - computed_at > self.max_staleness:
+            return False
+        # Counters computed before the latest write are out of date
+        return self._last_write_at is None or computed_at >= self._last_write_at
+
+    async def get(self, db) -> Dict[str, int]:
+        """Current dashboard counters within the staleness bound"""
+        if self._usable(self._computed_at, datetime.utcnow()):
+            return self._stats
+
+        async with self._lock:
+            now = datetime.utcnow()
+            if self._usable(self._computed_at, now):
+                return self._stats
+
+            # Another worker may have refreshed the shared document already
+            doc = await db.stats_cache.find_one({"_id": STATS_DOC_ID})
+            if doc and self._usable(doc.get("computed_at"), now):
+                self._store({field: doc.get(field, 0) for field in STATS_FIELDS}, doc["computed_at"])
+                return self._stats
+
+            return await self._recompute(db)
+
+    async def refresh(self, db) -> Dict[str, int]:
+        """Recompute and re-materialize unconditionally"""
+        async with self._lock:
+            return await self._recompute(db)
+
+    async def _recompute(self, db) -> Dict[str, int]:
+        # Stamped with the start time so writes racing the counts
+        # still invalidate the result
+        started_at = datetime.utcnow()
+        stats = await compute_stats(db)
+        await db.stats_cache.update_one(
+            {"_id": STATS_DOC_ID},
+            {"$set": {**stats, "computed_at": started_at}},
+            upsert=True
+        )
+        self._store(stats, started_at)
+        return stats
+
+    def _store(self, stats: Dict[str, int], computed_at: datetime):
+        self._stats = stats
+        self._computed_at = computed_at
+
+
+# Shared instance used by the API
+stats_cache = StatsCache()
+
+
+async def run_refresh_loop(db, interval_seconds: float = STATS_REFRESH_INTERVAL_SECONDS) -> None:
+    """
+    Recompute the materialized stats on every tick so dashboard reads never
+    wait on the counts. Started from the app lifespan and cancelled on
+    shutdown.
+    """
+    while True:
+        try:
+            await stats_cache.refresh(db)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Stats refresh failed: {str(e)}")
+        await asyncio.sleep(interval_seconds)
+
+
+async def create_indexes(db):
+    """
+    Create the indexes the dashboard counts rely on.
+    Should be called during app initialization.
+    """
+    try:
+        await db.issues.create_index([("status", 1), ("updated_at", -1)])
+        await db.issues.create_index([("reported_at", -1)])
+        await db.issues.create_index([("verifications.total", 1)])
+        logger.info("Created stats indexes on issues collection")
+    except Exception as e:
+        logger.error(f"Failed to create indexes: {str(e)}")
@@ -0,0 +1,255 @@
+"""
+Storage Backends - Where Stored Images Live
+
+Blob and derivative files are addressed by key (a relative path such as
+blobs/ab/cd/<sha256>.jpg) and kept by one of:
+- LocalBackend: files under a directory (UPLOAD_ROOT), served by /uploads
+- S3Backend: objects in an S3-compatible bucket (AWS S3, MinIO, or a moto
+  server for local testing via S3_ENDPOINT_URL), read through presigned
+  or public URLs so API nodes need no shared disk
+
+Backend calls block; storage_service runs them in a worker thread. Writes
+are all-or-nothing: local files are renamed into place, and S3 uploads
+stream from the file object in multipart chunks and only become visible
+once complete.
+
+Select with STORAGE_BACKEND=local|s3 (see from_environment).
+"""
+
+import os
+import uuid
+import shutil
+import logging
+import mimetypes
+from pathlib import Path
+from typing import BinaryIO, Optional
+
+try:
+    import boto3
+    from boto3.s3.transfer import TransferConfig
+    from botocore.exceptions import ClientError
+except ImportError:  # Only needed for the S3 backend
+    boto3 = None
+
+logger = logging.getLogger(__name__)
+
+# Content-addressed objects never change, so readers may cache them forever
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+MULTIPART_CHUNK_BYTES = 8 * 1024 * 1024
+COPY_BUFFER_BYTES = 1024 * 1024
+
+
+def content_type(key: str) -> str:
+    return mimetypes.guess_type(key)[0] or "application/octet-stream"
+
+
+class StorageBackend:
+    """Key-addressed file store"""
+
+    name = "base"
+    # How long clients may cache a redirect to read_url()
+    read_url_max_age = 0
+
+    def exists(self, key: str) -> bool:
+        raise NotImplementedError
+
+    def write_stream(self, key: str, stream: BinaryIO):
+        """Store the rest of stream at key"""
+        raise NotImplementedError
+
+    def write_file(self, key: str, source: Path):
+        """Store a local file at key; the source file is consumed"""
+        raise NotImplementedError
+
+    def download(self, key: str, destination: Path):
+        raise NotImplementedError
+
+    def delete(self, key: str):
+        raise NotImplementedError
+
+    def delete_prefix(self, prefix: str) -> int:
+        """Delete every key starting with prefix; returns the number deleted"""
+        raise NotImplementedError
+
+    def local_path(self, key: str) -> Optional[Path]:
+        """Filesystem path of key, if this backend keeps it on local disk"""
+        return None
+
+    def read_url(self, key: str) -> Optional[str]:
+        """URL clients can fetch key from directly, if there is one"""
+        return None
+
+
+class LocalBackend(StorageBackend):
+    """Files under a root directory"""
+
+    name = "local"
+
+    def __init__(self, root: Path):
+        self.root = Path(root)
+
+    def _path(self, key: str) -> Optional[Path]:
+        root = self.root.resolve()
+        path = (root / key).resolve()
+        return path if root in path.parents else None
+
+    def _temp_path(self, target: Path) -> Path:
+        return target.parent / f".{target.name}.{uuid.uuid4().hex}.tmp"
+
+    def exists(self, key: str) -> bool:
+        return self.local_path(key) is not None
+
+    def write_stream(self, key: str, stream: BinaryIO):
+        target = self._path(key)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        temp = self._temp_path(target)
+        try:
+            with open(temp, "wb") as f:
+                shutil.copyfileobj(stream, f, COPY_BUFFER_BYTES)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp, target)
+        finally:
+            temp.unlink(missing_ok=True)
+
+    def write_file(self, key: str, source: Path):
+        target = self._path(key)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        temp = self._temp_path(target)
+        try:
+            # A rename when source is on the same filesystem
+            shutil.move(str(source), str(temp))
+            os.replace(temp, target)
+        finally:
+            temp.unlink(missing_ok=True)
+
+    def download(self, key: str, destination: Path):
+        shutil.copyfile(self._path(key), destination)
+
+    def delete(self, key: str):
+        path = self._path(key)
+        if path is not None:
+            path.unlink(missing_ok=True)
+
+    def delete_prefix(self, prefix: str) -> int:
+        directory, _, name_prefix = prefix.rpartition("/")
+        parent = self._path(directory) if directory else self.root
+        if parent is None or not parent.is_dir():
+            return 0
+        deleted = 0
+        for path in parent.glob(f"{name_prefix}*"):
+            if path.is_file():
+                path.unlink(missing_ok=True)
+                deleted += 1
+        return deleted
+
+    def local_path(self, key: str) -> Optional[Path]:
+        path = self._path(key)
+        return path if path is not None and path.is_file() else None
+
+
+class S3Backend(StorageBackend):
+    """Objects in an S3-compatible bucket, under an optional key prefix"""
+
+    name = "s3"
+
+    def __init__(self, bucket: str, prefix: str = "", endpoint_url: Optional[str] = None,
+                 region: Optional[str] = None, presign_seconds: int = 3600,
+                 public_base_url: Optional[str] = None, max_concurrency: int = 4):
+        if boto3 is None:
+            raise RuntimeError("STORAGE_BACKEND=s3 requires boto3")
+        if not bucket:
+            raise RuntimeError("STORAGE_BACKEND=s3 requires S3_BUCKET")
+        self.bucket = bucket
+        self.prefix = prefix.strip("/")
+        self.presign_seconds = presign_seconds
+        self.public_base_url = public_base_url.rstrip("/") if public_base_url else None
+        # Public URLs never change; presigned ones are reused for half their life
+        self.read_url_max_age = 31536000 if self.public_base_url else presign_seconds // 2
+        self.client = boto3.client("s3", endpoint_url=endpoint_url or None, region_name=region or None)
+        self.transfer_config = TransferConfig(
+            multipart_threshold=MULTIPART_CHUNK_BYTES,
+            multipart_chunksize=MULTIPART_CHUNK_BYTES,
+            max_concurrency=max_concurrency
+        )
+
+    def _key(self, key: str) -> str:
+        return f"{self.prefix}/{key}" if self.prefix else key
+
+    def _extra_args(self, key: str) -> dict:
+        return {"ContentType": content_type(key), "CacheControl": IMMUTABLE_CACHE_CONTROL}
+
+    def exists(self, key: str) -> bool:
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=self._key(key))
+            return True
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return False
+            raise
+
+    def write_stream(self, key: str, stream: BinaryIO):
+        # Multipart above the threshold, parts uploaded concurrently
+        self.client.upload_fileobj(
+            stream, self.bucket, self._key(key),
+            ExtraArgs=self._extra_args(key), Config=self.transfer_config
+        )
+
+    def write_file(self, key: str, source: Path):
+        self.client.upload_file(
+            str(source), self.bucket, self._key(key),
+            ExtraArgs=self._extra_args(key), Config=self.transfer_config
+        )
+        source.unlink(missing_ok=True)
+
+    def download(self, key: str, destination: Path):
+        self.client.download_file(self.bucket, self._key(key), str(destination), Config=self.transfer_config)
+
+    def delete(self, key: str):
+        self.client.delete_object(Bucket=self.bucket, Key=self._key(key))
+
+    def delete_prefix(self, prefix: str) -> int:
+        deleted = 0
+        paginator = self.client.get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=self._key(prefix)):
+            objects = [{"Key": obj["Key"]} for obj in page.get("Contents", [])]
+            if objects:
+                self.client.delete_objects(Bucket=self.bucket, Delete={"Objects": objects, "Quiet": True})
+                deleted += len(objects)
+        return deleted
+
+    def read_url(self, key: str) -> Optional[str]:
+        if self.public_base_url:
+            return f"{self.public_base_url}/{self._key(key)}"
+        return self.client.generate_presigned_url(
+            "get_object",
+            Params={"Bucket": self.bucket, "Key": self._key(key)},
+            ExpiresIn=self.presign_seconds
+        )
+
+
+def from_environment(upload_root: Path) -> StorageBackend:
+    """
+    Backend configured by STORAGE_BACKEND (default local).
+
+    S3 settings: S3_BUCKET, S3_PREFIX, S3_ENDPOINT_URL (MinIO / moto),
+    S3_REGION, S3_PRESIGN_SECONDS, S3_PUBLIC_BASE_URL (CDN or public
+    bucket; presigned URLs are used when unset). Credentials come from the
+    standard AWS environment variables or profile.
+    """
+    kind = os.environ.get("STORAGE_BACKEND", "local").lower()
+    if kind == "s3":
+        backend = S3Backend(
+            bucket=os.environ.get("S3_BUCKET", ""),
+            prefix=os.environ.get("S3_PREFIX", ""),
+            endpoint_url=os.environ.get("S3_ENDPOINT_URL"),
+            region=os.environ.get("S3_REGION"),
+            presign_seconds=int(os.environ.get("S3_PRESIGN_SECONDS", "3600")),
+            public_base_url=os.environ.get("S3_PUBLIC_BASE_URL")
+        )
+        logger.info(f"Image storage: s3://{backend.bucket}/{backend.prefix}")
+        return backend
+
+    if kind != "local":
+        logger.warning(f"Unknown STORAGE_BACKEND '{kind}', using local storage")
+    return LocalBackend(upload_root)
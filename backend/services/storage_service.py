@@ -0,0 +1,259 @@
+"""
+Storage Service - Content-Addressed Image Storage
+
+Accepted images are stored once per distinct content, named by their
+SHA-256 and sharded into nested prefix directories:
+
+    uploads/blobs/ab/cd/abcd1234...<64 hex>.jpg   ->  /uploads/blobs/ab/cd/...
+
+Identical re-uploads reuse the stored blob; the `blobs` collection keeps a
+reference count per hash so a blob is deleted only when nothing uses it.
+Deletion is two-phase: the record is tombstoned (`deleting`) while its
+files are removed and only then dropped, and new references to a
+tombstoned blob wait for it to go, so a re-upload racing a release never
+ends up pointing at a deleted file.
+Files live in the configured storage backend (local disk or an S3 bucket,
+see storage_backends); writes run off the event loop and never expose a
+partial blob.
+
+Files uploaded before content addressing keep their old URLs: the
+migration script moves them into the blob store and records the old
+relative path in `upload_aliases`, which /uploads resolves.
+"""
+
+import io
+import os
+import hashlib
+import asyncio
+import logging
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import BinaryIO, Optional, Tuple
+from fastapi import UploadFile
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from services import storage_backends
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+UPLOAD_ROOT = Path(os.environ.get("UPLOAD_ROOT", Path(__file__).parent.parent / "uploads"))
+BLOB_PREFIX = "blobs"
+DERIVED_PREFIX = "derived"  # Thumbnails and previews (derivative_service)
+URL_PREFIX = "/uploads"
+# Two levels of two hex characters: 65,536 leaf directories
+SHARD_DEPTH = 2
+SHARD_WIDTH = 2
+HASH_CHUNK_SIZE = 1024 * 1024
+# Local scratch space for files on their way into the backend
+STAGING_DIR = UPLOAD_ROOT / ".staging"
+# Referencing a blob that is being deleted waits for the deletion to finish;
+# a tombstone older than this is treated as left by a crashed release()
+TOMBSTONE_WAIT_SECONDS = 0.05
+TOMBSTONE_TIMEOUT_SECONDS = 120
+
+# Backend holding blobs and derivatives
+backend = storage_backends.from_environment(UPLOAD_ROOT)
+
+
+@dataclass
+class StoredBlob:
+    sha256: str
+    ext: str
+    size: int
+    key: str        # Backend key (path relative to UPLOAD_ROOT when local)
+    created: bool   # False when identical content was already stored
+
+    @property
+    def url(self) -> str:
+        return f"{URL_PREFIX}/{self.key}"
+
+
+def normalize_ext(ext: Optional[str]) -> str:
+    ext = (ext or "bin").lower().lstrip(".")
+    return "jpg" if ext == "jpeg" else ext
+
+
+def shard_key(prefix: str, sha256: str, filename: str) -> str:
+    """Relative path of filename in the shard directory for sha256: <prefix>/ab/cd/<filename>"""
+    shards = [sha256[i * SHARD_WIDTH:(i + 1) * SHARD_WIDTH] for i in range(SHARD_DEPTH)]
+    return "/".join([prefix, *shards, filename])
+
+
+def blob_key(sha256: str, ext: str) -> str:
+    """Sharded relative path for a blob: blobs/ab/cd/<sha256>.<ext>"""
+    return shard_key(BLOB_PREFIX, sha256, f"{sha256}.{normalize_ext(ext)}")
+
+
+def hash_file(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _store_stream(key: str, stream: BinaryIO, overwrite: bool = False) -> bool:
+    """Write stream at key unless already stored (or overwrite); False if it was kept"""
+    if not overwrite and backend.exists(key):
+        return False
+    backend.write_stream(key, stream)
+    return True
+
+
+def _store_file(key: str, source: Path, overwrite: bool = False) -> bool:
+    """Move a local file to key unless already stored (then just drop it); False if it was kept"""
+    if not overwrite and backend.exists(key):
+        source.unlink(missing_ok=True)
+        return False
+    backend.write_file(key, source)
+    return True
+
+
+async def _reclaim_stale_tombstone(db, sha256: str):
+    """Take over a blob whose release() died between tombstoning and dropping it"""
+    stale = datetime.utcnow() - timedelta(seconds=TOMBSTONE_TIMEOUT_SECONDS)
+    result = await db.blobs.update_one(
+        {"_id": sha256, "deleting": True, "deleting_at": {"$lt": stale}},
+        {"$set": {"refs": 0}, "$unset": {"deleting": "", "deleting_at": ""}}
+    )
+    if result.modified_count:
+        logger.warning(f"Reclaimed stale deletion tombstone of blob {sha256}")
+
+
+async def _add_reference(db, sha256: str, ext: str, size: int) -> Tuple[StoredBlob, bool]:
+    """
+    Count one more user of the content; the first upload's extension names
+    the blob. Waits out a concurrent deletion of the same content.
+
+    Returns:
+        tuple: The blob, and whether this is now its only reference
+    """
+    while True:
+        try:
+            # A tombstoned record doesn't match, so the upsert collides with
+            # it on _id instead of reviving a blob whose files are going
+            blob = await db.blobs.find_one_and_update(
+                {"_id": sha256, "deleting": {"$ne": True}},
+                {
+                    "$inc": {"refs": 1},
+                    "$setOnInsert": {
+                        "ext": normalize_ext(ext),
+                        "size": size,
+                        "key": blob_key(sha256, ext),
+                        "created_at": datetime.utcnow()
+                    }
+                },
+                upsert=True,
+                return_document=ReturnDocument.AFTER
+            )
+            break
+        except DuplicateKeyError:
+            await _reclaim_stale_tombstone(db, sha256)
+            await asyncio.sleep(TOMBSTONE_WAIT_SECONDS)
+    return StoredBlob(sha256, blob["ext"], blob["size"], blob["key"], created=False), blob["refs"] == 1
+
+
+async def put(db, content: bytes, ext: str) -> StoredBlob:
+    """
+    Store image bytes (or reuse identical stored content) and take a reference.
+
+    Args:
+        db: Motor database
+        content: File content
+        ext: File extension (determines the served content type)
+
+    Returns:
+        StoredBlob: Where the content lives
+    """
+    sha256 = hashlib.sha256(content).hexdigest()
+    # Reference first, so a concurrent release() of the same content cannot
+    # delete the file we are about to rely on. The first reference always
+    # writes: a file still present then may be one a release is removing.
+    blob, first = await _add_reference(db, sha256, ext, len(content))
+    blob.created = await asyncio.to_thread(_store_stream, blob.key, io.BytesIO(content), first)
+    return blob
+
+
+async def put_upload(db, upload: UploadFile, ext: str) -> StoredBlob:
+    """
+    Store an uploaded file without reading it into memory: hashed in
+    chunks, then streamed to the backend from the request's spooled file.
+    """
+    digest = hashlib.sha256()
+    size = 0
+    while chunk := await upload.read(HASH_CHUNK_SIZE):
+        digest.update(chunk)
+        size += len(chunk)
+    await upload.seek(0)
+
+    blob, first = await _add_reference(db, digest.hexdigest(), ext, size)
+    blob.created = await asyncio.to_thread(_store_stream, blob.key, upload.file, first)
+    return blob
+
+
+async def put_file(db, source: Path, ext: str) -> StoredBlob:
+    """
+    Move an existing file (e.g. a validated temp upload) into the blob store
+    without copying it, and take a reference. The source path is consumed.
+    """
+    sha256 = await asyncio.to_thread(hash_file, source)
+    blob, first = await _add_reference(db, sha256, ext, source.stat().st_size)
+    blob.created = await asyncio.to_thread(_store_file, blob.key, source, first)
+    return blob
+
+
+def _remove_files(sha256: str, key: str):
+    """Delete a blob's file and any derivatives rendered from it"""
+    backend.delete(key)
+    backend.delete_prefix(shard_key(DERIVED_PREFIX, sha256, f"{sha256}-"))
+
+
+async def release(db, sha256: str) -> bool:
+    """
+    Drop one reference to a blob, deleting it when none remain.
+
+    Returns:
+        bool: True if the blob was deleted
+    """
+    blob = await db.blobs.find_one_and_update(
+        {"_id": sha256, "deleting": {"$ne": True}}, {"$inc": {"refs": -1}},
+        return_document=ReturnDocument.AFTER
+    )
+    if not blob or blob.get("refs", 0) > 0:
+        return False
+
+    # Tombstone first, guarded on refs so a concurrent put() that
+    # re-referenced it wins; from here on new references wait for the
+    # record to be dropped, which happens only once the files are gone
+    result = await db.blobs.update_one(
+        {"_id": sha256, "refs": {"$lte": 0}, "deleting": {"$ne": True}},
+        {"$set": {"deleting": True, "deleting_at": datetime.utcnow()}}
+    )
+    if not result.modified_count:
+        return False
+    await asyncio.to_thread(_remove_files, sha256, blob["key"])
+    await db.blobs.delete_one({"_id": sha256, "deleting": True})
+    logger.info(f"Deleted unreferenced blob {sha256}")
+    return True
+
+
+async def add_alias(db, legacy_path: str, blob: StoredBlob):
+    """Keep a pre-content-addressing URL (path relative to /uploads) resolving to blob"""
+    await db.upload_aliases.update_one(
+        {"_id": legacy_path},
+        {"$set": {"sha256": blob.sha256, "key": blob.key}},
+        upsert=True
+    )
+
+
+async def resolve_alias(db, legacy_path: str) -> Optional[str]:
+    """Blob key for a legacy upload path, or None"""
+    alias = await db.upload_aliases.find_one({"_id": legacy_path}, {"key": 1})
+    return alias["key"] if alias else None
+
+
+async def exists(key: str) -> bool:
+    return await asyncio.to_thread(backend.exists, key)
@@ -0,0 +1,181 @@
+"""
+Supervisor Service - Supervisor Dashboard Queries
+
+The supervisor dashboard cards (pending, overdue, escalated today) and the
+filtered complaint list come from one aggregation: a $match on the
+supervisor followed by a $facet with one branch per counter and one branch
+for the keyset-paginated list. Escalation time is read from the indexed
+`escalated_at` field written by escalation rather than from the timeline.
+"""
+
+import logging
+from typing import Dict, List, Optional, Tuple
+from datetime import datetime, timedelta
+from pymongo import UpdateOne
+
+from utils.pagination import ASCENDING, page_stages, finish_page
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+DASHBOARD_FILTERS = ("pending", "overdue", "all")
+# Complaints escalated within this window count as "new today"
+NEW_ESCALATION_WINDOW = timedelta(days=1)
+# Dashboard list order (earliest deadline first)
+LIST_SORT_FIELD = "supervisor_deadline"
+BACKFILL_BATCH_SIZE = 500
+
+
+def pending_filter() -> Dict:
+    """Complaints still waiting on the supervisor (null/missing counts as pending)"""
+    return {"supervisor_status": {"$in": ["PENDING", None]}}
+
+
+def overdue_filter(now: datetime) -> Dict:
+    """Pending complaints past their supervisor deadline"""
+    return {**pending_filter(), "supervisor_deadline": {"$lt": now}}
+
+
+def list_filter(filter: str, now: datetime) -> Dict:
+    """Dashboard list filter: 'pending', 'overdue' or 'all'"""
+    if filter == "pending":
+        return pending_filter()
+    if filter == "overdue":
+        return overdue_filter(now)
+    return {}
+
+
+def dashboard_pipeline(supervisor_id: str, filter: str, now: datetime,
+                       page_size: int, cursor: Optional[str] = None) -> List[Dict]:
+    """
+    One aggregation producing the dashboard counters and one list page.
+
+    Raises:
+        InvalidCursor: If cursor cannot be decoded
+    """
+    def count_of(match: Dict) -> List[Dict]:
+        return [{"$match": match}, {"$count": "n"}]
+
+    return [
+        {"$match": {"supervisor_id": supervisor_id}},
+        {"$facet": {
+            "pending": count_of(pending_filter()),
+            "overdue": count_of(overdue_filter(now)),
+            "new_today": count_of({"escalated_at": {"$gte": now - NEW_ESCALATION_WINDOW}}),
+            "complaints": page_stages(
+                list_filter(filter, now), LIST_SORT_FIELD, ASCENDING, page_size, cursor
+            ),
+        }}
+    ]
+
+
+async def get_dashboard(
+    db,
+    supervisor_id: str,
+    filter: str = "pending",
+    page_size: int = 100,
+    cursor: Optional[str] = None
+) -> Tuple[Dict[str, int], List[Dict], Optional[str]]:
+    """
+    Dashboard counters and one page of the filtered complaint list.
+
+    Args:
+        db: Motor database
+        supervisor_id: Supervisor whose complaints are shown
+        filter: 'pending' | 'overdue' | 'all'
+        page_size: Complaints per page
+        cursor: Token from the previous page's next_cursor
+
+    Returns:
+        tuple: (stats, complaints, next_cursor or None on the last page)
+
+    Raises:
+        InvalidCursor: If cursor cannot be decoded
+    """
+    pipeline = dashboard_pipeline(supervisor_id, filter, datetime.utcnow(), page_size, cursor)
+    rows = await db.complaints.aggregate(pipeline).to_list(1)
+    row = rows[0] if rows else {}
+
+    def count(field: str) -> int:
+        counted = row.get(field) or []
+        return int(counted[0]["n"]) if counted else 0
+
+    stats = {
+        "new_today": count("new_today"),
+        "pending": count("pending"),
+        "overdue": count("overdue")
+    }
+    complaints, next_cursor = finish_page(row.get("complaints", []), LIST_SORT_FIELD, page_size)
+    return stats, complaints, next_cursor
+
+
+def _escalation_time(complaint: Dict) -> Optional[datetime]:
+    """Latest sent_to_supervisor timestamp in a complaint's timeline"""
+    latest = None
+    for event in complaint.get("timeline") or []:
+        if event.get("action") != "sent_to_supervisor":
+            continue
+        ts = event.get("timestamp") or event.get("datetime")
+        if isinstance(ts, str):
+            try:
+                ts = datetime.fromisoformat(ts)
+            except ValueError:
+                continue
+        if isinstance(ts, datetime) and (latest is None or ts > latest):
+            latest = ts
+    return latest
+
+
+async def backfill_escalated_at(db) -> int:
+    """
+    Set escalated_at on complaints escalated before the field existed,
+    from their timeline. Safe to re-run.
+
+    Returns:
+        int: Number of complaints updated
+    """
+    updated = 0
+    pending = []
+    try:
+        cursor = db.complaints.find(
+            {"supervisor_id": {"$ne": None}, "escalated_at": None},
+            {"_id": 1, "timeline": 1}
+        )
+        async for complaint in cursor:
+            escalated_at = _escalation_time(complaint)
+            if escalated_at is None:
+                continue
+            pending.append(UpdateOne(
+                {"_id": complaint["_id"], "escalated_at": None},
+                {"$set": {"escalated_at": escalated_at}}
+            ))
+
+            if len(pending) >= BACKFILL_BATCH_SIZE:
+                result = await db.complaints.bulk_write(pending, ordered=False)
+                updated += result.modified_count
+                pending = []
+
+        if pending:
+            result = await db.complaints.bulk_write(pending, ordered=False)
+            updated += result.modified_count
+    except Exception as e:
+        logger.error(f"escalated_at backfill failed: {str(e)}")
+
+    if updated:
+        logger.info(f"Backfilled escalated_at on {updated} complaint(s)")
+    return updated
+
+
+async def create_indexes(db):
+    """
+    Create database indexes for the supervisor dashboard.
+    Should be called during app initialization.
+    """
+    try:
+        await db.complaints.create_index(
+            [("supervisor_id", 1), ("supervisor_status", 1), ("supervisor_deadline", 1)]
+        )
+        await db.complaints.create_index([("supervisor_id", 1), ("escalated_at", -1)])
+        logger.info("Created supervisor dashboard indexes on complaints collection")
+    except Exception as e:
+        logger.error(f"Failed to create indexes: {str(e)}")
@@ -0,0 +1,134 @@
+"""
+Upload Token Service - Validated Image Handoff
+
+An image accepted by /api/validate-image is moved straight into the blob
+store and the client gets a short-lived upload token for it. Passing the
+token to /api/complaints/create attaches the already-stored blob to the
+complaint, so the image is uploaded once instead of twice.
+
+Each token holds one blob reference (storage_service). Redeeming the token
+hands that reference to the complaint (or back to a restored token if the
+complaint could not be created); a token that expires unused is
+swept and its reference released, so abandoned validations don't leak
+storage. (Expiry is swept here rather than by a MongoDB TTL index, which
+would delete tokens without releasing their blobs.)
+"""
+
+import os
+import secrets
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+
+from services import storage_service
+from services.storage_service import StoredBlob
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+UPLOAD_TOKEN_TTL_SECONDS = int(os.environ.get("UPLOAD_TOKEN_TTL_SECONDS", "1800"))
+UPLOAD_TOKEN_SWEEP_INTERVAL_SECONDS = int(os.environ.get("UPLOAD_TOKEN_SWEEP_INTERVAL_SECONDS", "300"))
+SWEEP_BATCH_SIZE = 500
+
+
+async def issue(db, blob: StoredBlob, validation_id: Optional[str] = None) -> Dict:
+    """
+    Create a token for a stored, validated image. The caller's blob
+    reference now belongs to the token.
+
+    Returns:
+        dict: Token document (_id is the token, expires_at its expiry)
+    """
+    now = datetime.utcnow()
+    token = {
+        "_id": secrets.token_urlsafe(24),
+        "sha256": blob.sha256,
+        "ext": blob.ext,
+        "size": blob.size,
+        "key": blob.key,
+        "validation_id": validation_id,
+        "created_at": now,
+        "expires_at": now + timedelta(seconds=UPLOAD_TOKEN_TTL_SECONDS)
+    }
+    await db.upload_tokens.insert_one(token)
+    return token
+
+
+async def redeem(db, token: str) -> Optional[Dict]:
+    """
+    Consume an unexpired token (at most once). Its blob reference passes to
+    the caller.
+
+    Returns:
+        dict: Token document, or None if unknown, used or expired
+    """
+    return await db.upload_tokens.find_one_and_delete(
+        {"_id": token, "expires_at": {"$gt": datetime.utcnow()}}
+    )
+
+
+async def restore(db, token: Dict):
+    """
+    Put back a redeemed token whose complaint could not be created, with its
+    blob reference and original expiry, so the client can retry with it.
+    """
+    await db.upload_tokens.insert_one(token)
+
+
+def stored_blob(token: Dict) -> StoredBlob:
+    """The stored image a redeemed token refers to"""
+    return StoredBlob(token["sha256"], token["ext"], token["size"], token["key"], created=False)
+
+
+async def sweep_expired(db) -> int:
+    """
+    Delete expired tokens and release their blobs.
+
+    Returns:
+        int: Number of tokens swept
+    """
+    now = datetime.utcnow()
+    expired = await db.upload_tokens.find(
+        {"expires_at": {"$lte": now}}, {"_id": 1}
+    ).limit(SWEEP_BATCH_SIZE).to_list(length=SWEEP_BATCH_SIZE)
+
+    swept = 0
+    for token in expired:
+        # Deleting first means exactly one of sweep / redeem wins each token
+        token = await db.upload_tokens.find_one_and_delete({"_id": token["_id"], "expires_at": {"$lte": now}})
+        if token:
+            await storage_service.release(db, token["sha256"])
+            swept += 1
+
+    if swept:
+        logger.info(f"Swept {swept} expired upload token(s)")
+    return swept
+
+
+async def run_sweep_loop(db, interval_seconds: int = UPLOAD_TOKEN_SWEEP_INTERVAL_SECONDS) -> None:
+    """
+    Periodically sweep expired tokens. Started from the app lifespan and
+    cancelled on shutdown.
+    """
+    while True:
+        try:
+            while await sweep_expired(db) == SWEEP_BATCH_SIZE:
+                pass
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Upload token sweep failed: {str(e)}")
+        await asyncio.sleep(interval_seconds)
+
+
+async def create_indexes(db):
+    """
+    Create database indexes for upload tokens.
+    Should be called during app initialization.
+    """
+    try:
+        await db.upload_tokens.create_index("expires_at")
+        logger.info("Created indexes on upload_tokens collection")
+    except Exception as e:
+        logger.error(f"Failed to create indexes: {str(e)}")
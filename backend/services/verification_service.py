@@ -0,0 +1,195 @@
+"""
+Verification Service - Denormalized Verification Counters
+
+Each issue carries a `verifications` sub-document {yes, no, not_sure, total}
+maintained with atomic $inc when a verification is submitted, so reads never
+have to load or count verification documents. A reconciliation pass rebuilds
+the counters from the verifications collection to repair any drift (and
+doubles as the one-off backfill for issues created before the counters).
+It never races a live submission: counters are read before the recount and
+only rewritten if unchanged since, and issues verified within the last
+RECONCILE_SETTLE_SECONDS are left for the next pass.
+"""
+
+import os
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Set
+from pymongo import UpdateOne
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+VERIFICATION_RESPONSES = ("yes", "no", "not_sure")
+RECONCILE_INTERVAL_SECONDS = int(os.environ.get("VERIFICATION_RECONCILE_INTERVAL_SECONDS", "3600"))
+RECONCILE_BATCH_SIZE = 500
+# Longest expected gap between storing a verification and its counter $inc
+RECONCILE_SETTLE_SECONDS = 60
+
+# An issue counts as community-verified once it has this many "yes" responses
+VERIFIED_YES_THRESHOLD = 3
+
+
+def empty_counts() -> Dict[str, int]:
+    """Counters for an issue with no verifications"""
+    return {"yes": 0, "no": 0, "not_sure": 0, "total": 0}
+
+
+def counts_of(issue: Dict) -> Dict[str, int]:
+    """
+    Verification counters stored on an issue document.
+
+    Issues that predate the counters (not yet backfilled) read as zero.
+    """
+    counts = empty_counts()
+    counts.update({k: v for k, v in (issue.get("verifications") or {}).items() if k in counts})
+    return counts
+
+
+def verified_filter(verified: bool) -> Dict:
+    """Issue query for verified / unverified issues on the indexed counter"""
+    if verified:
+        return {"verifications.yes": {"$gte": VERIFIED_YES_THRESHOLD}}
+    # $not also matches issues without counters yet
+    return {"verifications.yes": {"$not": {"$gte": VERIFIED_YES_THRESHOLD}}}
+
+
+async def record_verification(db, issue_id: str, response: str) -> None:
+    """
+    Atomically bump the issue's counters for one new verification.
+
+    Args:
+        db: Motor database
+        issue_id: Issue the verification belongs to
+        response: 'yes' | 'no' | 'not_sure'
+    """
+    response = getattr(response, "value", response)
+    if response not in VERIFICATION_RESPONSES:
+        raise ValueError(f"Unknown verification response: {response}")
+
+    await db.issues.update_one(
+        {"id": issue_id},
+        {"$inc": {f"verifications.{response}": 1, "verifications.total": 1}}
+    )
+
+
+async def _tally(db, issue_ids: Optional[List[str]] = None) -> Dict[str, Dict[str, int]]:
+    """Recount verifications per issue from the source of truth"""
+    pipeline = []
+    if issue_ids is not None:
+        pipeline.append({"$match": {"issue_id": {"$in": issue_ids}}})
+    pipeline.append({"$group": {
+        "_id": {"issue_id": "$issue_id", "response": "$response"},
+        "count": {"$sum": 1}
+    }})
+
+    tallies: Dict[str, Dict[str, int]] = {}
+    async for row in db.verifications.aggregate(pipeline, allowDiskUse=True):
+        counts = tallies.setdefault(row["_id"]["issue_id"], empty_counts())
+        response = row["_id"]["response"]
+        if response in VERIFICATION_RESPONSES:
+            counts[response] += row["count"]
+        counts["total"] += row["count"]
+    return tallies
+
+
+async def _recently_verified(db, issue_ids: List[str], since: datetime) -> Set[str]:
+    """Issues among issue_ids with a verification submitted at or after since"""
+    return set(await db.verifications.distinct(
+        "issue_id", {"issue_id": {"$in": issue_ids}, "verified_at": {"$gte": since}}
+    ))
+
+
+async def _reconcile_batch(db, snapshot: Dict[str, Optional[Dict]]) -> int:
+    """
+    Correct the counters of one batch of issues.
+
+    Args:
+        snapshot: Issue id -> counters as read before tallying
+    """
+    # Counters were read before this, so verifications older than the settle
+    # window have had their $inc applied by then and appear on both sides.
+    # Issues with a newer one are left to the next pass: its $inc may land
+    # before or after the read and the tally.
+    settled_before = datetime.utcnow() - timedelta(seconds=RECONCILE_SETTLE_SECONDS)
+    issue_ids = list(snapshot)
+    tallies = await _tally(db, issue_ids)
+    unsettled = await _recently_verified(db, issue_ids, settled_before)
+
+    pending = []
+    for issue_id, current in snapshot.items():
+        expected = tallies.get(issue_id, empty_counts())
+        if issue_id in unsettled or current == expected:
+            continue
+        # Conditional on the counters read before the tally: an $inc since
+        # then changes them, so the stale correction is skipped, not applied
+        pending.append(UpdateOne(
+            {"id": issue_id, "verifications": current},
+            {"$set": {"verifications": expected}}
+        ))
+
+    if not pending:
+        return 0
+    result = await db.issues.bulk_write(pending, ordered=False)
+    return result.modified_count
+
+
+async def reconcile_counters(db, issue_ids: Optional[List[str]] = None) -> int:
+    """
+    Rewrite issue counters that disagree with the verifications collection.
+
+    Args:
+        db: Motor database
+        issue_ids: Limit to these issues (default: all issues)
+
+    Returns:
+        int: Number of issues whose counters were corrected
+    """
+    query = {"id": {"$in": issue_ids}} if issue_ids is not None else {}
+    cursor = db.issues.find(query, {"_id": 0, "id": 1, "verifications": 1})
+
+    repaired = 0
+    snapshot: Dict[str, Optional[Dict]] = {}
+    async for issue in cursor:
+        snapshot[issue["id"]] = issue.get("verifications")
+        if len(snapshot) >= RECONCILE_BATCH_SIZE:
+            repaired += await _reconcile_batch(db, snapshot)
+            snapshot = {}
+
+    if snapshot:
+        repaired += await _reconcile_batch(db, snapshot)
+
+    if repaired:
+        logger.warning(f"Reconciled verification counters on {repaired} issue(s)")
+    else:
+        logger.info("Verification counters are consistent")
+    return repaired
+
+
+async def run_reconciliation_loop(db, interval_seconds: int = RECONCILE_INTERVAL_SECONDS) -> None:
+    """
+    Periodically reconcile all counters. Started from the app lifespan and
+    cancelled on shutdown.
+    """
+    while True:
+        await asyncio.sleep(interval_seconds)
+        try:
+            await reconcile_counters(db)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Verification counter reconciliation failed: {str(e)}")
+
+
+async def create_indexes(db):
+    """
+    Create database indexes for counter-based verification filters.
+    Should be called during app initialization.
+    """
+    try:
+        await db.issues.create_index([("verifications.yes", 1)])
+        await db.issues.create_index([("verifications.total", 1)])
+        logger.info("Created verification counter indexes on issues collection")
+    except Exception as e:
+        logger.error(f"Failed to create indexes: {str(e)}")
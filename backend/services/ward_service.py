@@ -0,0 +1,164 @@
+"""
+Ward Service - Point-in-Polygon Ward Resolution
+
+Resolves (latitude, longitude) to the ward containing it, from ward
+boundary polygons in a local GeoJSON FeatureCollection
+(config/ward_boundaries.geojson by default, WARD_BOUNDARIES_PATH to
+override). Each feature is a Polygon or MultiPolygon whose
+properties[WARD_PROPERTY] holds the ward number.
+
+Polygons are indexed by bounding box in a uniform grid over the city's
+extent, so a lookup checks only the few polygons whose box overlaps the
+point's cell, then runs an exact even-odd ray test (holes respected).
+
+Without a boundaries file the service is disabled and resolve_ward()
+returns None, so callers keep the ward the citizen declared.
+"""
+
+import os
+import json
+import logging
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+BOUNDARIES_PATH = Path(os.environ.get(
+    "WARD_BOUNDARIES_PATH",
+    Path(__file__).parent.parent / "config" / "ward_boundaries.geojson"
+))
+WARD_PROPERTY = os.environ.get("WARD_PROPERTY", "ward")
+# Grid cells along the longer side of the boundaries' extent
+GRID_SIZE = int(os.environ.get("WARD_GRID_SIZE", "64"))
+
+
+class WardPolygon:
+    """One polygon of a ward (outer ring plus holes) as (lon, lat) edge arrays"""
+
+    def __init__(self, ward: int, rings: List[List[List[float]]]):
+        self.ward = ward
+        starts, ends = [], []
+        for ring in rings:
+            points = np.asarray([p[:2] for p in ring], dtype=np.float64)
+            if len(points) < 3:
+                continue
+            # Edges as (x0, y0) -> (x1, y1), closing the ring if needed
+            starts.append(points)
+            ends.append(np.roll(points, -1, axis=0))
+
+        # All rings' edges in one array: the even-odd count over outer ring
+        # and holes together leaves points inside a hole outside
+        self.has_area = bool(starts)
+        edges_from = np.concatenate(starts) if starts else np.empty((0, 2))
+        edges_to = np.concatenate(ends) if ends else np.empty((0, 2))
+        self.x0, self.y0 = edges_from[:, 0], edges_from[:, 1]
+        self.x1, self.y1 = edges_to[:, 0], edges_to[:, 1]
+
+        if self.has_area:
+            outer = starts[0]
+            self.bbox = (outer[:, 0].min(), outer[:, 1].min(), outer[:, 0].max(), outer[:, 1].max())
+        else:
+            self.bbox = (np.inf, np.inf, -np.inf, -np.inf)
+
+    def contains(self, lon: float, lat: float) -> bool:
+        min_x, min_y, max_x, max_y = self.bbox
+        if not (min_x <= lon <= max_x and min_y <= lat <= max_y):
+            return False
+        straddles = (self.y0 > lat) != (self.y1 > lat)
+        x0, y0 = self.x0[straddles], self.y0[straddles]
+        x_at = x0 + (lat - y0) * (self.x1[straddles] - x0) / (self.y1[straddles] - y0)
+        return int(np.count_nonzero(lon < x_at)) % 2 == 1
+
+
+class WardIndex:
+    """Uniform grid over polygon bounding boxes"""
+
+    def __init__(self, polygons: List[WardPolygon], grid_size: int = GRID_SIZE):
+        self.polygons = [p for p in polygons if p.has_area]
+        self.cells: Dict[Tuple[int, int], List[WardPolygon]] = {}
+        if not self.polygons:
+            self.origin, self.cell_size = (0.0, 0.0), 1.0
+            return
+
+        min_x = min(p.bbox[0] for p in self.polygons)
+        min_y = min(p.bbox[1] for p in self.polygons)
+        max_x = max(p.bbox[2] for p in self.polygons)
+        max_y = max(p.bbox[3] for p in self.polygons)
+        self.origin = (min_x, min_y)
+        self.cell_size = max(max_x - min_x, max_y - min_y, 1e-9) / max(grid_size, 1)
+
+        for polygon in self.polygons:
+            (cx0, cy0), (cx1, cy1) = self._cell(*polygon.bbox[:2]), self._cell(*polygon.bbox[2:])
+            for cx in range(cx0, cx1 + 1):
+                for cy in range(cy0, cy1 + 1):
+                    self.cells.setdefault((cx, cy), []).append(polygon)
+
+    def _cell(self, lon: float, lat: float) -> Tuple[int, int]:
+        return (int((lon - self.origin[0]) // self.cell_size),
+                int((lat - self.origin[1]) // self.cell_size))
+
+    def __len__(self) -> int:
+        return len(self.polygons)
+
+    def lookup(self, latitude: float, longitude: float) -> Optional[int]:
+        for polygon in self.cells.get(self._cell(longitude, latitude), ()):
+            if polygon.contains(longitude, latitude):
+                return polygon.ward
+        return None
+
+
+def _feature_polygons(feature: Dict) -> List[WardPolygon]:
+    properties = feature.get("properties") or {}
+    geometry = feature.get("geometry") or {}
+    try:
+        ward = int(properties[WARD_PROPERTY])
+    except (KeyError, TypeError, ValueError):
+        logger.warning(f"Skipping ward boundary without a numeric '{WARD_PROPERTY}' property")
+        return []
+
+    if geometry.get("type") == "Polygon":
+        return [WardPolygon(ward, geometry.get("coordinates") or [])]
+    if geometry.get("type") == "MultiPolygon":
+        return [WardPolygon(ward, rings) for rings in geometry.get("coordinates") or []]
+    logger.warning(f"Skipping ward {ward} boundary with geometry type {geometry.get('type')}")
+    return []
+
+
+def load_ward_index(path: Path = BOUNDARIES_PATH) -> WardIndex:
+    """Build the ward index from a GeoJSON FeatureCollection (empty if unavailable)"""
+    try:
+        with open(path, 'r') as f:
+            collection = json.load(f)
+    except FileNotFoundError:
+        logger.info(f"No ward boundaries at {path}; using declared wards")
+        return WardIndex([])
+    except json.JSONDecodeError as e:
+        logger.error(f"Invalid ward boundaries GeoJSON: {e}")
+        return WardIndex([])
+
+    polygons = []
+    for feature in collection.get("features") or []:
+        polygons.extend(_feature_polygons(feature))
+
+    index = WardIndex(polygons)
+    logger.info(f"Loaded {len(index)} ward boundary polygon(s) from {path}")
+    return index
+
+
+# Global ward index (loaded once)
+WARD_INDEX = load_ward_index()
+
+
+def resolve_ward(latitude: Optional[float], longitude: Optional[float]) -> Optional[int]:
+    """
+    Ward containing a point.
+
+    Returns:
+        int: Ward number, or None if outside every boundary, coordinates
+        are missing, or no boundaries are loaded
+    """
+    if latitude is None or longitude is None:
+        return None
+    return WARD_INDEX.lookup(float(latitude), float(longitude))
@@ -0,0 +1,156 @@
+"""
+Workload Service - Severity-Weighted Open Complaint Load
+
+Tracks how much open work each officer and supervisor holds so routing can
+pick the least-loaded of several candidates:
+- officer load: complaints assigned to the officer in an open status
+- supervisor load: complaints awaiting the supervisor's review
+each weighted by severity (SEVERITY_WEIGHTS).
+
+Loads are kept in memory and adjusted from the API's complaint writes
+(on_transition), then periodically rebuilt from an aggregation over
+complaints, which also absorbs changes made by other workers and by the
+SLA engine.
+"""
+
+import os
+import asyncio
+import logging
+from typing import Dict, Iterable, Optional
+
+from services.sla_service import OFFICER_OPEN_STATUSES
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+WORKLOAD_RECONCILE_INTERVAL_SECONDS = float(os.environ.get("WORKLOAD_RECONCILE_INTERVAL_SECONDS", "60"))
+
+SEVERITY_WEIGHTS = {"critical": 4.0, "high": 3.0, "medium": 2.0, "low": 1.0}
+DEFAULT_WEIGHT = 1.0
+
+OFFICER = "officer"
+SUPERVISOR = "supervisor"
+
+# Status in which a complaint counts against its supervisor
+SUPERVISOR_OPEN_STATUS = "awaiting_supervisor"
+
+# Fields on_transition needs from the complaint before the write
+TRANSITION_PROJECTION = {
+    "_id": 0, "status": 1, "severity": 1, "assigned_officer.officer_id": 1, "supervisor_id": 1
+}
+
+
+def severity_weight(severity: Optional[str]) -> float:
+    return SEVERITY_WEIGHTS.get(str(severity or "").lower(), DEFAULT_WEIGHT)
+
+
+def _weight_expression() -> Dict:
+    """Aggregation expression for severity_weight($severity)"""
+    severity = {"$toLower": {"$ifNull": ["$severity", ""]}}
+    return {"$switch": {
+        "branches": [
+            {"case": {"$eq": [severity, name]}, "then": weight}
+            for name, weight in SEVERITY_WEIGHTS.items()
+        ],
+        "default": DEFAULT_WEIGHT
+    }}
+
+
+class WorkloadTracker:
+    """Per-process open-work totals for officers and supervisors"""
+
+    def __init__(self):
+        self._load: Dict[str, Dict[str, float]] = {OFFICER: {}, SUPERVISOR: {}}
+
+    def load_of(self, kind: str, person_id: str) -> float:
+        return self._load[kind].get(person_id, 0.0)
+
+    def adjust(self, kind: str, person_id: Optional[str], delta: float):
+        if not person_id or not delta:
+            return
+        loads = self._load[kind]
+        loads[person_id] = max(loads.get(person_id, 0.0) + delta, 0.0)
+
+    def least_loaded(self, kind: str, candidates: Iterable[str]) -> Optional[str]:
+        """Candidate with the least open work; ties go to the earliest listed"""
+        best, best_load = None, None
+        for person_id in candidates:
+            load = self.load_of(kind, person_id)
+            if best_load is None or load < best_load:
+                best, best_load = person_id, load
+        return best
+
+    def on_transition(self, before: Optional[Dict], status: str, supervisor_id: Optional[str] = None,
+                      officer_id: Optional[str] = None, severity: Optional[str] = None):
+        """
+        Apply one complaint status change to the loads.
+
+        Args:
+            before: Complaint as it was (TRANSITION_PROJECTION fields), None if new
+            status: Status after the write
+            supervisor_id: Supervisor assigned by this write, if any
+            officer_id / severity: For new complaints (before is None)
+        """
+        before = before or {}
+        weight = severity_weight(before.get("severity", severity))
+        old_status = before.get("status")
+
+        officer = (before.get("assigned_officer") or {}).get("officer_id") or officer_id
+        self.adjust(OFFICER, officer,
+                    weight * ((status in OFFICER_OPEN_STATUSES) - (old_status in OFFICER_OPEN_STATUSES)))
+
+        if old_status == SUPERVISOR_OPEN_STATUS:
+            self.adjust(SUPERVISOR, before.get("supervisor_id"), -weight)
+        if status == SUPERVISOR_OPEN_STATUS:
+            self.adjust(SUPERVISOR, supervisor_id or before.get("supervisor_id"), weight)
+
+    async def reconcile(self, db):
+        """Rebuild both load tables from the complaints collection"""
+        weight = _weight_expression()
+        officer_rows = await db.complaints.aggregate([
+            {"$match": {"status": {"$in": OFFICER_OPEN_STATUSES},
+                        "assigned_officer.officer_id": {"$ne": None}}},
+            {"$group": {"_id": "$assigned_officer.officer_id", "load": {"$sum": weight}}}
+        ]).to_list(length=None)
+        supervisor_rows = await db.complaints.aggregate([
+            {"$match": {"status": SUPERVISOR_OPEN_STATUS, "supervisor_id": {"$ne": None}}},
+            {"$group": {"_id": "$supervisor_id", "load": {"$sum": weight}}}
+        ]).to_list(length=None)
+
+        self._load = {
+            OFFICER: {row["_id"]: float(row["load"]) for row in officer_rows},
+            SUPERVISOR: {row["_id"]: float(row["load"]) for row in supervisor_rows},
+        }
+        logger.debug(f"Workload reconciled: {len(officer_rows)} officer(s), {len(supervisor_rows)} supervisor(s)")
+
+
+# Shared instance used by routing and the API
+workload = WorkloadTracker()
+
+
+async def run_reconcile_loop(db, interval_seconds: float = WORKLOAD_RECONCILE_INTERVAL_SECONDS) -> None:
+    """
+    Periodically rebuild loads from the database. Started from the app
+    lifespan and cancelled on shutdown.
+    """
+    while True:
+        try:
+            await workload.reconcile(db)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Workload reconciliation failed: {str(e)}")
+        await asyncio.sleep(interval_seconds)
+
+
+async def create_indexes(db):
+    """
+    Create database indexes for the workload aggregations.
+    Should be called during app initialization.
+    """
+    try:
+        await db.complaints.create_index([("status", 1), ("assigned_officer.officer_id", 1)])
+        await db.complaints.create_index([("status", 1), ("supervisor_id", 1)])
+        logger.info("Created workload indexes on complaints collection")
+    except Exception as e:
+        logger.error(f"Failed to create indexes: {str(e)}")
@@ -9,20 +9,34 @@ the likely source of an uploaded image without breaking existing validation logi
 import os
 import logging
 from pathlib import Path
-from typing import Dict, Optional, Tuple, List
+from typing import Callable, Dict, Optional, Tuple, List
 import struct
 import re
+from dataclasses import dataclass
+from math import gcd
+import numpy as np
 from PIL import Image
 from PIL.ExifTags import TAGS
 import piexif
 
+from services.exif_service import ExifRecord, extract_all as extract_exif_record
+
 logger = logging.getLogger(__name__)
 
-class ImageSourceForensics:
+# Edge and UI color analysis runs on an image reduced to this many pixels on
+# the longest side, which caps the metric arrays at a few MB per image
+PIXEL_ANALYSIS_MAX_SIDE = 1024
+# 8-byte blocks scanned per step when counting compression artifacts
+ARTIFACT_SCAN_CHUNK_BLOCKS = 65536
+
+class ForensicsRules:
     """
-    Advanced image forensics for source identification
+    Rule tables shared by every detector
+
+    Built once at import time (see RULES) so pattern compilation and table
+    setup are not repeated per image or per request.
     """
-    
+
     def __init__(self):
         # WhatsApp detection markers (ENHANCED)
         self.whatsapp_markers = {
@@ -74,528 +88,868 @@ class ImageSourceForensics:
                 'Apple', 'Samsung', 'Google', 'OnePlus', 'Xiaomi',
                 'Huawei', 'OPPO', 'Vivo', 'Nothing', 'Realme'
             ],
+            'known_camera_brands': [
+                'Apple', 'Samsung', 'Google', 'OnePlus', 'Xiaomi',
+                'Huawei', 'OPPO', 'Vivo', 'Sony', 'Canon', 'Nikon'
+            ],
             'camera_apps': [
                 'Camera', 'Open Camera', 'VSCO', 'Camera FV-5'
             ],
             'exif_indicators': [
                 'Make', 'Model', 'Software', 'DateTime',
                 'GPS', 'Flash', 'FocalLength', 'ExposureTime'
+            ],
+            'camera_settings': [
+                piexif.ExifIFD.ExposureTime,
+                piexif.ExifIFD.FNumber,
+                piexif.ExifIFD.ISOSpeedRatings,
+                piexif.ExifIFD.Flash,
+                piexif.ExifIFD.FocalLength,
+                piexif.ExifIFD.WhiteBalance,
+                piexif.ExifIFD.ExposureMode
             ]
         }
 
-    def detect_whatsapp(self, image_buffer: bytes, image_path: str, filename: str) -> Dict:
-        """
-        Enhanced WhatsApp detection using multiple markers
+        # Precompiled filename patterns as (source pattern, compiled) pairs
+        self.whatsapp_filename_regexes = [
+            (pattern, re.compile(pattern)) for pattern in self.whatsapp_markers['filename_patterns']
+        ]
+        self.screenshot_filename_regexes = [
+            (pattern, re.compile(pattern)) for pattern in self.screenshot_markers['filename_patterns']
+        ]
+        self.exact_screen_resolutions = frozenset(
+            self.screenshot_markers['exact_screen_resolutions']
+        )
+
+
+# Module-level rule singleton
+RULES = ForensicsRules()
+
+
+@dataclass
+class ImageFeatures:
+    """
+    Everything the detectors need, extracted at most once per image
+
+    Filled stage by stage by FeatureExtractor (extract_features() runs every
+    stage); markers and score_* functions read only from this record and
+    never touch the file again.
+    """
+    # Byte-level
+    file_size: int = 0
+    jpeg_signature: bool = False
+    png_signature: bool = False
+    
+    # Container (None when the image could not be opened)
+    open_error: Optional[str] = None
+    format: Optional[str] = None
+    width: int = 0
+    height: int = 0
+    aspect_ratio: Tuple[int, int] = (0, 0)
+    has_icc_profile: bool = False
+    jpeg_quality: Optional[int] = None
+    
+    # EXIF (exif_loaded is False when piexif could not parse the file)
+    exif_loaded: bool = False
+    has_0th: bool = False
+    has_exif_ifd: bool = False
+    exif_sections: int = 0
+    camera_make: Optional[str] = None
+    camera_model: Optional[str] = None
+    has_make_or_model: bool = False
+    software: Optional[str] = None
+    has_datetime: bool = False
+    has_gps_coordinates: bool = False
+    camera_settings_count: int = 0
+    
+    # Filename
+    whatsapp_filename_pattern: Optional[str] = None
+    screenshot_filename_pattern: Optional[str] = None
+    
+    # Pixel metrics (edges and UI colors at reduced scale, noise at full)
+    edge_ratio: float = 0.0
+    noise_ratio: Optional[float] = None
+    ui_color_hits: int = 0
+
+
+def _get_aspect_ratio(width: int, height: int) -> Tuple[int, int]:
+    """Calculate simplified aspect ratio"""
+    divisor = gcd(width, height) or 1
+    return (width // divisor, height // divisor)
+
+
+def _quality_from_size(file_size: int, pixels: int) -> int:
+    """Estimate JPEG quality from compressed bytes per pixel"""
+    if pixels <= 0:
+        return 80  # Default fallback
+    
+    bytes_per_pixel = file_size / pixels
+    
+    # Improved quality estimation based on compression ratio
+    if bytes_per_pixel > 3.0:
+        return 98  # Very high quality
+    elif bytes_per_pixel > 2.0:
+        return 92  # High quality
+    elif bytes_per_pixel > 1.5:
+        return 85  # Medium-high quality
+    elif bytes_per_pixel > 1.0:
+        return 75  # Medium quality (WhatsApp range)
+    elif bytes_per_pixel > 0.5:
+        return 65  # Medium-low quality (WhatsApp range)
+    else:
+        return 50  # Low quality
+
+
+def _analyze_pixels(img: Image.Image) -> Dict:
+    """
+    Single vectorized pixel analysis pass over an opened, not yet loaded image
+    
+    Edge and UI color metrics are computed from one array reduced so the
+    longest side is at most PIXEL_ANALYSIS_MAX_SIDE (box reduction). The
+    noise ratio needs sensor noise, which any reduction averages away, so
+    it is taken from a 200x200 full-resolution center crop: images large
+    enough for it are decoded at full scale once and reduced from that;
+    smaller ones are still draft-decoded (JPEG DCT scaling).
+    
+    Returns:
+        Dict with scale factor, edge_ratio, noise_ratio (None if the image is
+        too small) and ui_color_hits
+    """
+    metrics = {
+        'scale': 1.0,
+        'edge_ratio': 0.0,
+        'noise_ratio': None,
+        'ui_color_hits': 0
+    }
+    
+    try:
+        width, height = img.size
         
-        Required markers (minimum 3 for classification):
-        • JPEG signature (0xFF 0xD8)
-        • EXIF fully stripped OR camera model missing
-        • File size typically between 100–500 KB
-        • JPEG compression quality approx 60–75%
-        • ICC color profile missing
-        • Standard phone aspect ratio (9:16, 16:9)
+        # Noise ratio: full-resolution center sample, before any reduction
+        if width >= 200 and height >= 200:
+            sample_h, sample_w = min(200, height // 2), min(200, width // 2)
+            start_h, start_w = height // 4, width // 4
+            sample = np.asarray(
+                img.crop((start_w, start_h, start_w + sample_w, start_h + sample_h)).convert('L'),
+                dtype=np.float64
+            )
+            metrics['noise_ratio'] = float(sample.std() / (sample.mean() + 1))
+        elif img.format == 'JPEG':
+            img.draft('RGB', (PIXEL_ANALYSIS_MAX_SIDE, PIXEL_ANALYSIS_MAX_SIDE))
+        reduced = img.convert('RGB')
         
-        Returns:
-            Dict with type, confidence (0-100), and markers
-        """
-        markers = {
-            'jpeg_signature': False,
-            'exif_stripped': False,
-            'file_size_range': False,
-            'compression_quality': False,
-            'icc_missing': False,
-            'phone_aspect_ratio': False,
-            'whatsapp_filename': False,
-            'resolution_pattern': False
-        }
+        factor = -(-max(reduced.size) // PIXEL_ANALYSIS_MAX_SIDE)
+        if factor > 1:
+            reduced = reduced.reduce(factor)
+        
+        rgb = np.asarray(reduced)
+        gray = np.asarray(reduced.convert('L'), dtype=np.int16)
+        red_h, red_w = gray.shape
+        scale = width / red_w
+        metrics['scale'] = scale
+        
+        # Edge ratio: sharp gradients between neighbouring pixels, taken
+        # from offset views of the same array rather than np.diff copies
+        if red_h >= 2 and red_w >= 2 and width >= 50 and height >= 50:
+            sharp_x = np.count_nonzero(np.abs(gray[:, 1:] - gray[:, :-1]) > 50)
+            sharp_y = np.count_nonzero(np.abs(gray[1:, :] - gray[:-1, :]) > 50)
+            metrics['edge_ratio'] = float((sharp_x + sharp_y) / gray.size)
         
-        confidence = 0
-        evidence = []
+        # UI colors: sample edge centers where UI bars typically appear
+        if width >= 100 and height >= 100:
+            inset_x = min(int(10 / scale), red_w - 1)
+            inset_y = min(int(10 / scale), red_h - 1)
+            points = rgb[
+                [inset_y, red_h - 1 - inset_y, red_h // 2, red_h // 2],
+                [red_w // 2, red_w // 2, inset_x, red_w - 1 - inset_x]
+            ].astype(np.int16)
+            r, g, b = points[:, 0], points[:, 1], points[:, 2]
+            pure = (r == g) & (g == b) & ((r == 0) | (r == 255))
+            light = (points >= 240).all(axis=1)
+            metrics['ui_color_hits'] = int(np.count_nonzero(pure | light))
+            
+    except Exception as e:
+        logger.debug(f"Pixel analysis failed: {e}")
+    
+    return metrics
+
+
+def _has_ui_color_patterns(features: ImageFeatures) -> bool:
+    """Detect common UI color patterns in image"""
+    # White, light gray or black at 2+ of the sampled edge centers
+    return features.ui_color_hits >= 2
+
+
+def _has_camera_noise_pattern(features: ImageFeatures) -> bool:
+    """Detect camera sensor noise patterns typical of original photos"""
+    # Original photos typically have noise ratio between 0.02 and 0.15
+    # (not too clean, not too noisy)
+    return features.noise_ratio is not None and 0.02 <= features.noise_ratio <= 0.15
+
+
+def _has_pixel_perfect_edges(features: ImageFeatures) -> bool:
+    """Detect pixel-perfect edges typical of screenshots"""
+    # Screenshots typically have more sharp edges than photos
+    return features.edge_ratio > 0.01
+
+
+def _match_filename(regexes: List[Tuple[str, 're.Pattern']], filename_lower: str) -> Optional[str]:
+    """Return the first matching source pattern, if any"""
+    for pattern, regex in regexes:
+        if regex.search(filename_lower):
+            return pattern
+    return None
+
+
+# Feature stages in increasing cost order. A marker's cost is the cost of the
+# stage it reads, so cheaper stages are always exhausted first.
+STAGE_COSTS = {
+    'bytes': 0,    # buffer signature, size and filename
+    'header': 1,   # container header: format, dimensions, ICC
+    'exif': 2,     # APP1/EXIF parse
+    'pixels': 20,  # pixel decode + pixel metrics
+}
+
+
+class FeatureExtractor:
+    """
+    Stage-by-stage feature extraction for one image
+
+    Each stage is run at most once, on first demand, so callers that stop
+    early never pay for the stages they did not need.
+    """
+
+    def __init__(self, image_buffer: bytes, image_path: str, filename: str,
+                 rules: ForensicsRules = RULES, exif_record: Optional[ExifRecord] = None):
+        self.image_buffer = image_buffer
+        self.image_path = image_path
+        self.filename = filename
+        self.rules = rules
+        # Reused when the caller already parsed EXIF (see exif_service.extract_all)
+        self.exif_record = exif_record
+        self.features = ImageFeatures()
+        self.stages_done = set()
+
+    def require(self, stage: str) -> ImageFeatures:
+        """Make sure a stage has been extracted and return the features"""
+        if stage not in self.stages_done:
+            self.stages_done.add(stage)
+            getattr(self, f'_extract_{stage}')()
+        return self.features
+
+    def extract_all(self) -> ImageFeatures:
+        """Run every stage"""
+        for stage in STAGE_COSTS:
+            self.require(stage)
+        return self.features
+
+    def _extract_bytes(self):
+        features = self.features
+        features.file_size = len(self.image_buffer)
+        features.jpeg_signature = self.image_buffer.startswith(b'\xff\xd8')
+        features.png_signature = self.image_buffer.startswith(b'\x89PNG')
         
+        filename_lower = (self.filename or '').lower()
+        features.whatsapp_filename_pattern = _match_filename(self.rules.whatsapp_filename_regexes, filename_lower)
+        features.screenshot_filename_pattern = _match_filename(self.rules.screenshot_filename_regexes, filename_lower)
+
+    def _extract_header(self):
+        features = self.require('bytes')
         try:
-            # 1. Check JPEG signature (0xFF 0xD8)
-            if image_buffer.startswith(b'\xff\xd8'):
-                markers['jpeg_signature'] = True
-                confidence += 15
-                evidence.append("JPEG signature detected")
-            
-            # 2. Check file size (100KB - 500KB)
-            file_size = len(image_buffer)
-            if self.whatsapp_markers['file_size_range'][0] <= file_size <= self.whatsapp_markers['file_size_range'][1]:
-                markers['file_size_range'] = True
-                confidence += 20
-                evidence.append(f"File size in WhatsApp range ({file_size/1024:.0f}KB)")
-            
-            # 3. Analyze EXIF and metadata
-            try:
-                with Image.open(image_path) as img:
-                    # Check dimensions and aspect ratio
-                    width, height = img.size
-                    aspect_ratio = self._get_aspect_ratio(width, height)
-                    
-                    if aspect_ratio in self.whatsapp_markers['aspect_ratios']:
-                        markers['phone_aspect_ratio'] = True
-                        confidence += 15
-                        evidence.append(f"Phone aspect ratio {aspect_ratio[0]}:{aspect_ratio[1]}")
-                    
-                    # Check for WhatsApp resolution patterns
-                    for w_pattern, h_pattern in self.whatsapp_markers['resolution_patterns']:
-                        if abs(width - w_pattern) <= 50 and abs(height - h_pattern) <= 50:
-                            markers['resolution_pattern'] = True
-                            confidence += 10
-                            evidence.append(f"WhatsApp resize pattern detected ({width}x{height})")
-                            break
-                    
-                    # Check ICC profile
-                    if not hasattr(img, 'icc_profile') or img.icc_profile is None:
-                        markers['icc_missing'] = True
-                        confidence += 10
-                        evidence.append("ICC color profile missing")
-                
-                # Check EXIF data
-                try:
-                    exif_dict = piexif.load(image_path)
-                    has_camera_info = False
-                    
-                    if '0th' in exif_dict:
-                        ifd = exif_dict['0th']
-                        if piexif.ImageIFD.Make in ifd or piexif.ImageIFD.Model in ifd:
-                            has_camera_info = True
-                    
-                    if not has_camera_info or not exif_dict.get('0th') or not exif_dict.get('Exif'):
-                        markers['exif_stripped'] = True
-                        confidence += 20
-                        evidence.append("EXIF data stripped or camera info missing")
-                        
-                except:
-                    # No EXIF data at all
-                    markers['exif_stripped'] = True
-                    confidence += 25
-                    evidence.append("EXIF data completely stripped")
+            with Image.open(self.image_path) as img:
+                features.format = img.format
+                features.width, features.height = img.size
+                features.aspect_ratio = _get_aspect_ratio(features.width, features.height)
+                features.has_icc_profile = getattr(img, 'icc_profile', None) is not None
                 
-                # 4. Check JPEG quality
                 if img.format == 'JPEG':
-                    quality = self._estimate_jpeg_quality_advanced(image_path)
-                    if self.whatsapp_markers['quality_range'][0] <= quality <= self.whatsapp_markers['quality_range'][1]:
-                        markers['compression_quality'] = True
-                        confidence += 15
-                        evidence.append(f"JPEG quality in WhatsApp range ({quality}%)")
-                        
-            except Exception as e:
-                logger.debug(f"Image analysis failed: {e}")
-            
-            # 5. Check filename patterns
-            filename_lower = filename.lower()
-            for pattern in self.whatsapp_markers['filename_patterns']:
-                if re.search(pattern, filename_lower):
-                    markers['whatsapp_filename'] = True
-                    confidence += 20
-                    evidence.append(f"WhatsApp filename pattern: {pattern}")
-                    break
-            
-            # Require minimum 3 markers for WhatsApp classification
-            active_markers = sum(1 for marker in markers.values() if marker)
-            
-            if active_markers >= 3:
-                return {
-                    'type': 'WHATSAPP',
-                    'confidence': min(confidence, 100),
-                    'markers': markers,
-                    'evidence': evidence,
-                    'active_markers': active_markers
-                }
-            else:
-                return {
-                    'type': 'UNKNOWN',
-                    'confidence': 0,
-                    'markers': markers,
-                    'evidence': evidence + [f"Only {active_markers}/3 required markers found"],
-                    'active_markers': active_markers
-                }
-                
+                    features.jpeg_quality = _quality_from_size(
+                        features.file_size, features.width * features.height
+                    )
         except Exception as e:
-            logger.error(f"WhatsApp detection failed: {e}")
-            return {
+            logger.debug(f"Image analysis failed: {e}")
+            features.open_error = str(e)
+
+    def _extract_exif(self):
+        features = self.require('bytes')
+        if self.exif_record is None:
+            self.exif_record = extract_exif_record(
+                self.image_buffer if features.jpeg_signature else self.image_path
+            )
+        record = self.exif_record
+        if not record.loaded:
+            return
+        
+        features.exif_loaded = True
+        ifd = record.ifds.get('0th') or {}
+        exif_ifd = record.ifds.get('Exif') or {}
+        gps_data = record.ifds.get('GPS') or {}
+        
+        features.has_0th = bool(ifd)
+        features.has_exif_ifd = bool(exif_ifd)
+        features.exif_sections = sum(1 for section in ('0th', 'Exif', '1st') if record.ifds.get(section))
+        features.has_make_or_model = piexif.ImageIFD.Make in ifd or piexif.ImageIFD.Model in ifd
+        features.camera_make = record.camera_make
+        features.camera_model = record.camera_model
+        features.software = record.software
+        features.has_datetime = piexif.ImageIFD.DateTime in ifd
+        features.has_gps_coordinates = (
+            piexif.GPSIFD.GPSLatitude in gps_data and piexif.GPSIFD.GPSLongitude in gps_data
+        )
+        features.camera_settings_count = sum(
+            1 for setting in self.rules.original_photo_signatures['camera_settings'] if setting in exif_ifd
+        )
+
+    def _extract_pixels(self):
+        features = self.require('header')
+        if features.open_error is not None:
+            return
+        try:
+            with Image.open(self.image_path) as img:
+                pixel_metrics = _analyze_pixels(img)
+            features.edge_ratio = pixel_metrics['edge_ratio']
+            features.noise_ratio = pixel_metrics['noise_ratio']
+            features.ui_color_hits = pixel_metrics['ui_color_hits']
+        except Exception as e:
+            logger.debug(f"Pixel analysis failed: {e}")
+
+
+def extract_features(image_buffer: bytes, image_path: str, filename: str,
+                     rules: ForensicsRules = RULES) -> ImageFeatures:
+    """
+    Single feature-extraction pass shared by all detectors
+    
+    Opens the image once for the header, parses EXIF once, runs the
+    filename patterns once and decodes pixels once.
+    """
+    return FeatureExtractor(image_buffer, image_path, filename, rules).extract_all()
+
+
+# ------------------------------------------------------------------
+# Marker registry
+# ------------------------------------------------------------------
+
+@dataclass(frozen=True)
+class Marker:
+    """
+    One forensic marker of one detector
+
+    evaluate() returns (weight, evidence) when the marker fires, else None.
+    max_weight is an upper bound on that weight and drives early exit.
+    """
+    detector: str
+    name: str
+    stage: str
+    max_weight: int
+    evaluate: Callable[[ImageFeatures, ForensicsRules], Optional[Tuple[int, str]]]
+    strong: bool = False
+
+    @property
+    def cost(self) -> int:
+        return STAGE_COSTS[self.stage]
+
+
+def _fired(condition: bool, weight: int, evidence: str) -> Optional[Tuple[int, str]]:
+    return (weight, evidence) if condition else None
+
+
+def _opened(features: ImageFeatures) -> bool:
+    return features.open_error is None
+
+
+def _whatsapp_resolution(features: ImageFeatures, rules: ForensicsRules) -> Optional[Tuple[int, str]]:
+    if not _opened(features):
+        return None
+    width, height = features.width, features.height
+    for w_pattern, h_pattern in rules.whatsapp_markers['resolution_patterns']:
+        if abs(width - w_pattern) <= 50 and abs(height - h_pattern) <= 50:
+            return (10, f"WhatsApp resize pattern detected ({width}x{height})")
+    return None
+
+
+def _whatsapp_exif_stripped(features: ImageFeatures, rules: ForensicsRules) -> Optional[Tuple[int, str]]:
+    if not _opened(features):
+        return None
+    if not features.exif_loaded:
+        # No EXIF data at all
+        return (25, "EXIF data completely stripped")
+    if not features.has_make_or_model or not features.has_0th or not features.has_exif_ifd:
+        return (20, "EXIF data stripped or camera info missing")
+    return None
+
+
+def _whatsapp_quality(features: ImageFeatures, rules: ForensicsRules) -> Optional[Tuple[int, str]]:
+    quality = features.jpeg_quality
+    low, high = rules.whatsapp_markers['quality_range']
+    return _fired(_opened(features) and quality is not None and low <= quality <= high,
+                  15, f"JPEG quality in WhatsApp range ({quality}%)")
+
+
+def _original_camera(features: ImageFeatures, rules: ForensicsRules) -> Optional[Tuple[int, str]]:
+    camera_make, camera_model = features.camera_make, features.camera_model
+    if not (features.exif_loaded and camera_make and camera_model):
+        return None
+    # Check if it's a known camera brand
+    known_brands = rules.original_photo_signatures['known_camera_brands']
+    return _fired(any(brand.lower() in camera_make.lower() for brand in known_brands),
+                  25, f"Camera detected: {camera_make} {camera_model}")
+
+
+def _screenshot_lossless(features: ImageFeatures, rules: ForensicsRules) -> Optional[Tuple[int, str]]:
+    if features.format == 'PNG':
+        return (20, "Lossless PNG compression")
+    if features.jpeg_quality is not None and features.jpeg_quality >= 95:  # Near-lossless JPEG
+        return (15, f"Near-lossless JPEG quality ({features.jpeg_quality}%)")
+    return None
+
+
+def _screenshot_os_metadata(features: ImageFeatures, rules: ForensicsRules) -> Optional[Tuple[int, str]]:
+    if not (features.exif_loaded and features.software):
+        return None
+    for os_name in rules.screenshot_markers['os_metadata']:
+        if os_name.lower() in features.software.lower():
+            return (20, f"OS metadata detected: {os_name}")
+    return None
+
+
+def _screenshot_no_camera(features: ImageFeatures, rules: ForensicsRules) -> Optional[Tuple[int, str]]:
+    if not features.exif_loaded:
+        # No EXIF data - common for screenshots
+        return (10, "No EXIF metadata")
+    return _fired(not features.has_make_or_model, 15, "No camera metadata (typical for screenshots)")
+
+
+# Declaration order within a detector is the order its markers dict and
+# evidence are reported in; evaluation order is by cost.
+MARKER_REGISTRY: List[Marker] = [
+    # WhatsApp
+    Marker('whatsapp', 'jpeg_signature', 'bytes', 15,
+           lambda f, r: _fired(f.jpeg_signature, 15, "JPEG signature detected")),
+    Marker('whatsapp', 'exif_stripped', 'exif', 25, _whatsapp_exif_stripped),
+    Marker('whatsapp', 'file_size_range', 'bytes', 20,
+           lambda f, r: _fired(r.whatsapp_markers['file_size_range'][0] <= f.file_size <= r.whatsapp_markers['file_size_range'][1],
+                               20, f"File size in WhatsApp range ({f.file_size/1024:.0f}KB)")),
+    Marker('whatsapp', 'compression_quality', 'header', 15, _whatsapp_quality),
+    Marker('whatsapp', 'icc_missing', 'header', 10,
+           lambda f, r: _fired(_opened(f) and not f.has_icc_profile, 10, "ICC color profile missing")),
+    Marker('whatsapp', 'phone_aspect_ratio', 'header', 15,
+           lambda f, r: _fired(_opened(f) and f.aspect_ratio in r.whatsapp_markers['aspect_ratios'],
+                               15, f"Phone aspect ratio {f.aspect_ratio[0]}:{f.aspect_ratio[1]}")),
+    Marker('whatsapp', 'whatsapp_filename', 'bytes', 20,
+           lambda f, r: _fired(f.whatsapp_filename_pattern is not None,
+                               20, f"WhatsApp filename pattern: {f.whatsapp_filename_pattern}")),
+    Marker('whatsapp', 'resolution_pattern', 'header', 10, _whatsapp_resolution),
+    
+    # Original phone photo
+    Marker('original', 'full_exif_present', 'exif', 20,
+           lambda f, r: _fired(f.exif_loaded and f.exif_sections >= 2,
+                               20, f"Full EXIF data present ({f.exif_sections} sections)"), strong=True),
+    Marker('original', 'camera_make_model', 'exif', 25, _original_camera, strong=True),
+    Marker('original', 'gps_coordinates', 'exif', 20,
+           lambda f, r: _fired(f.exif_loaded and f.has_gps_coordinates, 20, "GPS coordinates present"), strong=True),
+    Marker('original', 'high_jpeg_quality', 'header', 20,
+           lambda f, r: _fired(f.jpeg_quality is not None and f.jpeg_quality > 80,
+                               20, f"High JPEG quality ({f.jpeg_quality}%)"), strong=True),
+    Marker('original', 'high_resolution', 'header', 25,
+           lambda f, r: _fired(max(f.width, f.height) >= 3000,
+                               25, f"High resolution detected ({f.width}x{f.height})"), strong=True),
+    Marker('original', 'camera_noise_pattern', 'pixels', 15,
+           lambda f, r: _fired(_has_camera_noise_pattern(f), 15, "Camera sensor noise pattern detected")),
+    Marker('original', 'camera_settings', 'exif', 15,
+           lambda f, r: _fired(f.exif_loaded and f.camera_settings_count >= 4,
+                               15, f"Camera settings present ({f.camera_settings_count} parameters)")),
+    Marker('original', 'original_timestamp', 'exif', 10,
+           lambda f, r: _fired(f.exif_loaded and f.has_datetime, 10, "Original timestamp present")),
+    
+    # Screenshot
+    Marker('screenshot', 'png_format', 'bytes', 30,
+           lambda f, r: _fired(f.png_signature, 30, "PNG format detected")),
+    Marker('screenshot', 'exact_screen_resolution', 'header', 40,
+           lambda f, r: _fired((f.width, f.height) in r.exact_screen_resolutions
+                               or (f.height, f.width) in r.exact_screen_resolutions,
+                               40, f"Exact screen resolution detected ({f.width}x{f.height})")),
+    Marker('screenshot', 'lossless_compression', 'header', 20, _screenshot_lossless),
+    Marker('screenshot', 'os_metadata', 'exif', 20, _screenshot_os_metadata),
+    Marker('screenshot', 'ui_color_patterns', 'pixels', 15,
+           lambda f, r: _fired(_has_ui_color_patterns(f), 15, "UI color patterns detected")),
+    Marker('screenshot', 'screenshot_filename', 'bytes', 25,
+           lambda f, r: _fired(f.screenshot_filename_pattern is not None,
+                               25, f"Screenshot filename pattern: {f.screenshot_filename_pattern}")),
+    Marker('screenshot', 'no_camera_metadata', 'exif', 15, _screenshot_no_camera),
+    Marker('screenshot', 'pixel_perfect_edges', 'pixels', 10,
+           lambda f, r: _fired(_has_pixel_perfect_edges(f), 10, "Pixel-perfect edges detected")),
+]
+
+# Order in which each detector reports its evidence
+EVIDENCE_ORDER = {
+    'whatsapp': [
+        'jpeg_signature', 'file_size_range', 'phone_aspect_ratio', 'resolution_pattern',
+        'icc_missing', 'exif_stripped', 'compression_quality', 'whatsapp_filename'
+    ],
+    'original': [
+        'high_resolution', 'high_jpeg_quality', 'camera_noise_pattern', 'full_exif_present',
+        'camera_make_model', 'original_timestamp', 'gps_coordinates', 'camera_settings'
+    ],
+    'screenshot': [
+        'png_format', 'exact_screen_resolution', 'lossless_compression', 'ui_color_patterns',
+        'pixel_perfect_edges', 'os_metadata', 'no_camera_metadata', 'screenshot_filename'
+    ],
+}
+
+# Detector order decides ties in classify (first strictly higher wins)
+DETECTOR_ORDER = ['whatsapp', 'screenshot', 'original']
+DETECTOR_TYPES = {'whatsapp': 'WHATSAPP', 'screenshot': 'SCREENSHOT', 'original': 'ORIGINAL_PHOTO'}
+
+# Confidence lines the rest of the pipeline branches on (recommendation and
+# decision engine flags). Early exit never stops while the winner could
+# still cross one of them.
+DECISION_THRESHOLDS = (70, 80)
+
+
+class _DetectorState:
+    """Running marker outcomes for one detector during evaluation"""
+
+    def __init__(self, detector: str, markers: List[Marker]):
+        self.detector = detector
+        self.markers = markers
+        self.outcomes: Dict[str, Optional[Tuple[int, str]]] = {}
+
+    def record(self, marker: Marker, outcome: Optional[Tuple[int, str]]):
+        self.outcomes[marker.name] = outcome
+
+    def _fired(self) -> List[Marker]:
+        return [m for m in self.markers if self.outcomes.get(m.name)]
+
+    def _pending(self) -> List[Marker]:
+        return [m for m in self.markers if m.name not in self.outcomes]
+
+    def _confidence(self, raw: int, active: int, strong: int, png_and_exact: bool) -> int:
+        """Apply the detector's gate and caps to a raw marker score"""
+        if self.detector == 'whatsapp':
+            # Require minimum 3 markers for WhatsApp classification
+            return min(raw, 100) if active >= 3 else 0
+        if self.detector == 'original':
+            # Require at least 3 strong markers for original photo classification
+            return min(raw, 100) if strong >= 3 else 0
+        # Special case: PNG + exact screen resolution = strong screenshot signal;
+        # for JPEG screenshots, require at least 2 markers
+        if png_and_exact:
+            return min(max(raw, 85), 100)
+        return min(raw, 100) if active >= 2 else 0
+
+    def bounds(self, open_failed: bool) -> Tuple[int, int]:
+        """(lowest, highest) final confidence still reachable"""
+        if open_failed and self.detector != 'whatsapp':
+            return (0, 0)
+        
+        fired, pending = self._fired(), self._pending()
+        raw = sum(self.outcomes[m.name][0] for m in fired)
+        fired_names = {m.name for m in fired}
+        possible_names = fired_names | {m.name for m in pending}
+        
+        lower = self._confidence(
+            raw, len(fired), sum(1 for m in fired if m.strong),
+            {'png_format', 'exact_screen_resolution'} <= fired_names
+        )
+        upper = self._confidence(
+            raw + sum(m.max_weight for m in pending), len(fired) + len(pending),
+            sum(1 for m in fired + pending if m.strong),
+            {'png_format', 'exact_screen_resolution'} <= possible_names
+        )
+        return (lower, upper)
+
+    def result(self, open_error: Optional[str]) -> Dict:
+        """Detector result in the established breakdown format"""
+        markers = {m.name: (bool(self.outcomes[m.name]) if m.name in self.outcomes else None)
+                   for m in self.markers}
+        skipped = [m.name for m in self._pending()]
+        
+        if open_error is not None and self.detector != 'whatsapp':
+            result = {
                 'type': 'UNKNOWN',
                 'confidence': 0,
                 'markers': markers,
-                'evidence': [f"Detection failed: {str(e)}"],
+                'evidence': [f"Detection failed: {open_error}"],
                 'active_markers': 0
             }
-
-    def detect_original(self, image_buffer: bytes, image_path: str, filename: str) -> Dict:
-        """
-        Original phone photo detection - HIGHEST confidence class
+            if self.detector == 'original':
+                result['strong_markers'] = 0
+            return result
         
-        Detection logic:
-        • Full EXIF present
-        • Camera make & model detected  
-        • GPS coordinates present
-        • JPEG quality > 80
-        • High resolution (≥3000px on one side)
-        • Camera-specific noise / CFA pattern (if available)
+        fired = self._fired()
+        fired_names = {m.name for m in fired}
+        evidence = [self.outcomes[name][1] for name in EVIDENCE_ORDER[self.detector]
+                    if self.outcomes.get(name)]
+        active = len(fired)
+        strong = sum(1 for m in fired if m.strong)
+        png_and_exact = {'png_format', 'exact_screen_resolution'} <= fired_names
+        confidence = self._confidence(sum(self.outcomes[m.name][0] for m in fired), active, strong, png_and_exact)
         
-        Requires at least 3 strong markers
-        """
-        markers = {
-            'full_exif_present': False,
-            'camera_make_model': False,
-            'gps_coordinates': False,
-            'high_jpeg_quality': False,
-            'high_resolution': False,
-            'camera_noise_pattern': False,
-            'camera_settings': False,
-            'original_timestamp': False
-        }
+        if png_and_exact:
+            evidence.append("Strong screenshot signal: PNG + exact screen resolution")
         
-        confidence = 0
-        evidence = []
+        if self.detector == 'whatsapp':
+            classified, gate = active >= 3, f"Only {active}/3 required markers found"
+        elif self.detector == 'original':
+            classified, gate = strong >= 3, f"Only {strong}/3 strong markers found"
+        else:
+            classified, gate = png_and_exact or active >= 2, f"Only {active}/2 required markers found"
         
-        try:
-            # 1. Check image resolution
-            with Image.open(image_path) as img:
-                width, height = img.size
-                max_dimension = max(width, height)
-                
-                if max_dimension >= 3000:
-                    markers['high_resolution'] = True
-                    confidence += 25
-                    evidence.append(f"High resolution detected ({width}x{height})")
-                
-                # 2. Check JPEG quality
-                if img.format == 'JPEG':
-                    quality = self._estimate_jpeg_quality_advanced(image_path)
-                    if quality > 80:
-                        markers['high_jpeg_quality'] = True
-                        confidence += 20
-                        evidence.append(f"High JPEG quality ({quality}%)")
-                
-                # 3. Analyze noise patterns (simplified)
-                if self._detect_camera_noise_pattern(img):
-                    markers['camera_noise_pattern'] = True
-                    confidence += 15
-                    evidence.append("Camera sensor noise pattern detected")
-            
-            # 4. Comprehensive EXIF analysis
+        result = {
+            'type': DETECTOR_TYPES[self.detector] if classified else 'UNKNOWN',
+            'confidence': confidence,
+            'markers': markers,
+            'evidence': evidence if classified else evidence + [gate],
+            'active_markers': active
+        }
+        if self.detector == 'original':
+            result['strong_markers'] = strong
+        if skipped:
+            result['skipped_markers'] = skipped
+        return result
+
+
+def _winner_settled(bounds: Dict[str, Tuple[int, int]]) -> bool:
+    """True when no pending marker can change the winner or its threshold side"""
+    # Current winner: first detector with the highest lower bound
+    winner = None
+    for detector in DETECTOR_ORDER:
+        if winner is None or bounds[detector][0] > bounds[winner][0]:
+            winner = detector
+    winner_low, winner_high = bounds[winner]
+    
+    if winner_low == 0:
+        # Nothing classified yet: settled only if nothing ever can be
+        return all(high == 0 for _, high in bounds.values())
+    
+    winner_rank = DETECTOR_ORDER.index(winner)
+    for detector in DETECTOR_ORDER:
+        if detector == winner:
+            continue
+        other_high = bounds[detector][1]
+        if other_high > winner_low:
+            return False
+        if other_high == winner_low and DETECTOR_ORDER.index(detector) < winner_rank:
+            return False
+    
+    return not any(winner_low < threshold <= winner_high for threshold in DECISION_THRESHOLDS)
+
+
+def evaluate_markers(extractor: FeatureExtractor, full_breakdown: bool = False,
+                     registry: List[Marker] = MARKER_REGISTRY) -> Dict[str, Dict]:
+    """
+    Evaluate registry markers cheapest first, stopping once the outcome is settled
+    
+    Markers are taken in cost order, one cost tier at a time. After each tier
+    the reachable confidence range of every detector is recomputed; when the
+    winning class and its side of every DECISION_THRESHOLDS line can no
+    longer change, the remaining (more expensive) markers are skipped. With
+    full_breakdown=True every marker is evaluated.
+    
+    Returns:
+        Dict of detector name -> detector result
+    """
+    states = {
+        detector: _DetectorState(detector, [m for m in registry if m.detector == detector])
+        for detector in DETECTOR_ORDER
+    }
+    
+    for cost in sorted({m.cost for m in registry}):
+        features = extractor.features
+        if not full_breakdown and extractor.stages_done:
+            bounds = {d: s.bounds(features.open_error is not None) for d, s in states.items()}
+            if _winner_settled(bounds):
+                break
+        
+        for marker in registry:
+            if marker.cost != cost:
+                continue
+            features = extractor.require(marker.stage)
             try:
-                exif_dict = piexif.load(image_path)
-                exif_sections = 0
-                
-                # Check main IFD sections
-                if '0th' in exif_dict and exif_dict['0th']:
-                    exif_sections += 1
-                if 'Exif' in exif_dict and exif_dict['Exif']:
-                    exif_sections += 1
-                if '1st' in exif_dict and exif_dict['1st']:
-                    exif_sections += 1
-                
-                if exif_sections >= 2:
-                    markers['full_exif_present'] = True
-                    confidence += 20
-                    evidence.append(f"Full EXIF data present ({exif_sections} sections)")
-                
-                # 5. Camera make/model detection
-                if '0th' in exif_dict:
-                    ifd = exif_dict['0th']
-                    
-                    camera_make = None
-                    camera_model = None
-                    
-                    if piexif.ImageIFD.Make in ifd:
-                        camera_make = ifd[piexif.ImageIFD.Make].decode('utf-8', errors='ignore')
-                    
-                    if piexif.ImageIFD.Model in ifd:
-                        camera_model = ifd[piexif.ImageIFD.Model].decode('utf-8', errors='ignore')
-                    
-                    if camera_make and camera_model:
-                        # Check if it's a known camera brand
-                        known_brands = ['Apple', 'Samsung', 'Google', 'OnePlus', 'Xiaomi', 'Huawei', 'OPPO', 'Vivo', 'Sony', 'Canon', 'Nikon']
-                        if any(brand.lower() in camera_make.lower() for brand in known_brands):
-                            markers['camera_make_model'] = True
-                            confidence += 25
-                            evidence.append(f"Camera detected: {camera_make} {camera_model}")
-                    
-                    # 6. Check timestamp authenticity
-                    if piexif.ImageIFD.DateTime in ifd:
-                        markers['original_timestamp'] = True
-                        confidence += 10
-                        evidence.append("Original timestamp present")
-                
-                # 7. GPS coordinates check
-                if 'GPS' in exif_dict and exif_dict['GPS']:
-                    gps_data = exif_dict['GPS']
-                    if piexif.GPSIFD.GPSLatitude in gps_data and piexif.GPSIFD.GPSLongitude in gps_data:
-                        markers['gps_coordinates'] = True
-                        confidence += 20
-                        evidence.append("GPS coordinates present")
-                
-                # 8. Camera settings analysis
-                if 'Exif' in exif_dict:
-                    exif_ifd = exif_dict['Exif']
-                    camera_settings_count = 0
-                    
-                    camera_settings = [
-                        piexif.ExifIFD.ExposureTime,
-                        piexif.ExifIFD.FNumber,
-                        piexif.ExifIFD.ISOSpeedRatings,
-                        piexif.ExifIFD.Flash,
-                        piexif.ExifIFD.FocalLength,
-                        piexif.ExifIFD.WhiteBalance,
-                        piexif.ExifIFD.ExposureMode
-                    ]
-                    
-                    for setting in camera_settings:
-                        if setting in exif_ifd:
-                            camera_settings_count += 1
-                    
-                    if camera_settings_count >= 4:
-                        markers['camera_settings'] = True
-                        confidence += 15
-                        evidence.append(f"Camera settings present ({camera_settings_count} parameters)")
-                        
-            except Exception as exif_error:
-                logger.debug(f"EXIF analysis failed: {exif_error}")
-            
-            # Require at least 3 strong markers for original photo classification
-            strong_markers = [
-                'camera_make_model', 'gps_coordinates', 'high_jpeg_quality', 
-                'high_resolution', 'full_exif_present'
-            ]
-            active_strong_markers = sum(1 for marker in strong_markers if markers[marker])
-            total_active_markers = sum(1 for marker in markers.values() if marker)
-            
-            if active_strong_markers >= 3:
-                return {
-                    'type': 'ORIGINAL_PHOTO',
-                    'confidence': min(confidence, 100),
-                    'markers': markers,
-                    'evidence': evidence,
-                    'active_markers': total_active_markers,
-                    'strong_markers': active_strong_markers
-                }
-            else:
-                return {
-                    'type': 'UNKNOWN',
-                    'confidence': 0,
-                    'markers': markers,
-                    'evidence': evidence + [f"Only {active_strong_markers}/3 strong markers found"],
-                    'active_markers': total_active_markers,
-                    'strong_markers': active_strong_markers
-                }
-                
+                outcome = marker.evaluate(features, extractor.rules)
+            except Exception as e:
+                logger.debug(f"Marker {marker.detector}.{marker.name} failed: {e}")
+                outcome = None
+            states[marker.detector].record(marker, outcome)
+    
+    open_error = extractor.features.open_error
+    return {detector: states[detector].result(open_error) for detector in DETECTOR_ORDER}
+
+
+def _score_detector(detector: str, features: ImageFeatures, rules: ForensicsRules) -> Dict:
+    """Evaluate every marker of one detector over fully extracted features"""
+    state = _DetectorState(detector, [m for m in MARKER_REGISTRY if m.detector == detector])
+    for marker in state.markers:
+        state.record(marker, marker.evaluate(features, rules))
+    return state.result(features.open_error)
+
+
+def score_whatsapp(features: ImageFeatures, rules: ForensicsRules = RULES) -> Dict:
+    """
+    Enhanced WhatsApp detection using multiple markers
+    
+    Required markers (minimum 3 for classification):
+    • JPEG signature (0xFF 0xD8)
+    • EXIF fully stripped OR camera model missing
+    • File size typically between 100–500 KB
+    • JPEG compression quality approx 60–75%
+    • ICC color profile missing
+    • Standard phone aspect ratio (9:16, 16:9)
+    
+    Returns:
+        Dict with type, confidence (0-100), and markers
+    """
+    return _score_detector('whatsapp', features, rules)
+
+
+def score_original(features: ImageFeatures, rules: ForensicsRules = RULES) -> Dict:
+    """
+    Original phone photo detection - HIGHEST confidence class
+    
+    Detection logic:
+    • Full EXIF present
+    • Camera make & model detected  
+    • GPS coordinates present
+    • JPEG quality > 80
+    • High resolution (≥3000px on one side)
+    • Camera-specific noise / CFA pattern (if available)
+    
+    Requires at least 3 strong markers
+    """
+    return _score_detector('original', features, rules)
+
+
+def score_screenshot(features: ImageFeatures, rules: ForensicsRules = RULES) -> Dict:
+    """
+    Enhanced screenshot detection using multiple markers
+    
+    Detection logic:
+    • PNG header detection (0x89 0x50 0x4E 0x47)
+    • OR JPEG with exact screen dimensions
+    • Lossless or near-lossless compression
+    • OS metadata present (Android/iOS/Windows/Mac)
+    • UI color patterns (#FFFFFF, #F0F0F0, etc.)
+    • Pixel-perfect edges (low sensor noise)
+    
+    Returns:
+        Dict with type, confidence (0-100), and markers
+    """
+    return _score_detector('screenshot', features, rules)
+
+
+def _summarize(results: Dict[str, Dict]) -> Dict:
+    """Pick the highest-confidence detector and build the classification"""
+    # Find highest confidence
+    max_confidence = 0
+    best_source = 'UNKNOWN'
+    
+    for source_type, result in results.items():
+        if result['confidence'] > max_confidence:
+            max_confidence = result['confidence']
+            if result['type'] != 'UNKNOWN':
+                best_source = result['type']
+    
+    # Map to final source names
+    source_mapping = {
+        'WHATSAPP': 'WHATSAPP',
+        'SCREENSHOT': 'SCREENSHOT', 
+        'ORIGINAL_PHOTO': 'ORIGINAL_PHOTO'
+    }
+    
+    final_source = source_mapping.get(best_source, 'UNKNOWN')
+    
+    # Determine recommendation
+    # SAFETY: Default to ACCEPT for low confidence to avoid blocking legitimate submissions
+    if max_confidence >= 70:
+        recommendation = 'ACCEPT'
+    else:
+        recommendation = 'ACCEPT'  # Changed from 'REVIEW' for safety - never block on forensics alone
+    
+    return {
+        'source': final_source,
+        'confidence': max_confidence,
+        'breakdown': results,
+        'recommendation': recommendation,
+        'classification_version': '2.0'
+    }
+
+
+def classify_features(features: ImageFeatures, rules: ForensicsRules = RULES) -> Dict:
+    """
+    Final source classification - runs all scorers and selects highest confidence
+    
+    Logic:
+    • Run all three scorers over the same feature record
+    • Select classification with HIGHEST confidence
+    • If confidence < 70 → mark as "REVIEW_REQUIRED"
+    """
+    return _summarize({
+        'whatsapp': score_whatsapp(features, rules),
+        'screenshot': score_screenshot(features, rules),
+        'original': score_original(features, rules)
+    })
+
+
+class ImageSourceForensics:
+    """
+    Advanced image forensics for source identification
+    """
+    
+    def __init__(self, rules: ForensicsRules = RULES):
+        self.rules = rules
+        self.whatsapp_markers = rules.whatsapp_markers
+        self.screenshot_markers = rules.screenshot_markers
+        self.original_photo_signatures = rules.original_photo_signatures
+
+    def extract_features(self, image_buffer: bytes, image_path: str, filename: str) -> ImageFeatures:
+        """Run the shared feature-extraction pass for one image"""
+        return extract_features(image_buffer, image_path, filename, self.rules)
+
+    def detect_whatsapp(self, image_buffer: bytes, image_path: str, filename: str) -> Dict:
+        """WhatsApp detection for a single image (see score_whatsapp)"""
+        try:
+            return score_whatsapp(self.extract_features(image_buffer, image_path, filename), self.rules)
+        except Exception as e:
+            logger.error(f"WhatsApp detection failed: {e}")
+            return self._failed_detection(e)
+
+    def detect_original(self, image_buffer: bytes, image_path: str, filename: str) -> Dict:
+        """Original phone photo detection for a single image (see score_original)"""
+        try:
+            return score_original(self.extract_features(image_buffer, image_path, filename), self.rules)
         except Exception as e:
             logger.error(f"Original photo detection failed: {e}")
-            return {
-                'type': 'UNKNOWN',
-                'confidence': 0,
-                'markers': markers,
-                'evidence': [f"Detection failed: {str(e)}"],
-                'active_markers': 0,
-                'strong_markers': 0
-            }
+            return dict(self._failed_detection(e), strong_markers=0)
 
     def detect_screenshot(self, image_buffer: bytes, image_path: str, filename: str) -> Dict:
-        """
-        Enhanced screenshot detection using multiple markers
-        
-        Detection logic:
-        • PNG header detection (0x89 0x50 0x4E 0x47)
-        • OR JPEG with exact screen dimensions
-        • Lossless or near-lossless compression
-        • OS metadata present (Android/iOS/Windows/Mac)
-        • UI color patterns (#FFFFFF, #F0F0F0, etc.)
-        • Pixel-perfect edges (low sensor noise)
-        
-        Returns:
-            Dict with type, confidence (0-100), and markers
-        """
-        markers = {
-            'png_format': False,
-            'exact_screen_resolution': False,
-            'lossless_compression': False,
-            'os_metadata': False,
-            'ui_color_patterns': False,
-            'screenshot_filename': False,
-            'no_camera_metadata': False,
-            'pixel_perfect_edges': False
-        }
-        
-        confidence = 0
-        evidence = []
-        
+        """Screenshot detection for a single image (see score_screenshot)"""
         try:
-            # 1. Check PNG header (0x89 0x50 0x4E 0x47)
-            if image_buffer.startswith(b'\x89PNG'):
-                markers['png_format'] = True
-                confidence += 30
-                evidence.append("PNG format detected")
-            
-            with Image.open(image_path) as img:
-                width, height = img.size
-                
-                # 2. Check for exact screen resolutions
-                for screen_w, screen_h in self.screenshot_markers['exact_screen_resolutions']:
-                    if (width == screen_w and height == screen_h) or (width == screen_h and height == screen_w):
-                        markers['exact_screen_resolution'] = True
-                        confidence += 40
-                        evidence.append(f"Exact screen resolution detected ({width}x{height})")
-                        break
-                
-                # 3. Check compression type
-                if img.format == 'PNG':
-                    markers['lossless_compression'] = True
-                    confidence += 20
-                    evidence.append("Lossless PNG compression")
-                elif img.format == 'JPEG':
-                    quality = self._estimate_jpeg_quality_advanced(image_path)
-                    if quality >= 95:  # Near-lossless JPEG
-                        markers['lossless_compression'] = True
-                        confidence += 15
-                        evidence.append(f"Near-lossless JPEG quality ({quality}%)")
-                
-                # 4. Analyze pixel patterns for UI elements
-                if self._detect_ui_color_patterns(img):
-                    markers['ui_color_patterns'] = True
-                    confidence += 15
-                    evidence.append("UI color patterns detected")
-                
-                # 5. Check for pixel-perfect edges (low noise)
-                if self._detect_pixel_perfect_edges(img):
-                    markers['pixel_perfect_edges'] = True
-                    confidence += 10
-                    evidence.append("Pixel-perfect edges detected")
-            
-            # 6. Check metadata for OS indicators
-            try:
-                exif_dict = piexif.load(image_path)
-                
-                if '0th' in exif_dict:
-                    ifd = exif_dict['0th']
-                    
-                    # Check software field for OS metadata
-                    if piexif.ImageIFD.Software in ifd:
-                        software = ifd[piexif.ImageIFD.Software].decode('utf-8', errors='ignore')
-                        for os_name in self.screenshot_markers['os_metadata']:
-                            if os_name.lower() in software.lower():
-                                markers['os_metadata'] = True
-                                confidence += 20
-                                evidence.append(f"OS metadata detected: {os_name}")
-                                break
-                    
-                    # Check absence of camera metadata
-                    camera_fields = [piexif.ImageIFD.Make, piexif.ImageIFD.Model]
-                    has_camera_info = any(field in ifd for field in camera_fields)
-                    
-                    if not has_camera_info:
-                        markers['no_camera_metadata'] = True
-                        confidence += 15
-                        evidence.append("No camera metadata (typical for screenshots)")
-                        
-            except:
-                # No EXIF data - common for screenshots
-                markers['no_camera_metadata'] = True
-                confidence += 10
-                evidence.append("No EXIF metadata")
-            
-            # 7. Check filename patterns
-            filename_lower = filename.lower()
-            for pattern in self.screenshot_markers['filename_patterns']:
-                if re.search(pattern, filename_lower):
-                    markers['screenshot_filename'] = True
-                    confidence += 25
-                    evidence.append(f"Screenshot filename pattern: {pattern}")
-                    break
-            
-            # Special case: PNG + exact screen resolution = strong screenshot signal
-            if markers['png_format'] and markers['exact_screen_resolution']:
-                confidence = max(confidence, 85)
-                evidence.append("Strong screenshot signal: PNG + exact screen resolution")
-            
-            # For JPEG screenshots, require at least 2 markers
-            active_markers = sum(1 for marker in markers.values() if marker)
-            
-            if (markers['png_format'] and markers['exact_screen_resolution']) or active_markers >= 2:
-                return {
-                    'type': 'SCREENSHOT',
-                    'confidence': min(confidence, 100),
-                    'markers': markers,
-                    'evidence': evidence,
-                    'active_markers': active_markers
-                }
-            else:
-                return {
-                    'type': 'UNKNOWN',
-                    'confidence': 0,
-                    'markers': markers,
-                    'evidence': evidence + [f"Only {active_markers}/2 required markers found"],
-                    'active_markers': active_markers
-                }
-                
+            return score_screenshot(self.extract_features(image_buffer, image_path, filename), self.rules)
         except Exception as e:
             logger.error(f"Screenshot detection failed: {e}")
-            return {
-                'type': 'UNKNOWN',
-                'confidence': 0,
-                'markers': markers,
-                'evidence': [f"Detection failed: {str(e)}"],
-                'active_markers': 0
-            }
+            return self._failed_detection(e)
 
-    def classify_image(self, image_buffer: bytes, image_path: str, filename: str) -> Dict:
+    def classify_image(self, image_buffer: bytes, image_path: str, filename: str,
+                       full_breakdown: bool = False,
+                       exif_record: Optional[ExifRecord] = None) -> Dict:
         """
-        Final source classification - runs all detectors and selects highest confidence
+        Final source classification - evaluates markers cheapest first and
+        stops once the result is settled (see evaluate_markers)
         
-        Logic:
-        • Run all three detectors independently
-        • Select classification with HIGHEST confidence
-        • If confidence < 70 → mark as "REVIEW_REQUIRED"
+        Args:
+            full_breakdown: Evaluate every marker even when the outcome is
+                already decided (markers skipped otherwise are None in the
+                breakdown and listed under 'skipped_markers')
+            exif_record: EXIF already parsed by exif_service.extract_all,
+                so the image is not parsed a second time
         """
         try:
-            # Run all three detectors
-            whatsapp_result = self.detect_whatsapp(image_buffer, image_path, filename)
-            screenshot_result = self.detect_screenshot(image_buffer, image_path, filename)
-            original_result = self.detect_original(image_buffer, image_path, filename)
-            
-            # Collect all results
-            results = {
-                'whatsapp': whatsapp_result,
-                'screenshot': screenshot_result,
-                'original': original_result
-            }
-            
-            # Find highest confidence
-            max_confidence = 0
-            best_source = 'UNKNOWN'
-            
-            for source_type, result in results.items():
-                if result['confidence'] > max_confidence:
-                    max_confidence = result['confidence']
-                    if result['type'] != 'UNKNOWN':
-                        best_source = result['type']
-            
-            # Map to final source names
-            source_mapping = {
-                'WHATSAPP': 'WHATSAPP',
-                'SCREENSHOT': 'SCREENSHOT', 
-                'ORIGINAL_PHOTO': 'ORIGINAL_PHOTO'
-            }
-            
-            final_source = source_mapping.get(best_source, 'UNKNOWN')
-            
-            # Determine recommendation
-            # SAFETY: Default to ACCEPT for low confidence to avoid blocking legitimate submissions
-            if max_confidence >= 70:
-                recommendation = 'ACCEPT'
-            else:
-                recommendation = 'ACCEPT'  # Changed from 'REVIEW' for safety - never block on forensics alone
-            
-            return {
-                'source': final_source,
-                'confidence': max_confidence,
-                'breakdown': results,
-                'recommendation': recommendation,
-                'classification_version': '2.0'
-            }
+            extractor = FeatureExtractor(image_buffer, image_path, filename, self.rules, exif_record)
+            classification = _summarize(evaluate_markers(extractor, full_breakdown))
+            classification['stages_evaluated'] = [
+                stage for stage in STAGE_COSTS if stage in extractor.stages_done
+            ]
+            return classification
             
         except Exception as e:
             logger.error(f"Image classification failed: {e}")
@@ -608,6 +962,16 @@ class ImageSourceForensics:
                 'error': str(e)
             }
 
+    def _failed_detection(self, error: Exception) -> Dict:
+        """Detector result used when feature extraction itself raises"""
+        return {
+            'type': 'UNKNOWN',
+            'confidence': 0,
+            'markers': {},
+            'evidence': [f"Detection failed: {str(error)}"],
+            'active_markers': 0
+        }
+
     def analyze_image_source(self, image_path: str, filename: str) -> Dict:
         """
         Main analysis function - determines image source with confidence scores
@@ -717,7 +1081,10 @@ class ImageSourceForensics:
             
             # Try to extract EXIF data
             try:
-                exif_dict = piexif.load(image_path)
+                exif_record = extract_exif_record(image_path)
+                if not exif_record.loaded:
+                    raise ValueError("No readable EXIF container")
+                exif_dict = exif_record.ifds
                 analysis['has_exif'] = True
                 
                 # Analyze 0th IFD (main image data)
@@ -1005,123 +1372,25 @@ class ImageSourceForensics:
         """Count compression artifacts (simplified)"""
         # This is a simplified implementation
         # In practice, you'd analyze DCT coefficients
+        # Look for repeated byte patterns that indicate compression: an 8-byte
+        # block where more than 6 bytes equal its first byte. Blocks are read
+        # as rows of a zero-copy (n, 8) view and the scan stops at the cap.
+        n_blocks = max(len(image_buffer) - 1, 0) // 8
+        if n_blocks == 0:
+            return 0
+        
+        blocks = np.frombuffer(image_buffer, dtype=np.uint8, count=n_blocks * 8).reshape(n_blocks, 8)
         artifact_count = 0
         
-        # Look for repeated byte patterns that indicate compression
-        for i in range(0, len(image_buffer) - 8, 8):
-            block = image_buffer[i:i+8]
-            if block.count(block[0]) > 6:  # Highly repetitive block
-                artifact_count += 1
+        for start in range(0, n_blocks, ARTIFACT_SCAN_CHUNK_BLOCKS):
+            chunk = blocks[start:start + ARTIFACT_SCAN_CHUNK_BLOCKS]
+            repeats = np.count_nonzero(chunk == chunk[:, :1], axis=1)
+            artifact_count += int(np.count_nonzero(repeats > 6))
+            if artifact_count >= 100:
+                break
         
         return min(artifact_count, 100)  # Cap at 100
 
-    def _get_aspect_ratio(self, width: int, height: int) -> Tuple[int, int]:
-        """Calculate simplified aspect ratio"""
-        from math import gcd
-        divisor = gcd(width, height)
-        return (width // divisor, height // divisor)
-
-    def _detect_ui_color_patterns(self, img: Image.Image) -> bool:
-        """Detect common UI color patterns in image"""
-        try:
-            # Sample pixels from edges and corners where UI elements typically appear
-            width, height = img.size
-            if width < 100 or height < 100:
-                return False
-            
-            # Convert to RGB if needed
-            if img.mode != 'RGB':
-                img = img.convert('RGB')
-            
-            # Sample top and bottom edges for UI elements
-            sample_points = [
-                (width // 2, 10),      # Top center
-                (width // 2, height - 10),  # Bottom center
-                (10, height // 2),     # Left center
-                (width - 10, height // 2),  # Right center
-            ]
-            
-            ui_color_count = 0
-            for x, y in sample_points:
-                try:
-                    r, g, b = img.getpixel((x, y))
-                    # Check for common UI colors (white, light gray, black, etc.)
-                    if (r == g == b and r in [0, 255]) or (240 <= r <= 255 and 240 <= g <= 255 and 240 <= b <= 255):
-                        ui_color_count += 1
-                except:
-                    continue
-            
-            return ui_color_count >= 2
-            
-        except Exception:
-            return False
-
-    def _detect_camera_noise_pattern(self, img: Image.Image) -> bool:
-        """Detect camera sensor noise patterns typical of original photos"""
-        try:
-            import numpy as np
-            
-            # Convert to grayscale for noise analysis
-            gray = img.convert('L')
-            img_array = np.array(gray)
-            
-            # Sample a small region for noise analysis
-            height, width = img_array.shape
-            if height < 200 or width < 200:
-                return False
-            
-            # Sample center region
-            sample_h, sample_w = min(200, height//2), min(200, width//2)
-            start_h, start_w = height//4, width//4
-            sample = img_array[start_h:start_h+sample_h, start_w:start_w+sample_w]
-            
-            # Calculate noise characteristics
-            # Real camera sensors have specific noise patterns
-            mean_val = np.mean(sample)
-            std_val = np.std(sample)
-            
-            # Check for reasonable noise levels (not too clean, not too noisy)
-            noise_ratio = std_val / (mean_val + 1)  # Avoid division by zero
-            
-            # Original photos typically have noise ratio between 0.02 and 0.15
-            if 0.02 <= noise_ratio <= 0.15:
-                return True
-            
-            return False
-            
-        except Exception:
-            return False
-
-    def _detect_pixel_perfect_edges(self, img: Image.Image) -> bool:
-        """Detect pixel-perfect edges typical of screenshots"""
-        try:
-            import numpy as np
-            
-            # Convert to grayscale for edge detection
-            gray = img.convert('L')
-            img_array = np.array(gray)
-            
-            # Simple edge detection using gradient
-            if img_array.shape[0] < 50 or img_array.shape[1] < 50:
-                return False
-            
-            # Calculate gradients
-            grad_x = np.abs(np.diff(img_array, axis=1))
-            grad_y = np.abs(np.diff(img_array, axis=0))
-            
-            # Count sharp edges (high gradient values)
-            sharp_edges_x = np.sum(grad_x > 50)
-            sharp_edges_y = np.sum(grad_y > 50)
-            
-            total_pixels = img_array.shape[0] * img_array.shape[1]
-            edge_ratio = (sharp_edges_x + sharp_edges_y) / total_pixels
-            
-            # Screenshots typically have more sharp edges than photos
-            return edge_ratio > 0.01
-            
-        except Exception:
-            return False
-
     def _estimate_jpeg_quality_advanced(self, image_path: str) -> int:
         """Advanced JPEG quality estimation using quantization tables"""
         try:
@@ -1138,22 +1407,7 @@ class ImageSourceForensics:
                 if img.format != 'JPEG':
                     return 100  # PNG or other lossless
                 
-                pixels = img.size[0] * img.size[1]
-                bytes_per_pixel = file_size / pixels
-                
-                # Improved quality estimation based on compression ratio
-                if bytes_per_pixel > 3.0:
-                    return 98  # Very high quality
-                elif bytes_per_pixel > 2.0:
-                    return 92  # High quality
-                elif bytes_per_pixel > 1.5:
-                    return 85  # Medium-high quality
-                elif bytes_per_pixel > 1.0:
-                    return 75  # Medium quality (WhatsApp range)
-                elif bytes_per_pixel > 0.5:
-                    return 65  # Medium-low quality (WhatsApp range)
-                else:
-                    return 50  # Low quality
+                return _quality_from_size(file_size, img.size[0] * img.size[1])
                     
         except Exception:
             return 80  # Default fallback
@@ -1211,9 +1465,16 @@ def analyze_image_source(image_path: str, filename: str) -> Dict:
     Returns:
         Dict with source analysis results
     """
-    forensics = ImageSourceForensics()
-    return forensics.analyze_image_source(image_path, filename)
+    return default_forensics.analyze_image_source(image_path, filename)
+
+
+# Shared, stateless instance for request handlers
+default_forensics = ImageSourceForensics()
 
 
 # Export main function
-__all__ = ['analyze_image_source', 'ImageSourceForensics']
\ No newline at end of file
+__all__ = [
+    'analyze_image_source', 'ImageSourceForensics', 'ImageFeatures', 'ForensicsRules', 'RULES',
+    'default_forensics', 'extract_features', 'score_whatsapp', 'score_screenshot', 'score_original',
+    'classify_features', 'FeatureExtractor', 'Marker', 'MARKER_REGISTRY', 'evaluate_markers'
+]
\ No newline at end of file
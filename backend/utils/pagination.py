@@ -0,0 +1,175 @@
+"""
+Keyset (cursor) pagination for MongoDB list endpoints
+
+Pages are ordered by (sort_field, _id) and continued with an opaque cursor
+that encodes the last row's sort value and _id, so fetching page N costs
+the same as page 1 (no skip) and rows inserted meanwhile never shift or
+duplicate results. Each sort needs a matching compound index on
+(filter fields..., sort_field, _id).
+"""
+
+import os
+import base64
+import binascii
+from typing import Any, Dict, List, Optional, Tuple
+
+from bson import json_util
+from bson.errors import InvalidId
+
+DEFAULT_PAGE_SIZE = int(os.environ.get("DEFAULT_PAGE_SIZE", "100"))
+MAX_PAGE_SIZE = int(os.environ.get("MAX_PAGE_SIZE", "1000"))
+
+ASCENDING = 1
+DESCENDING = -1
+
+
+class InvalidCursor(ValueError):
+    """Raised when a continuation token cannot be decoded"""
+
+
+def encode_cursor(sort_field: str, value: Any, last_id: Any) -> str:
+    """
+    Opaque continuation token for the row (value, last_id).
+
+    Extended JSON keeps datetimes and ObjectIds typed across the round trip.
+    """
+    payload = json_util.dumps({"f": sort_field, "v": value, "id": last_id})
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(token: str, sort_field: str) -> Tuple[Any, Any]:
+    """
+    Decode a continuation token issued for sort_field.
+
+    Returns:
+        tuple: (sort value, _id) of the last row of the previous page
+
+    Raises:
+        InvalidCursor: Malformed token, or one issued for another ordering
+    """
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        payload = json_util.loads(base64.urlsafe_b64decode(padded.encode("ascii")).decode("utf-8"))
+    except (ValueError, TypeError, binascii.Error, InvalidId) as e:
+        raise InvalidCursor(f"Malformed cursor: {e}")
+
+    if not isinstance(payload, dict) or payload.get("f") != sort_field or "id" not in payload:
+        raise InvalidCursor("Cursor does not belong to this listing")
+    return payload.get("v"), payload["id"]
+
+
+def keyset_filter(sort_field: str, direction: int, value: Any, last_id: Any) -> Dict:
+    """
+    Query matching rows strictly after (value, last_id) in the given order.
+
+    Missing/null sort values sort first ascending and last descending, the
+    same as MongoDB's own sort, so they are paged through rather than lost.
+    """
+    after = "$gt" if direction == ASCENDING else "$lt"
+    ties = {sort_field: value, "_id": {after: last_id}}
+
+    if value is None:
+        if direction == ASCENDING:
+            # Nulls come first: remaining nulls, then every non-null value
+            return {"$or": [ties, {sort_field: {"$ne": None}}]}
+        return ties
+
+    branches = [{sort_field: {after: value}}, ties]
+    if direction == DESCENDING:
+        branches.append({sort_field: None})
+    return {"$or": branches}
+
+
+def clamp_page_size(limit: Optional[int], default: int = DEFAULT_PAGE_SIZE) -> int:
+    """Page size within [1, MAX_PAGE_SIZE]"""
+    if limit is None:
+        limit = default
+    return max(1, min(int(limit), MAX_PAGE_SIZE))
+
+
+def page_query(query: Dict, sort_field: str, direction: int, cursor: Optional[str]) -> Dict:
+    """
+    Base filter combined with the condition for rows after cursor.
+
+    Raises:
+        InvalidCursor: If cursor cannot be decoded
+    """
+    if not cursor:
+        return query
+    value, last_id = decode_cursor(cursor, sort_field)
+    condition = keyset_filter(sort_field, direction, value, last_id)
+    return {"$and": [query, condition]} if query else condition
+
+
+def page_stages(query: Dict, sort_field: str, direction: int, page_size: int,
+                cursor: Optional[str] = None) -> List[Dict]:
+    """
+    Aggregation stages selecting one page, for listings fetched inside a
+    larger pipeline (e.g. one $facet branch). Finish with finish_page().
+
+    Raises:
+        InvalidCursor: If cursor cannot be decoded
+    """
+    return [
+        {"$match": page_query(query, sort_field, direction, cursor)},
+        {"$sort": {sort_field: direction, "_id": direction}},
+        # One extra row tells us whether another page exists
+        {"$limit": page_size + 1},
+    ]
+
+
+def finish_page(docs: List[Dict], sort_field: str, page_size: int) -> Tuple[List[Dict], Optional[str]]:
+    """Trim the look-ahead row and issue the cursor for the next page"""
+    if len(docs) <= page_size:
+        return docs, None
+    docs = docs[:page_size]
+    last = docs[-1]
+    return docs, encode_cursor(sort_field, last.get(sort_field), last["_id"])
+
+
+async def fetch_page(
+    collection,
+    query: Dict,
+    sort_field: str,
+    direction: int = DESCENDING,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    projection: Optional[Dict] = None
+) -> Tuple[List[Dict], Optional[str]]:
+    """
+    Fetch one page of a keyset-paginated listing.
+
+    Args:
+        collection: Motor collection
+        query: Base filter (combined with the cursor condition)
+        sort_field: Field to order by; _id breaks ties
+        direction: ASCENDING or DESCENDING
+        limit: Page size (clamped to MAX_PAGE_SIZE)
+        cursor: Token from the previous page's next_cursor
+        projection: Optional projection (sort_field and _id are always kept)
+
+    Returns:
+        tuple: (documents, next_cursor or None on the last page)
+
+    Raises:
+        InvalidCursor: If cursor cannot be decoded
+    """
+    page_size = clamp_page_size(limit)
+    query = page_query(query, sort_field, direction, cursor)
+
+    if projection is not None and not any(v == 0 for v in projection.values()):
+        projection = {**projection, sort_field: 1, "_id": 1}
+
+    # One extra row tells us whether another page exists
+    docs = await collection.find(query, projection).sort(
+        [(sort_field, direction), ("_id", direction)]
+    ).limit(page_size + 1).to_list(length=page_size + 1)
+
+    return finish_page(docs, sort_field, page_size)
+
+
+__all__ = [
+    'DEFAULT_PAGE_SIZE', 'MAX_PAGE_SIZE', 'ASCENDING', 'DESCENDING', 'InvalidCursor',
+    'encode_cursor', 'decode_cursor', 'keyset_filter', 'clamp_page_size',
+    'page_query', 'page_stages', 'finish_page', 'fetch_page'
+]
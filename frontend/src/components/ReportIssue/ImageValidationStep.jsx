@@ -89,7 +89,10 @@ const ImageValidationStep = ({ photoData, onValidationComplete, onRetake }) => {
                     full_exif: data.exif_status,
                     // NEW: Extracted issue data from vision analysis
                     extracted_data: data.extracted_issue_data || null,
-                    vision_analysis: data.vision_analysis || null
+                    vision_analysis: data.vision_analysis || null,
+                    // Lets complaint creation reuse the validated upload
+                    validation_id: data.validation_id || null,
+                    upload_token: data.upload_token || null
                 };
 
                 console.log('📊 Backend response:', data);
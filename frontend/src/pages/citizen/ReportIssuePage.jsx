@@ -169,6 +169,7 @@ const ReportIssuePage = () => {
                 latitude: aiAnalysis.location?.lat || location?.lat || 12.9234,
                 longitude: aiAnalysis.location?.lng || location?.lng || 77.5678,
                 image: imageFile, // Pass the converted File object
+                upload_token: validationResult?.upload_token || null,
                 validation_record_id: validationResult?.validation_id || null
             };
 
@@ -25,7 +25,9 @@ class ApiService {
       const response = await fetch(url, config);
       
       if (!response.ok) {
-        throw new Error(`HTTP error! status: ${response.status}`);
+        const error = new Error(`HTTP error! status: ${response.status}`);
+        error.status = response.status;
+        throw error;
       }
       
       return await response.json();
@@ -88,38 +90,57 @@ class ApiService {
 
   // Complaint Creation (Phase 1 - with officer auto-assignment)
   async createComplaint(complaintData) {
-    const formData = new FormData();
-    
-    // Add all form fields
-    formData.append('citizen_name', complaintData.citizenName);
-    if (complaintData.citizenPhone) {
-      formData.append('citizen_phone', complaintData.citizenPhone);
-    }
-    formData.append('category', complaintData.category);
-    formData.append('severity', complaintData.severity);
-    formData.append('description', complaintData.description);
-    formData.append('ward', complaintData.ward);
-    formData.append('location', complaintData.location);
-    formData.append('latitude', complaintData.latitude);
-    formData.append('longitude', complaintData.longitude);
-    
-    // Add image file
-    if (complaintData.image) {
-      formData.append('image', complaintData.image);
+    const submit = (useToken) => {
+      const formData = new FormData();
+      
+      // Add all form fields
+      formData.append('citizen_name', complaintData.citizenName);
+      if (complaintData.citizenPhone) {
+        formData.append('citizen_phone', complaintData.citizenPhone);
+      }
+      formData.append('category', complaintData.category);
+      formData.append('severity', complaintData.severity);
+      formData.append('description', complaintData.description);
+      formData.append('ward', complaintData.ward);
+      formData.append('location', complaintData.location);
+      formData.append('latitude', complaintData.latitude);
+      formData.append('longitude', complaintData.longitude);
+      
+      // Reference the image already uploaded for validation, or add the file
+      if (useToken) {
+        formData.append('upload_token', complaintData.upload_token);
+      } else if (complaintData.image) {
+        formData.append('image', complaintData.image);
+      }
+      
+      // Add validation record ID if available
+      if (complaintData.validation_record_id) {
+        formData.append('validation_record_id', complaintData.validation_record_id);
+      }
+
+      return this.request('/complaints/create', {
+        method: 'POST',
+        headers: {}, // Remove Content-Type to let browser set it for FormData
+        body: formData,
+      });
+    };
+
+    if (!complaintData.upload_token) {
+      return submit(false);
     }
-    
-    // Add validation record ID if available
-    if (complaintData.validation_record_id) {
-      formData.append('validation_record_id', complaintData.validation_record_id);
+    try {
+      return await submit(true);
+    } catch (error) {
+      // Token expired (or already used): upload the file instead
+      if (error.status === 400 && complaintData.image) {
+        console.warn('Upload token rejected, submitting the image instead');
+        return submit(false);
+      }
+      throw error;
     }
-
-    return this.request('/complaints/create', {
-      method: 'POST',
-      headers: {}, // Remove Content-Type to let browser set it for FormData
-      body: formData,
-    });
   }
 
+
   // AI Analysis (legacy)
   async analyzeDescription(description) {
     return this.request('/analyze', {